@@ -6,6 +6,8 @@ from .models import (
     LoanRequest,
     ChatMessage,
     SupportChatMessage,
+    DepartmentShift,
+    PublicHoliday,
 )
 
 # ================================================================
@@ -133,3 +135,20 @@ class SupportChatMessageAdmin(admin.ModelAdmin):
     search_fields = ("sender__username", "receiver__username", "message")
     list_filter = ("is_read", "timestamp")
     ordering = ("-timestamp",)
+
+
+# ================================================================
+# Working Calendar
+# ================================================================
+@admin.register(DepartmentShift)
+class DepartmentShiftAdmin(admin.ModelAdmin):
+    list_display = ("department", "weekday", "start_time", "end_time")
+    list_filter = ("department", "weekday")
+    ordering = ("department", "weekday")
+
+
+@admin.register(PublicHoliday)
+class PublicHolidayAdmin(admin.ModelAdmin):
+    list_display = ("date", "name")
+    search_fields = ("name",)
+    ordering = ("date",)
@@ -0,0 +1,242 @@
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for bulk analytics
+    np = None
+
+from .attendance import LATE_LIMIT_MINUTES, WORKDAY_MINUTES
+from .changefeed import bump_on_commit
+from .models import Attendance, AttendanceStatus, MonthlyAttendanceSummary
+from .presence import PRESENT, LATE, LEFT_EARLY, LATE_LEFT_EARLY, record_presence
+from .workcalendar import get_work_calendar
+
+
+# ================================================================
+# Vectorized Attendance Analytics
+# ================================================================
+# Loads an attendance window into flat NumPy arrays in one pass and
+# scores every row at once. Used to re-score history after a policy or
+# shift change, and for company-wide punctuality reporting, where
+# evaluate_attendance's per-row datetime arithmetic is too slow.
+
+RESCORE_FIELDS = [
+    "late_minutes", "early_minutes", "hours_worked",
+    "status_code", "leave_deduction", "needs_explanation",
+]
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for attendance analytics (pip install numpy).")
+
+
+def _seconds(value):
+    """Seconds since midnight for a time, NaN when missing."""
+    if value is None:
+        return float("nan")
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@dataclass
+class AttendanceWindow:
+    """Column arrays for a slice of Attendance (one entry per row)."""
+
+    ids: "np.ndarray"            # Attendance primary keys
+    employee_ids: "np.ndarray"   # distinct employee ids, indexed by ``employee``
+    employee: "np.ndarray"       # row -> index into employee_ids
+    ordinal: "np.ndarray"        # date.toordinal()
+    clock_in: "np.ndarray"       # seconds since midnight, NaN if missing
+    clock_out: "np.ndarray"
+    shift_start: "np.ndarray"    # NaN on non-working days
+    shift_end: "np.ndarray"
+    auto_closed: "np.ndarray"    # checked out by the end-of-day close
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_window(start, end, department=None, chunk_size=5000):
+    """
+    Read Attendance rows dated ``start``..``end`` into an AttendanceWindow.
+    One streamed query; shifts are resolved once per (department, date).
+    """
+    _require_numpy()
+
+    qs = Attendance.objects.filter(date__gte=start, date__lte=end)
+    if department:
+        qs = qs.filter(employee__department=department)
+    rows = qs.order_by().values_list(
+        "id", "employee_id", "employee__department", "date", "clock_in", "clock_out", "auto_closed"
+    ).iterator(chunk_size=chunk_size)
+
+    ids, employees, shift_keys, ordinals, clock_in, clock_out, auto_closed = [], [], [], [], [], [], []
+    for pk, employee_id, dept, day, time_in, time_out, closed in rows:
+        ids.append(pk)
+        employees.append(employee_id)
+        shift_keys.append((dept, day))
+        ordinals.append(day.toordinal())
+        clock_in.append(_seconds(time_in))
+        clock_out.append(_seconds(time_out))
+        auto_closed.append(closed)
+
+    calendar = get_work_calendar()
+    shifts = {}
+    for key in set(shift_keys):
+        shift = calendar.shift_for(key[1], key[0])
+        shifts[key] = (_seconds(shift[0]), _seconds(shift[1])) if shift else (float("nan"), float("nan"))
+
+    employee_ids, employee_index = np.unique(np.array(employees, dtype=np.int64), return_inverse=True)
+    shift_pairs = np.array([shifts[key] for key in shift_keys], dtype=np.float64).reshape(-1, 2)
+
+    return AttendanceWindow(
+        ids=np.array(ids, dtype=np.int64),
+        employee_ids=employee_ids,
+        employee=employee_index,
+        ordinal=np.array(ordinals, dtype=np.int32),
+        clock_in=np.array(clock_in, dtype=np.float64),
+        clock_out=np.array(clock_out, dtype=np.float64),
+        shift_start=shift_pairs[:, 0],
+        shift_end=shift_pairs[:, 1],
+        auto_closed=np.array(auto_closed, dtype=bool),
+    )
+
+
+def score_window(window):
+    """
+    Vectorized equivalent of evaluate_attendance for every row.
+
+    Returns a dict of arrays: ``scored`` (working day with a clock-in),
+    ``has_out``, ``late_minutes``, ``early_minutes``, ``hours_worked``,
+    ``late``, ``left_early``.
+    """
+    _require_numpy()
+
+    working = ~np.isnan(window.shift_start)
+    has_in = working & ~np.isnan(window.clock_in)
+    has_out = has_in & ~np.isnan(window.clock_out)
+
+    with np.errstate(invalid="ignore"):
+        late = np.where(has_in, np.maximum(0, np.floor((window.clock_in - window.shift_start) / 60)), 0)
+        early = np.where(has_out, np.maximum(0, np.floor((window.shift_end - window.clock_out) / 60)), 0)
+        hours = np.where(has_out, np.round((window.clock_out - window.clock_in) / 3600, 2), 0)
+
+    late = late.astype(np.int64)
+    early = early.astype(np.int64)
+    return {
+        "scored": has_in,
+        "has_out": has_out,
+        "late_minutes": late,
+        "early_minutes": early,
+        "hours_worked": hours,
+        "late": has_in & (late > 0),
+        "left_early": has_out & (early > 0),
+    }
+
+
+def punctuality_report(window, scores):
+    """
+    Per-employee totals via bincount.
+
+    Returns {employee_id: {days_present, late_days, late_minutes,
+    early_leave_minutes, hours_worked, punctuality_rate}} plus a
+    ``"company"`` entry with the same keys.
+    """
+    _require_numpy()
+
+    n = len(window.employee_ids)
+    idx = window.employee
+    present = np.bincount(idx, weights=scores["scored"], minlength=n)
+    late_days = np.bincount(idx, weights=scores["late"], minlength=n)
+    late_minutes = np.bincount(idx, weights=scores["late_minutes"], minlength=n)
+    early_minutes = np.bincount(idx, weights=scores["early_minutes"], minlength=n)
+    hours = np.bincount(idx, weights=scores["hours_worked"], minlength=n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rate = np.where(present > 0, (present - late_days) / present, 0.0)
+
+    def entry(i):
+        return {
+            "days_present": int(present[i]),
+            "late_days": int(late_days[i]),
+            "late_minutes": int(late_minutes[i]),
+            "early_leave_minutes": int(early_minutes[i]),
+            "hours_worked": round(float(hours[i]), 2),
+            "punctuality_rate": round(float(rate[i]), 4),
+        }
+
+    report = {int(emp_id): entry(i) for i, emp_id in enumerate(window.employee_ids)}
+
+    total_present = present.sum()
+    report["company"] = {
+        "days_present": int(total_present),
+        "late_days": int(late_days.sum()),
+        "late_minutes": int(late_minutes.sum()),
+        "early_leave_minutes": int(early_minutes.sum()),
+        "hours_worked": round(float(hours.sum()), 2),
+        "punctuality_rate": round(float((total_present - late_days.sum()) / total_present), 4) if total_present else 0.0,
+    }
+    return report
+
+
+def rescore_attendance(start, end, department=None, batch_size=1000):
+    """
+    Re-score every Attendance row in the window and write the results back
+    with bulk_update. Rows without a clock-in or on non-working days are
+    left untouched. Monthly summaries, presence codes and change versions
+    are refreshed once.
+
+    Returns ``(rows_updated, report)``.
+    """
+    window = load_window(start, end, department)
+    scores = score_window(window)
+    report = punctuality_report(window, scores)
+
+    late_minutes = scores["late_minutes"]
+    codes = np.select(
+        [scores["late"] & scores["left_early"], scores["late"], scores["left_early"]],
+        [LATE_LEFT_EARLY, LATE, LEFT_EARLY],
+        default=PRESENT,
+    )
+    # Same rules as classify_attendance, applied to the whole window at once.
+    status_codes = np.select(
+        [late_minutes == 0, late_minutes <= LATE_LIMIT_MINUTES],
+        [AttendanceStatus.ON_TIME, AttendanceStatus.LATE],
+        default=AttendanceStatus.LATE_EXPLANATION,
+    )
+    deductions = np.where(status_codes == AttendanceStatus.LATE, late_minutes / WORKDAY_MINUTES, 0.0)
+    needs_explanation = (late_minutes > LATE_LIMIT_MINUTES) | scores["left_early"] | window.auto_closed
+
+    closed, open_rows, keys, presence = [], [], set(), []
+    for i in np.flatnonzero(scores["scored"]):
+        attendance = Attendance(
+            id=int(window.ids[i]),
+            late_minutes=int(late_minutes[i]),
+            early_minutes=int(scores["early_minutes"][i]),
+            status_code=int(status_codes[i]),
+            leave_deduction=Decimal(f"{deductions[i]:.3f}"),
+            needs_explanation=bool(needs_explanation[i]),
+        )
+        if scores["has_out"][i]:
+            attendance.hours_worked = Decimal(f"{scores['hours_worked'][i]:.2f}")
+            closed.append(attendance)
+        else:
+            open_rows.append(attendance)
+        key = (int(window.employee_ids[window.employee[i]]), date.fromordinal(int(window.ordinal[i])))
+        keys.add(key)
+        presence.append((*key, int(codes[i])))
+
+    with transaction.atomic():
+        Attendance.objects.bulk_update(closed, RESCORE_FIELDS, batch_size=batch_size)
+        Attendance.objects.bulk_update(
+            open_rows, [f for f in RESCORE_FIELDS if f != "hours_worked"], batch_size=batch_size
+        )
+        MonthlyAttendanceSummary.refresh(keys)
+        record_presence(presence)
+        bump_on_commit(keys)
+
+    return len(closed) + len(open_rows), report
@@ -0,0 +1,631 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .changefeed import bump_on_commit, prune_changes
+from .presence import record_attendance_presence
+from .pubsub import attendance_event, publish_attendance_on_commit
+from .workcalendar import get_work_calendar
+from .models import Employee, Attendance, AttendanceStatus, ClockEvent, MonthlyAttendanceSummary
+
+
+# ================================================================
+# Daily Materialization (pre-create the day's Attendance rows)
+# ================================================================
+def materialize_attendance(day):
+    """
+    Pre-create an Attendance row for ``day`` for every active employee.
+
+    - Active = joined on or before ``day``.
+    - One bulk INSERT with ``ignore_conflicts``, so re-running the job
+      (or racing a lazy request path) never fails on (employee, date).
+
+    Returns the number of employees the job covered.
+    """
+    employee_ids = list(
+        Employee.objects.filter(date_joined__lte=day).values_list("id", flat=True)
+    )
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            [
+                Attendance(employee_id=emp_id, date=day)
+                for emp_id in employee_ids
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+    return len(employee_ids)
+
+
+# ================================================================
+# Daily Roster (Employees grouped by department with attendance)
+# ================================================================
+def employees_with_attendance(day, employee_ids=None):
+    """
+    Load every employee (or just ``employee_ids``) with their attendance
+    for ``day`` attached.
+
+    - Two queries (employees + one prefetched attendance lookup),
+      regardless of headcount.
+    - Employees without a row get an unsaved placeholder Attendance,
+      so nothing is written while reading.
+    - Unreconciled ClockEvents are merged in (one more query), so the
+      roster shows effective state.
+    - Each employee gets ``attendance_record``, ``attendance_status``
+      and ``hours_worked`` attached for the templates.
+    """
+    employees = Employee.objects.order_by("department", "full_name").prefetch_related(
+        Prefetch(
+            "attendances",
+            queryset=Attendance.objects.filter(date=day),
+            to_attr="day_attendance",
+        )
+    )
+    if employee_ids is not None:
+        employees = employees.filter(id__in=employee_ids)
+    employees = list(employees)
+
+    for emp in employees:
+        if emp.day_attendance:
+            attendance = emp.day_attendance[0]
+        else:
+            attendance = Attendance(employee=emp, date=day)
+
+        emp.attendance_record = attendance
+
+    overlay_pending_events(
+        {(emp.id, day): emp.attendance_record for emp in employees}, [day]
+    )
+
+    for emp in employees:
+        attendance = emp.attendance_record
+        emp.attendance_status = attendance.status
+        emp.hours_worked = attendance.hours_worked or 0
+
+    return employees
+
+
+def checked_in_count(day):
+    """
+    Number of employees effectively checked in on ``day``: stored rows
+    with a clock-in plus employees whose check-in is still a pending
+    ClockEvent (punches are validated before they are logged). Two
+    queries, no rows loaded beyond ids.
+    """
+    stored = Attendance.objects.filter(date=day, clock_in__isnull=False).values_list("employee_id", flat=True)
+    pending = ClockEvent.objects.filter(date=day, reconciled=False, action="checkin").values_list(
+        "employee_id", flat=True
+    )
+    return len(set(stored) | set(pending))
+
+
+def build_department_roster(day):
+    """
+    Build the department → employees roster for ``day``.
+
+    Returns ``(departments, employees)`` where departments is a plain dict.
+    """
+    employees = employees_with_attendance(day)
+
+    departments = defaultdict(list)
+    for emp in employees:
+        departments[emp.department].append(emp)
+
+    return dict(departments), employees
+
+
+# ================================================================
+# Clock-In / Clock-Out Rules
+# ================================================================
+def shift_for(day, department=None):
+    """
+    Return the ``(start_time, end_time)`` shift for ``day``, or None on
+    non-working days (weekly off days and public holidays).
+    Looked up in the cached WorkCalendar.
+    """
+    return get_work_calendar().shift_for(day, department)
+
+
+def apply_checkin(attendance, now_time):
+    """
+    Record a clock-in on ``attendance`` (unsaved).
+    Returns an error message, or None on success.
+    """
+    if attendance.clock_in:
+        return "Already checked in today"
+
+    attendance.clock_in = now_time
+    return None
+
+
+def apply_checkout(attendance, now_time):
+    """
+    Record a clock-out on ``attendance`` (unsaved).
+    Returns an error message, or None on success.
+    """
+    if not attendance.clock_in:
+        return "Cannot check out before checking in"
+    if attendance.clock_out:
+        return "Already checked out today"
+
+    attendance.clock_out = now_time
+    return None
+
+
+def apply_punch(attendance, action, now_time, shift):
+    """
+    Dispatch a ``checkin``/``checkout`` punch, then score the row with
+    ``evaluate_attendance`` (unsaved). Returns an error message or None.
+    """
+    if action == "checkin":
+        error = apply_checkin(attendance, now_time)
+    elif action == "checkout":
+        error = apply_checkout(attendance, now_time)
+    else:
+        error = "Invalid action"
+
+    if error is None:
+        evaluate_attendance(attendance, *shift, commit=False)
+    return error
+
+
+def punch_payload(attendance, action):
+    """JSON-ready summary of an attendance row after a successful punch."""
+    payload = {
+        "status": "success",
+        "action": action,
+        "attendance_status": attendance.status,
+        "status_code": attendance.status_code,
+        "needs_explanation": attendance.needs_explanation,
+    }
+    if action == "checkin":
+        payload["late_minutes"] = attendance.late_minutes
+    else:
+        payload["hours_worked"] = attendance.hours_worked
+    return payload
+
+
+# ================================================================
+# Unified Daily Attendance Evaluation Function
+# ================================================================
+
+LATE_LIMIT_MINUTES = 30
+WORKDAY_MINUTES = 480  # 1 workday, used for the late-arrival leave deduction
+
+
+def classify_attendance(late_minutes, early_minutes):
+    """
+    Score a day from its late/early minutes.
+
+    ``late_minutes`` is None when there is no clock-in and ``early_minutes``
+    is None when there is no clock-out. Returns ``(status_code,
+    leave_deduction, needs_explanation)``. Shared by evaluate_attendance
+    and the bulk analytics engine so both apply identical rules.
+    """
+    if late_minutes is None:
+        return AttendanceStatus.NO_CLOCK_IN, Decimal("0"), True
+
+    # 1. CLOCK-IN EVALUATION
+    leave_deduction = Decimal("0")
+    if late_minutes == 0:
+        status_code = AttendanceStatus.ON_TIME
+        needs_explanation = False
+    elif late_minutes <= LATE_LIMIT_MINUTES:
+        status_code = AttendanceStatus.LATE
+        needs_explanation = False
+        leave_deduction = Decimal(late_minutes / WORKDAY_MINUTES).quantize(Decimal("0.001"))
+    else:
+        status_code = AttendanceStatus.LATE_EXPLANATION
+        needs_explanation = True
+
+    # 2. CLOCK-OUT EVALUATION
+    if early_minutes:
+        needs_explanation = True
+
+    return status_code, leave_deduction, needs_explanation
+
+
+def evaluate_attendance(attendance, start_time, end_time, commit=True):
+    """
+    Evaluates both lateness (clock-in) and early departure (clock-out).
+    Dynamically computes hours worked and flags HR explanation when needed
+    (always for rows auto-closed at shift end).
+    Pass ``commit=False`` to skip the save (for bulk writers).
+    """
+
+    today = attendance.date
+    clock_in = attendance.clock_in
+    clock_out = attendance.clock_out
+    late_minutes = early_minutes = None
+
+    if clock_in:
+        # Calculate lateness in minutes
+        late_delta = datetime.combine(today, clock_in) - datetime.combine(today, start_time)
+        late_minutes = max(0, int(late_delta.total_seconds() / 60))
+        attendance.late_minutes = late_minutes
+
+        if clock_out:
+            # Calculate worked hours
+            worked_duration = datetime.combine(today, clock_out) - datetime.combine(today, clock_in)
+            attendance.hours_worked = round(worked_duration.total_seconds() / 3600, 2)
+
+            # Determine early leave
+            early_delta = datetime.combine(today, end_time) - datetime.combine(today, clock_out)
+            early_minutes = max(0, int(early_delta.total_seconds() / 60))
+
+    attendance.early_minutes = early_minutes or 0
+    (
+        attendance.status_code,
+        attendance.leave_deduction,
+        attendance.needs_explanation,
+    ) = classify_attendance(late_minutes, early_minutes)
+    if attendance.auto_closed:
+        attendance.needs_explanation = True
+
+    if commit:
+        attendance.save()
+
+
+# ================================================================
+# Batched Punches (biometric devices / kiosks)
+# ================================================================
+PUNCH_FIELDS = [
+    "clock_in", "clock_out", "hours_worked", "status_code",
+    "late_minutes", "early_minutes", "leave_deduction", "needs_explanation",
+]
+
+# Device timestamps are accepted this far either side of server time
+# (SMARTPAY_PUNCH_MAX_DELAY / SMARTPAY_PUNCH_MAX_SKEW), so a device can
+# catch up after a brief outage but not backdate or pre-date punches.
+DEFAULT_PUNCH_MAX_DELAY = timedelta(minutes=15)
+DEFAULT_PUNCH_MAX_SKEW = timedelta(minutes=2)
+
+
+def _punch_moment(raw):
+    """Parse an event timestamp into local time (defaults to now)."""
+    if not raw:
+        return timezone.localtime(timezone.now())
+    try:
+        moment = parse_datetime(raw)
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return timezone.localtime(moment)
+
+
+def _punch_window(now):
+    """``(earliest, latest)`` device timestamps accepted at ``now``."""
+    max_delay = getattr(settings, "SMARTPAY_PUNCH_MAX_DELAY", DEFAULT_PUNCH_MAX_DELAY)
+    max_skew = getattr(settings, "SMARTPAY_PUNCH_MAX_SKEW", DEFAULT_PUNCH_MAX_SKEW)
+    return now - max_delay, now + max_skew
+
+
+def process_punch_batch(events):
+    """
+    Apply a list of ``{staff_id, action, timestamp}`` punches.
+
+    - Employees are resolved with one ``staff_id__in`` query, the
+      affected Attendance rows with one more and their pending
+      ClockEvents with a third, so punches validate against the same
+      effective state as ``record_clock_event``.
+    - Events must carry string ``staff_id``/``action`` values and a
+      timestamp within the accepted window around server time.
+    - Events are applied in timestamp order with the same rules as
+      ``attendance_action``.
+    - Accepted punches are appended as ClockEvents with one
+      ``bulk_create``; Attendance and presence codes are left to the
+      reconciler.
+
+    Returns one result dict per event, in the order received.
+    """
+    results = [None] * len(events)
+    parsed = []
+    earliest, latest = _punch_window(timezone.now())
+
+    for index, event in enumerate(events):
+        if not (
+            isinstance(event, dict)
+            and isinstance(event.get("staff_id"), str)
+            and isinstance(event.get("action"), str)
+            and isinstance(event.get("timestamp"), (str, type(None)))
+        ):
+            results[index] = {"index": index, "status": "error", "message": "Invalid event"}
+            continue
+        moment = _punch_moment(event.get("timestamp"))
+        if moment is None or not earliest <= moment <= latest:
+            results[index] = {
+                "index": index,
+                "staff_id": event["staff_id"],
+                "status": "error",
+                "message": "Invalid timestamp" if moment is None else "Timestamp outside the accepted window",
+            }
+            continue
+        parsed.append((index, event["staff_id"], event["action"], moment))
+
+    employees = Employee.objects.in_bulk(
+        {staff_id for _, staff_id, _, _ in parsed if staff_id},
+        field_name="staff_id",
+    )
+    by_id = {emp.id: emp for emp in employees.values()}
+    days = {moment.date() for _, _, _, moment in parsed}
+    rows = {
+        (emp.id, day): Attendance(employee=emp, date=day)
+        for emp in employees.values()
+        for day in days
+    }
+    for att in Attendance.objects.filter(employee__in=list(by_id), date__in=days):
+        att.employee = by_id[att.employee_id]
+        rows[(att.employee_id, att.date)] = att
+    overlay_pending_events(rows, days)
+
+    clock_events, touched = [], {}
+    for index, staff_id, action, moment in sorted(parsed, key=lambda item: item[3]):
+        result = {"index": index, "staff_id": staff_id}
+        results[index] = result
+
+        employee = employees.get(staff_id)
+        if employee is None:
+            result.update(status="error", message="Employee not found")
+            continue
+
+        day = moment.date()
+        shift = shift_for(day, employee.department)
+        if shift is None:
+            result.update(status="error", message="Non-working day")
+            continue
+
+        key = (employee.id, day)
+        attendance = rows[key]
+        error = apply_punch(attendance, action, moment.time(), shift)
+        if error:
+            result.update(status="error", message=error)
+            continue
+
+        clock_events.append(ClockEvent(employee=employee, date=day, action=action, timestamp=moment))
+        touched[key] = attendance
+        result.update(punch_payload(attendance, action))
+
+    if clock_events:
+        with transaction.atomic():
+            ClockEvent.objects.bulk_create(clock_events)
+            bump_on_commit(touched)
+            publish_attendance_on_commit(
+                attendance_event(attendance, attendance.employee.staff_id)
+                for attendance in touched.values()
+            )
+
+    return results
+
+
+# ================================================================
+# Clock Event Log (append-only punches + reconciliation)
+# ================================================================
+def record_clock_event(employee, action, moment):
+    """
+    Validate a punch against the employee's effective state and append it.
+
+    - Reads the stored Attendance row plus pending events; never writes
+      Attendance or presence codes, so the hot path only INSERTs into
+      ClockEvent. The reconciler updates both.
+    - Returns ``(attendance, error)``; ``attendance`` is the unsaved
+      effective state after the punch, evaluated for display.
+    """
+    day = moment.date()
+    shift = shift_for(day, employee.department)
+    if shift is None:
+        return None, "Non-working day"
+
+    attendance = effective_attendance(employee, day)
+    error = apply_punch(attendance, action, moment.time(), shift)
+    if error:
+        return attendance, error
+
+    ClockEvent.objects.create(employee=employee, date=day, action=action, timestamp=moment)
+    bump_on_commit([(employee.id, day)])
+    publish_attendance_on_commit([attendance_event(attendance, employee.staff_id)])
+    return attendance, None
+
+
+def _replay_events(attendance, events, department):
+    """
+    Apply ``events`` (in order) to ``attendance`` in memory.
+    Invalid punches (duplicates, checkout before checkin) are skipped.
+    Returns True if any event changed the row.
+    """
+    shift = shift_for(attendance.date, department)
+    if shift is None:
+        return False
+
+    applied = False
+    for event in events:
+        moment = timezone.localtime(event.timestamp)
+        if apply_punch(attendance, event.action, moment.time(), shift) is None:
+            applied = True
+    return applied
+
+
+def _pending_events_by_key(keys, days):
+    """Group unreconciled events for ``keys`` ((employee_id, date) pairs) in one query."""
+    grouped = defaultdict(list)
+    events = ClockEvent.objects.filter(reconciled=False, date__in=days).order_by("timestamp", "id")
+    for event in events:
+        key = (event.employee_id, event.date)
+        if key in keys:
+            grouped[key].append(event)
+    return grouped
+
+
+def overlay_pending_events(rows, days):
+    """
+    Merge unreconciled ClockEvents into ``rows`` ({(employee_id, date): Attendance})
+    in memory. Nothing is saved.
+    """
+    for key, events in _pending_events_by_key(rows, days).items():
+        attendance = rows[key]
+        _replay_events(attendance, events, attendance.employee.department)
+    return rows
+
+
+def effective_attendance(employee, day):
+    """
+    Return the employee's attendance for ``day`` as dashboards should see it:
+    the stored row (or an unsaved placeholder) with pending events applied.
+    """
+    attendance = Attendance.objects.filter(employee=employee, date=day).first()
+    if attendance is None:
+        attendance = Attendance(employee=employee, date=day)
+
+    events = list(
+        ClockEvent.objects.filter(employee=employee, date=day, reconciled=False)
+        .order_by("timestamp", "id")
+    )
+    _replay_events(attendance, events, employee.department)
+    return attendance
+
+
+def reconcile_clock_events(batch_size=500):
+    """
+    Fold one batch of pending ClockEvents into Attendance.
+
+    - Loads the batch, the affected Attendance rows and the employees'
+      departments (for their shifts) in three queries.
+    - Replays events with the punch rules, which score each row with
+      ``evaluate_attendance``.
+    - Writes rows with ``bulk_create``/``bulk_update`` and marks the
+      events reconciled, all in one transaction.
+
+    Returns the number of events processed (0 when the log is drained).
+    """
+    with transaction.atomic():
+        events = list(ClockEvent.objects.filter(reconciled=False).order_by("id")[:batch_size])
+        if not events:
+            return 0
+
+        grouped = defaultdict(list)
+        for event in events:
+            grouped[(event.employee_id, event.date)].append(event)
+
+        rows = {
+            (att.employee_id, att.date): att
+            for att in Attendance.objects.filter(
+                employee_id__in={emp_id for emp_id, _ in grouped},
+                date__in={day for _, day in grouped},
+            )
+        }
+
+        departments = dict(
+            Employee.objects.filter(id__in={emp_id for emp_id, _ in grouped})
+            .values_list("id", "department")
+        )
+
+        created, changed = [], []
+        for (emp_id, day), key_events in grouped.items():
+            key_events.sort(key=lambda event: (event.timestamp, event.id))
+            attendance = rows.get((emp_id, day))
+            if attendance is None:
+                attendance = Attendance(employee_id=emp_id, date=day)
+            if not _replay_events(attendance, key_events, departments.get(emp_id)):
+                continue
+            if attendance.pk is None:
+                created.append(attendance)
+            else:
+                changed.append(attendance)
+
+        if created:
+            Attendance.objects.bulk_create(created)
+        if changed:
+            Attendance.objects.bulk_update(changed, PUNCH_FIELDS)
+        keys = [(attendance.employee_id, attendance.date) for attendance in [*created, *changed]]
+        MonthlyAttendanceSummary.refresh(keys)
+        record_attendance_presence([*created, *changed])
+        bump_on_commit(keys)
+
+        ClockEvent.objects.filter(id__in=[event.id for event in events]).update(reconciled=True)
+
+    return len(events)
+
+
+# ================================================================
+# End-of-Day Auto Checkout
+# ================================================================
+CLOSE_FIELDS = [
+    "clock_out", "hours_worked", "status_code",
+    "late_minutes", "early_minutes", "leave_deduction", "needs_explanation",
+    "auto_closed",
+]
+
+
+def close_attendance_day(day, now=None, batch_size=500):
+    """
+    Close every open Attendance row for ``day`` once its shift has ended.
+
+    - Pending ClockEvents are reconciled first so late punches count,
+      and roster change-journal rows from earlier days are pruned.
+    - Open rows (no clock-out) are loaded in one query with their
+      employees and evaluated in memory: rows with a clock-in are checked
+      out at shift end and flagged ``auto_closed`` (so they need an
+      explanation rather than scoring as a full day), rows without one
+      become "No Clock-In Recorded".
+    - Checked-out rows are written with one ``bulk_update`` and the
+      no-shows (identical values) with one plain UPDATE, in one
+      transaction; summaries, presence codes and live boards are
+      refreshed once.
+    - Rows whose shift has not ended yet (``now``, default current local
+      time) and non-working days are skipped.
+
+    Returns the number of rows closed.
+    """
+    now = timezone.localtime(now or timezone.now())
+    while reconcile_clock_events(batch_size=batch_size) == batch_size:
+        pass
+    prune_changes(day)
+
+    open_rows = (
+        Attendance.objects.filter(date=day, clock_out__isnull=True)
+        .exclude(status_code=AttendanceStatus.NO_CLOCK_IN)
+        .select_related("employee")
+    )
+
+    checked_out, absent = [], []
+    for attendance in open_rows:
+        shift = shift_for(day, attendance.employee.department)
+        if shift is None:
+            continue
+        end_time = shift[1]
+        if datetime.combine(day, end_time) > now.replace(tzinfo=None):
+            continue
+        if attendance.clock_in:
+            attendance.clock_out = max(end_time, attendance.clock_in)
+            attendance.auto_closed = True
+            checked_out.append(attendance)
+        else:
+            absent.append(attendance)
+        evaluate_attendance(attendance, *shift, commit=False)
+
+    closed = checked_out + absent
+    if not closed:
+        return 0
+
+    keys = [(attendance.employee_id, day) for attendance in closed]
+    with transaction.atomic():
+        Attendance.objects.bulk_update(checked_out, CLOSE_FIELDS, batch_size=batch_size)
+        Attendance.objects.filter(id__in=[attendance.id for attendance in absent]).update(
+            status_code=AttendanceStatus.NO_CLOCK_IN, needs_explanation=True
+        )
+        MonthlyAttendanceSummary.refresh(keys)
+        record_attendance_presence(closed)
+        bump_on_commit(keys)
+        publish_attendance_on_commit(
+            attendance_event(attendance, attendance.employee.staff_id) for attendance in closed
+        )
+
+    return len(closed)
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+
+
+# ================================================================
+# Attendance Change Versions (per-day change journal)
+# ================================================================
+# Every attendance write for a day appends an AttendanceChange row
+# listing the employees it touched; the row id is the day's new
+# version. Pollers send back the last version they saw and receive only
+# the employees changed since.
+#
+# The journal lives in the database rather than the cache: punches,
+# the reconciler, the day close and rescoring run in different
+# processes, and each process has its own local-memory cache.
+
+JOURNAL_DAYS = 2                    # days of journal kept by prune_changes
+JOURNAL_LIMIT = 500                 # beyond this many versions, send a full snapshot
+
+
+def current_version(day):
+    """Return the current change version for ``day`` (0 before any change)."""
+    from .models import AttendanceChange
+
+    return AttendanceChange.objects.filter(date=day).aggregate(version=Max("id"))["version"] or 0
+
+
+def bump_version(day, employee_ids):
+    """
+    Record that ``employee_ids`` changed on ``day`` and return the new version.
+    Call after every attendance write (single or bulk).
+    """
+    from .models import AttendanceChange
+
+    employee_ids = sorted(set(employee_ids))
+    if not employee_ids:
+        return current_version(day)
+    return AttendanceChange.objects.create(date=day, employee_ids=employee_ids).id
+
+
+def bump_on_commit(keys):
+    """
+    Bump versions for ``keys`` ((employee_id, date) pairs) once the current
+    transaction commits, so pollers never see a version before its data.
+    """
+    by_day = defaultdict(set)
+    for employee_id, day in keys:
+        by_day[day].add(employee_id)
+
+    def bump():
+        for day, employee_ids in by_day.items():
+            bump_version(day, employee_ids)
+
+    if by_day:
+        transaction.on_commit(bump)
+
+
+def prune_changes(today):
+    """Drop journal rows older than JOURNAL_DAYS before ``today``. Returns rows deleted."""
+    from .models import AttendanceChange
+
+    deleted, _ = AttendanceChange.objects.filter(date__lt=today - timedelta(days=JOURNAL_DAYS)).delete()
+    return deleted
+
+
+def changed_since(day, since):
+    """
+    Return ``(version, employee_ids)`` for changes on ``day`` after ``since``.
+
+    ``employee_ids`` is an empty set when nothing changed, or None when
+    the journal cannot answer (unknown/old cursor) and the caller should
+    send a full snapshot.
+    """
+    from .models import AttendanceChange
+
+    version = current_version(day)
+    if since == version:
+        return version, set()
+    if since is None or since > version:
+        return version, None
+
+    entries = list(
+        AttendanceChange.objects.filter(date=day, id__gt=since, id__lte=version)
+        .values_list("employee_ids", flat=True)[:JOURNAL_LIMIT + 1]
+    )
+    if len(entries) > JOURNAL_LIMIT:
+        return version, None
+
+    changed = set()
+    for employee_ids in entries:
+        changed.update(employee_ids)
+    return version, changed
@@ -0,0 +1,85 @@
+import csv
+import json
+
+from django.db.models import Case, CharField, Value, When
+
+from .models import Attendance, AttendanceStatus
+
+
+# ================================================================
+# Streaming Helpers
+# ================================================================
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer streaming."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Yield CSV lines for ``header`` followed by ``rows``, one at a time."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(header, rows):
+    """Yield one JSON object per row (newline-delimited), keyed by ``header``."""
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), default=str) + "\n"
+
+
+STREAM_FORMATS = {
+    "csv": (stream_csv, "text/csv"),
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+}
+
+
+# ================================================================
+# Attendance History Export
+# ================================================================
+ATTENDANCE_EXPORT_FIELDS = [
+    ("date", "date"),
+    ("staff_id", "employee__staff_id"),
+    ("full_name", "employee__full_name"),
+    ("department", "employee__department"),
+    ("clock_in", "clock_in"),
+    ("clock_out", "clock_out"),
+    ("hours_worked", "hours_worked"),
+    ("late_minutes", "late_minutes"),
+    ("early_minutes", "early_minutes"),
+    ("leave_deduction", "leave_deduction"),
+    ("needs_explanation", "needs_explanation"),
+    ("auto_closed", "auto_closed"),
+    ("status_code", "status_code"),
+    ("status", "status_label"),
+]
+
+# Status code -> label, resolved by the database so rows stay plain tuples.
+STATUS_LABEL = Case(
+    *[When(status_code=code, then=Value(label)) for code, label in AttendanceStatus.choices],
+    output_field=CharField(),
+)
+
+
+def attendance_export_rows(start=None, end=None, department=None, staff_id=None, chunk_size=2000):
+    """
+    Yield attendance rows as tuples (see ATTENDANCE_EXPORT_FIELDS).
+
+    - Filters by date range, department and employee staff ID.
+    - Reads through ``iterator(chunk_size=...)`` so memory stays flat
+      no matter how many years are exported.
+    """
+    qs = Attendance.objects.all()
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    if department:
+        qs = qs.filter(employee__department=department)
+    if staff_id:
+        qs = qs.filter(employee__staff_id=staff_id)
+
+    columns = [column for _, column in ATTENDANCE_EXPORT_FIELDS]
+    return qs.annotate(status_label=STATUS_LABEL).order_by("date", "employee__staff_id").values_list(*columns).iterator(chunk_size=chunk_size)
@@ -0,0 +1,314 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import LoanPortfolioMonth, LoanRequest, SalaryAdvanceRequest, month_start, next_month
+from .transitions import transition_many
+
+
+# ================================================================
+# Keyset Cursors
+# ================================================================
+# Work queues page with an opaque "rank-micros-id" cursor instead of
+# OFFSET, so page N costs the same as page 1 at any history size.
+
+STATUS_ORDER = ("Pending", "Approved", "Rejected")
+UNASSIGNED = "Unassigned"
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def encode_cursor(rank, moment, pk):
+    """Cursor for the row at (rank, moment, pk)."""
+    return f"{rank}-{(moment - _EPOCH) // timedelta(microseconds=1)}-{pk}"
+
+
+def decode_cursor(cursor):
+    """Return ``(rank, moment, pk)`` or None for a missing/malformed cursor."""
+    try:
+        rank, micros, pk = (int(part) for part in cursor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return rank, _EPOCH + timedelta(microseconds=micros), pk
+
+
+def parse_filter_date(value):
+    """A YYYY-MM-DD query parameter as a date; None when missing, malformed or impossible."""
+    try:
+        return parse_date(value or "")
+    except ValueError:  # well-formed but impossible, e.g. 2024-02-30
+        return None
+
+
+def day_start(day):
+    """Aware local midnight of ``day``, so date filters stay index range scans."""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _keyset_slice(qs, date_field, after, limit):
+    """Up to ``limit`` rows of ``qs`` newest-first, strictly after ``(moment, pk)``."""
+    qs = qs.order_by(f"-{date_field}", "-id")
+    if after:
+        moment, pk = after
+        qs = qs.filter(Q(**{f"{date_field}__lt": moment}) | Q(**{date_field: moment}, id__lt=pk))
+    return list(qs[:limit])
+
+
+def keyset_page(qs, date_field, cursor, page_size, ranked=True):
+    """
+    Slice ``qs`` newest-first after ``cursor``. Returns ``(rows, next_cursor)``.
+
+    With ``ranked`` rows come status by status in STATUS_ORDER (each row
+    gets a ``rank``), read one status at a time so every query is a
+    range scan of the (status, date, id) index rather than a sort of
+    the whole table. Single-status queues pass ``ranked=False``.
+    """
+    position = decode_cursor(cursor)
+    if not ranked:
+        rows = _keyset_slice(qs, date_field, position[1:] if position else None, page_size + 1)
+    else:
+        rows = []
+        first_rank = position[0] if position else 0
+        for rank in range(first_rank, len(STATUS_ORDER)):
+            after = position[1:] if position and rank == first_rank else None
+            chunk = _keyset_slice(qs.filter(status=STATUS_ORDER[rank]), date_field, after, page_size + 1 - len(rows))
+            for row in chunk:
+                row.rank = rank
+            rows.extend(chunk)
+            if len(rows) > page_size:
+                break
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, "rank", 0), getattr(last, date_field), last.id)
+    return rows, next_cursor
+
+
+# ================================================================
+# Salary Advance Work Queue
+# ================================================================
+SALARY_DEPARTMENT = "user__profile__employee__department"
+
+
+def filter_salary_requests(status=None, start=None, end=None, department=None):
+    """SalaryAdvanceRequest queryset narrowed by status, requested date range and department."""
+    qs = SalaryAdvanceRequest.objects.all()
+    if status:
+        qs = qs.filter(status=status)
+    if start:
+        qs = qs.filter(date_requested__gte=day_start(start))
+    if end:
+        qs = qs.filter(date_requested__lt=day_start(end + timedelta(days=1)))
+    if department == UNASSIGNED:
+        qs = qs.filter(**{f"{SALARY_DEPARTMENT}__isnull": True})
+    elif department:
+        qs = qs.filter(**{SALARY_DEPARTMENT: department})
+    return qs
+
+
+def salary_department_totals(qs):
+    """
+    Per-department request counts and amounts for ``qs`` in one GROUP BY.
+
+    Returns an OrderedDict {department: {count, total, pending, pending_total}}
+    sorted by department, with requests lacking an employee under "Unassigned".
+    """
+    rows = (
+        qs.order_by()
+        .values(SALARY_DEPARTMENT)
+        .annotate(
+            count=Count("id"),
+            total=Coalesce(Sum("amount"), Decimal("0")),
+            pending=Count("id", filter=Q(status="Pending")),
+            pending_total=Coalesce(Sum("amount", filter=Q(status="Pending")), Decimal("0")),
+        )
+    )
+    totals = {}
+    for row in rows:
+        department = row.pop(SALARY_DEPARTMENT) or UNASSIGNED
+        totals[department] = row
+    return OrderedDict(sorted(totals.items()))
+
+
+def salary_request_queue(filters, cursor=None, page_size=50):
+    """
+    One page of the salary advance work queue.
+
+    - Pending requests first, then newest first within each status.
+    - Keyset pagination on (status rank, date_requested, id).
+    - Requester and approver profiles are joined in the same query.
+
+    Returns ``(rows, next_cursor)``.
+    """
+    qs = filter_salary_requests(**filters).select_related(
+        "user__profile__employee", "approved_by__profile__employee"
+    )
+    return keyset_page(qs, "date_requested", cursor, page_size, ranked=not filters.get("status"))
+
+
+# ================================================================
+# Bulk Approve / Reject
+# ================================================================
+BULK_DECISIONS = {"approve": "Approved", "reject": "Rejected"}
+BULK_LIMIT = 1000
+
+
+def _bulk_decide(model, ids, action, user):
+    """Shared body of the bulk_decide_* functions (same return shape)."""
+    status = BULK_DECISIONS[action]
+    ids = sorted(set(ids))
+
+    with transaction.atomic():
+        updated = transition_many(model, ids, status, approved_by=user, action_datetime=timezone.now())
+        moved = set(updated)
+        already_processed = dict(
+            model.objects.filter(id__in=[pk for pk in ids if pk not in moved]).values_list("id", "status")
+        )
+
+    not_found = [pk for pk in ids if pk not in moved and pk not in already_processed]
+    return {"updated": updated, "already_processed": already_processed, "not_found": not_found}
+
+
+def bulk_decide_salary_requests(ids, action, user):
+    """
+    Approve or reject many pending salary advances at once.
+
+    - ``transition_many`` locks the ids still Pending and sets status,
+      ``approved_by`` and ``action_datetime`` on exactly those with one
+      UPDATE; rows another reviewer got to first are left alone.
+    - One more query reads the remaining ids' statuses to tell
+      already-processed and unknown ids apart.
+
+    Returns {"updated": [...], "already_processed": {id: status}, "not_found": [...]}.
+    """
+    return _bulk_decide(SalaryAdvanceRequest, ids, action, user)
+
+
+def bulk_decide_loan_requests(ids, action, user):
+    """Approve or reject many pending loans at once, like bulk_decide_salary_requests."""
+    return _bulk_decide(LoanRequest, ids, action, user)
+
+
+# ================================================================
+# Loan Work Queue & Portfolio
+# ================================================================
+# The loan queue reuses the salary queue's keyset cursor on
+# (status rank, created_at, id), backed by the matching LoanRequest
+# indexes.
+#
+# The portfolio breakdowns (by status, department, month and repayment
+# period) are summed from LoanPortfolioMonth, a few thousand rows at
+# most however many loans there are. A date filter that starts or ends
+# mid-month reads those partial months live; each is one month of loans
+# found through the created_at index.
+
+LOAN_DEPARTMENT = "employee__department"
+
+
+def filter_loan_requests(status=None, start=None, end=None, department=None, repayment_period=None):
+    """LoanRequest queryset narrowed by status, request date range, department and term."""
+    qs = LoanRequest.objects.all()
+    if status:
+        qs = qs.filter(status=status)
+    if start:
+        qs = qs.filter(created_at__gte=day_start(start))
+    if end:
+        qs = qs.filter(created_at__lt=day_start(end + timedelta(days=1)))
+    if department:
+        qs = qs.filter(**{LOAN_DEPARTMENT: department})
+    if repayment_period:
+        qs = qs.filter(repayment_period=repayment_period)
+    return qs
+
+
+def _portfolio_rows(status=None, start=None, end=None, department=None, repayment_period=None):
+    """Yield ``(status, department, month, term, count, total)`` groups of the matching loans."""
+    months = LoanPortfolioMonth.objects.all()
+    if status:
+        months = months.filter(status=status)
+    if department:
+        months = months.filter(department=department)
+    if repayment_period:
+        months = months.filter(repayment_period=repayment_period)
+
+    # Months only partly inside [start, end] are aggregated live
+    stop = end + timedelta(days=1) if end else None
+    partial = {}
+    if start and start != month_start(start):
+        partial[month_start(start)] = (start, min(next_month(start), stop) if stop else next_month(start))
+        months = months.filter(month__gte=next_month(start))
+    elif start:
+        months = months.filter(month__gte=start)
+    if stop and stop != month_start(stop):
+        partial[month_start(end)] = (max(month_start(end), start) if start else month_start(end), stop)
+        months = months.filter(month__lt=month_start(end))
+    elif stop:
+        months = months.filter(month__lt=stop)
+
+    yield from months.values_list(
+        "status", "department", "month", "repayment_period", "loan_count", "total_amount"
+    )
+    for month, (low, high) in partial.items():
+        if low >= high:
+            continue
+        loans = filter_loan_requests(status, low, high - timedelta(days=1), department, repayment_period)
+        for row_status, row_department, term, count, total in (
+            loans.order_by()
+            .values_list("status", LOAN_DEPARTMENT, "repayment_period")
+            .annotate(count=Count("id"), total=Sum("amount"))
+        ):
+            yield row_status, row_department, month, term, count, total
+
+
+def _loan_bucket():
+    return {"count": 0, "total": Decimal("0")}
+
+
+def loan_portfolio_totals(filters):
+    """
+    Loan counts and amounts matching ``filters`` (filter_loan_requests
+    arguments) broken down four ways.
+
+    Returns {"status", "department", "month", "repayment_period"}, each
+    an OrderedDict {key: {"count", "total"}} (months newest first, the
+    rest ascending), plus "count" and "total" over all of them.
+    """
+    breakdowns = {"status": {}, "department": {}, "month": {}, "repayment_period": {}}
+    overall = _loan_bucket()
+    for status, department, month, term, count, total in _portfolio_rows(**filters):
+        keys = {"status": status, "department": department, "month": month, "repayment_period": term}
+        for breakdown, key in keys.items():
+            bucket = breakdowns[breakdown].setdefault(key, _loan_bucket())
+            bucket["count"] += count
+            bucket["total"] += total
+        overall["count"] += count
+        overall["total"] += total
+
+    by_status = sorted(
+        breakdowns["status"].items(),
+        key=lambda item: STATUS_ORDER.index(item[0]) if item[0] in STATUS_ORDER else len(STATUS_ORDER),
+    )
+    return {
+        "status": OrderedDict(by_status),
+        "department": OrderedDict(sorted(breakdowns["department"].items())),
+        "month": OrderedDict(sorted(breakdowns["month"].items(), reverse=True)),
+        "repayment_period": OrderedDict(sorted(breakdowns["repayment_period"].items())),
+        **overall,
+    }
+
+
+def loan_request_queue(filters, cursor=None, page_size=50):
+    """
+    One page of the loan work queue: Pending first, then newest first,
+    keyset-paginated on (status rank, created_at, id) with the employee
+    and approver joined. Returns ``(rows, next_cursor)``.
+    """
+    qs = filter_loan_requests(**filters).select_related("employee", "approved_by")
+    return keyset_page(qs, "created_at", cursor, page_size, ranked=not filters.get("status"))
@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
-from .models import SalaryAdvanceRequest, Employee, Profile, LoanRequest
+from .models import SalaryAdvanceRequest, Employee, Profile, LoanRequest, EmployeeExposure
 from django.core.exceptions import ValidationError
 from django.db import transaction
 
@@ -122,7 +122,8 @@ class EmployeeForm(forms.ModelForm):
         fields = [
             'full_name', 'national_id', 'dob',
             'date_joined', 'department', 'job_title',
-            'employment_type', 'salary', 'email', 'phone', 'address'
+            'employment_type', 'salary', 'email', 'phone', 'address',
+            'bank_code', 'bank_account'
         ]
         widgets = {
             'dob': forms.DateInput(attrs={'type': 'date'}),
@@ -166,25 +167,31 @@ class LoanRequestForm(forms.ModelForm):
             }),
         }
 
-    def __init__(self, *args, employee=None, **kwargs):
+    def __init__(self, *args, employee=None, exposure=None, **kwargs):
         """
-        Allow passing an 'employee' argument when initializing the form.
+        Allow passing an 'employee' (and optionally its already-loaded
+        EmployeeExposure) when initializing the form.
         Useful for dynamic validation or display limits.
         """
         super().__init__(*args, **kwargs)
         self.employee = employee
+        self.exposure = exposure
+        if employee and exposure is None:
+            self.exposure = EmployeeExposure.for_employee(employee)
 
         # Optionally display context to the user
-        if employee:
-            # Example: dynamic help text based on employee salary
-            max_loan = employee.salary * 2 if employee.salary else 0
-            self.fields["amount"].help_text = f"Maximum allowed loan: KSh {max_loan:,.2f}"
+        if self.exposure:
+            self.fields["amount"].help_text = f"Maximum allowed loan: KSh {self.exposure.loan_headroom:,.2f}"
 
     def clean_amount(self):
         """
-        Validate loan amount: cannot exceed twice the employee’s salary.
+        Validate loan amount: cannot exceed the employee's loan headroom
+        (twice the salary, less principal of loans still being repaid).
         """
         amount = self.cleaned_data.get("amount")
-        if self.employee and amount and amount > (self.employee.salary * 2):
-            raise forms.ValidationError("Requested amount exceeds your loan limit (2× salary).")
+        if self.exposure and amount and amount > self.exposure.loan_headroom:
+            raise forms.ValidationError(
+                f"Requested amount exceeds your available loan limit "
+                f"(KSh {self.exposure.loan_headroom:,.2f}: 2× salary less active loans)."
+            )
         return amount
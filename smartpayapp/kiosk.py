@@ -0,0 +1,53 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+
+# ================================================================
+# Kiosk Staff Directory
+# ================================================================
+# Check-in kiosks load a compact staff directory once and keep working
+# off it all day, revalidating with If-None-Match. The JSON body is built
+# once and cached; employee changes drop it.
+
+DIRECTORY_KEY = "kiosk-directory"
+DIRECTORY_TIMEOUT = 60 * 5          # bounds staleness across processes
+DIRECTORY_FIELDS = ["staff_id", "full_name", "department"]
+
+
+def build_staff_directory():
+    """
+    Render the directory as ``(etag, body)``.
+
+    - One ``values_list`` query, rows as arrays under ``fields``.
+    - The ETag is a hash of the body, so identical rosters always
+      revalidate regardless of which process built them.
+    """
+    from .models import Employee
+
+    staff = list(
+        Employee.objects.exclude(staff_id__isnull=True)
+        .order_by("department", "full_name")
+        .values_list(*DIRECTORY_FIELDS)
+    )
+    body = json.dumps(
+        {"fields": DIRECTORY_FIELDS, "staff": staff},
+        separators=(",", ":"),
+    ).encode()
+    etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+    return etag, body
+
+
+def get_staff_directory():
+    """Return the cached ``(etag, body)``, building it on a miss."""
+    directory = cache.get(DIRECTORY_KEY)
+    if directory is None:
+        directory = build_staff_directory()
+        cache.set(DIRECTORY_KEY, directory, DIRECTORY_TIMEOUT)
+    return directory
+
+
+def invalidate_staff_directory():
+    """Forget the cached directory (called when employees change)."""
+    cache.delete(DIRECTORY_KEY)
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .loans import loan_book_summary
+
+
+# ================================================================
+# Finance KPIs
+# ================================================================
+# The finance dashboard's figures, computed on a cache miss with one
+# grouped conditional-aggregation query per request table (advances and
+# loans): each returns pending, approved and this month's disbursed
+# counts and amounts per department, and company totals are summed
+# from those rows. The loan book position comes from the amortization
+# engine and is cached with them.
+#
+# The key includes the month, so "this month" rolls over by itself and
+# installments (due at month end) only move at a month boundary. Saving,
+# deleting or transitioning an advance or loan, or editing an employee,
+# drops the entry; the timeout bounds staleness across processes.
+
+KPI_KEY = "finance-kpis:{:%Y-%m}"
+KPI_TIMEOUT = 60 * 5
+METRICS = [
+    "pending_count", "pending_amount",
+    "approved_count", "approved_amount",
+    "disbursed_count", "disbursed_amount",
+]
+
+
+def _grouped_totals(qs, department_field, decided_field, month_start):
+    """One GROUP BY department with every metric as a conditional aggregate."""
+    pending = Q(status="Pending")
+    approved = Q(status="Approved")
+    disbursed = approved & Q(**{f"{decided_field}__gte": month_start})
+    zero = Decimal("0")
+    return (
+        qs.order_by()
+        .values(department_field)
+        .annotate(
+            pending_count=Count("id", filter=pending),
+            pending_amount=Coalesce(Sum("amount", filter=pending), zero),
+            approved_count=Count("id", filter=approved),
+            approved_amount=Coalesce(Sum("amount", filter=approved), zero),
+            disbursed_count=Count("id", filter=disbursed),
+            disbursed_amount=Coalesce(Sum("amount", filter=disbursed), zero),
+        )
+    )
+
+
+def _empty():
+    return {metric: 0 if metric.endswith("_count") else Decimal("0") for metric in METRICS}
+
+
+def _collect(rows, department_field, kind, totals, departments):
+    """Add grouped ``rows`` into the company ``totals[kind]`` and ``departments``."""
+    from .finance import UNASSIGNED
+
+    for row in rows:
+        department = row.pop(department_field) or UNASSIGNED
+        per_department = departments.setdefault(department, {"advances": _empty(), "loans": _empty()})
+        for metric, value in row.items():
+            totals[kind][metric] += value
+            per_department[kind][metric] += value
+
+
+def compute_finance_kpis(today=None):
+    """
+    Build the KPI payload:
+    {"advances": {...}, "loans": {...}, "departments": {dept: {"advances", "loans"}},
+     "loan_book": loan_book_summary(...)}, each leaf holding METRICS.
+    """
+    from .models import LoanRequest, SalaryAdvanceRequest
+
+    today = today or timezone.localdate()
+    month_start = timezone.make_aware(datetime.combine(today.replace(day=1), time.min))
+
+    totals = {"advances": _empty(), "loans": _empty()}
+    departments = {}
+    advances = SalaryAdvanceRequest.objects.annotate(decided=Coalesce("action_datetime", "date_requested"))
+    _collect(
+        _grouped_totals(advances, "user__profile__employee__department", "decided", month_start),
+        "user__profile__employee__department", "advances", totals, departments,
+    )
+    # Loans decided before approvals were recorded fall back to the request date
+    loans = LoanRequest.objects.annotate(decided=Coalesce("action_datetime", "created_at"))
+    _collect(
+        _grouped_totals(loans, "employee__department", "decided", month_start),
+        "employee__department", "loans", totals, departments,
+    )
+
+    totals["departments"] = OrderedDict(sorted(departments.items()))
+    totals["loan_book"] = loan_book_summary(
+        LoanRequest.objects.filter(status="Approved").only(
+            "id", "amount", "interest_rate", "repayment_period", "created_at", "status"
+        ),
+        today,
+    )
+    return totals
+
+
+def get_finance_kpis():
+    """Return this month's cached KPIs, computing them on a miss."""
+    today = timezone.localdate()
+    key = KPI_KEY.format(today)
+    kpis = cache.get(key)
+    if kpis is None:
+        kpis = compute_finance_kpis(today)
+        cache.set(key, kpis, KPI_TIMEOUT)
+    return kpis
+
+
+def invalidate_finance_kpis():
+    """Forget this month's KPIs (called on commit when advances, loans or employees change)."""
+    cache.delete(KPI_KEY.format(timezone.localdate()))
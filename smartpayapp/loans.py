@@ -0,0 +1,276 @@
+import calendar
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from decimal import Decimal, ROUND_HALF_UP
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, schedules fall back to a per-loan loop
+    np = None
+
+
+# ================================================================
+# Loan Amortization Engine
+# ================================================================
+# Builds equal-installment (annuity) schedules for many loans at once.
+# Amounts are integer cents throughout: the installment is rounded once
+# per loan with Decimal (half up), then every loan's balance is rolled
+# forward together one month at a time as int64 NumPy columns, with
+# interest rounded half up to the cent. The last installment absorbs
+# the rounding residue so each schedule repays the principal exactly.
+#
+# Installment k falls due at the end of the k-th month after the loan
+# was taken (payroll recovers it), matching EmployeeExposure. There is
+# no repayment ledger yet, so an installment counts as paid once its
+# due date has passed.
+#
+# Schedules are cached per loan together with the terms they were built
+# from; a cached schedule whose terms no longer match is rebuilt, and
+# saving or deleting a loan drops its entry.
+
+SCHEDULE_KEY = "loan-schedule:{}"
+SCHEDULE_TIMEOUT = 60 * 60 * 24
+RATE_SCALE = 100 * 12 * 100     # interest_rate (% p.a., 2 dp) -> monthly fraction
+
+
+class Installment(NamedTuple):
+    """One scheduled payment. Amounts are stored in cents and read as Decimal."""
+
+    number: int
+    due: date
+    payment_cents: int
+    interest_cents: int
+    principal_cents: int
+    balance_cents: int        # principal outstanding after this installment
+
+    @property
+    def payment(self):
+        return _money(self.payment_cents)
+
+    @property
+    def interest(self):
+        return _money(self.interest_cents)
+
+    @property
+    def principal(self):
+        return _money(self.principal_cents)
+
+    @property
+    def balance(self):
+        return _money(self.balance_cents)
+
+
+@dataclass
+class LoanPosition:
+    """Where a loan stands on ``as_of``."""
+
+    monthly_installment: Decimal
+    paid_installments: int
+    outstanding_balance: Decimal
+    repayment_progress: int   # percent of principal repaid
+    next_due: Installment     # None once fully repaid
+
+
+@lru_cache(maxsize=None)
+def _month_end(index):
+    """Last day of month number ``index`` (year * 12 + month - 1)."""
+    year, month = divmod(index, 12)
+    return date(year, month + 1, calendar.monthrange(year, month + 1)[1])
+
+
+def _add_months(day, months):
+    """Last day of the month ``months`` after ``day``'s month."""
+    return _month_end(day.year * 12 + day.month - 1 + months)
+
+
+def _cents(value):
+    return int((Decimal(value) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+def _money(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def loan_terms(loan):
+    """The inputs a loan's schedule depends on (also its cache signature)."""
+    return (
+        _cents(loan.amount),
+        _cents(loan.interest_rate),
+        int(loan.repayment_period),
+        timezone.localtime(loan.created_at).date() if loan.created_at else timezone.localdate(),
+    )
+
+
+def installment_cents(amount_c, rate_h, term):
+    """Regular payment in cents for an annuity, rounded half up with Decimal."""
+    if term <= 0:
+        return amount_c
+    if rate_h == 0:
+        return int((Decimal(amount_c) / term).to_integral_value(ROUND_HALF_UP))
+    rate = Decimal(rate_h) / RATE_SCALE
+    payment = Decimal(amount_c) * rate / (1 - (1 + rate) ** -term)
+    return int(payment.to_integral_value(ROUND_HALF_UP))
+
+
+def _amortize_numpy(amounts, rates, terms, payments):
+    """Roll every loan forward together. Returns (interest, principal, balance) rows per loan."""
+    amounts, rates, terms, payments = (
+        np.asarray(column, dtype=np.int64) for column in (amounts, rates, terms, payments)
+    )
+    months = int(terms.max()) if len(terms) else 0
+    interest = np.zeros((len(amounts), months), dtype=np.int64)
+    principal = np.zeros_like(interest)
+    remaining = np.zeros_like(interest)
+
+    balance = amounts.copy()
+    for k in range(months):
+        active = k < terms
+        due = (balance * rates * 2 + RATE_SCALE) // (2 * RATE_SCALE)
+        repaid = np.where(k == terms - 1, balance, np.minimum(payments - due, balance))
+        interest[:, k] = np.where(active, due, 0)
+        principal[:, k] = np.where(active, repaid, 0)
+        balance -= principal[:, k]
+        remaining[:, k] = balance
+    return interest.tolist(), principal.tolist(), remaining.tolist()
+
+
+def _amortize_python(amounts, rates, terms, payments):
+    """Same as _amortize_numpy, one loan at a time."""
+    interest, principal, remaining = [], [], []
+    for balance, rate, term, payment in zip(amounts, rates, terms, payments):
+        loan_interest, loan_principal, loan_remaining = [], [], []
+        for k in range(term):
+            due = (balance * rate * 2 + RATE_SCALE) // (2 * RATE_SCALE)
+            repaid = balance if k == term - 1 else min(payment - due, balance)
+            balance -= repaid
+            loan_interest.append(due)
+            loan_principal.append(repaid)
+            loan_remaining.append(balance)
+        interest.append(loan_interest)
+        principal.append(loan_principal)
+        remaining.append(loan_remaining)
+    return interest, principal, remaining
+
+
+def build_schedules(terms_list):
+    """
+    Amortization schedules for many loans in one pass.
+
+    ``terms_list`` holds loan_terms() tuples; returns one list of
+    Installments per entry, in the same order.
+    """
+    if not terms_list:
+        return []
+    amounts = [terms[0] for terms in terms_list]
+    rates = [terms[1] for terms in terms_list]
+    months = [max(terms[2], 0) for terms in terms_list]
+    payments = [installment_cents(*terms[:3]) for terms in terms_list]
+
+    amortize = _amortize_numpy if np is not None else _amortize_python
+    interest, principal, remaining = amortize(amounts, rates, months, payments)
+
+    schedules = []
+    for row, (_, _, term, taken) in enumerate(terms_list):
+        base = taken.year * 12 + taken.month - 1
+        schedules.append([
+            Installment(k + 1, _month_end(base + k + 1), due + repaid, due, repaid, balance)
+            for k, due, repaid, balance in zip(range(term), interest[row], principal[row], remaining[row])
+        ])
+    return schedules
+
+
+def loan_schedules(loans):
+    """
+    Cached schedules for ``loans``: {loan.id: [Installment, ...]}.
+
+    One cache round trip for the lot; misses and entries built from
+    out-of-date terms are rebuilt together and written back.
+    """
+    loans = [loan for loan in loans if loan.id is not None]
+    terms = {loan.id: loan_terms(loan) for loan in loans}
+    cached = cache.get_many([SCHEDULE_KEY.format(pk) for pk in terms])
+
+    schedules, stale = {}, []
+    for pk, signature in terms.items():
+        entry = cached.get(SCHEDULE_KEY.format(pk))
+        if entry is not None and entry[0] == signature:
+            schedules[pk] = entry[1]
+        else:
+            stale.append(pk)
+
+    if stale:
+        built = build_schedules([terms[pk] for pk in stale])
+        schedules.update(zip(stale, built))
+        cache.set_many(
+            {SCHEDULE_KEY.format(pk): (terms[pk], schedules[pk]) for pk in stale},
+            SCHEDULE_TIMEOUT,
+        )
+    return schedules
+
+
+def invalidate_loan_schedule(loan_id):
+    """Forget a loan's cached schedule (called when a loan is saved or deleted)."""
+    cache.delete(SCHEDULE_KEY.format(loan_id))
+
+
+def loan_position(loan, schedule, as_of=None):
+    """LoanPosition of ``loan`` on ``as_of``; unapproved loans have repaid nothing."""
+    as_of = as_of or timezone.localdate()
+    amount = _money(_cents(loan.amount))
+    paid = 0
+    if loan.status == "Approved":
+        paid = sum(1 for installment in schedule if installment.due < as_of)
+
+    outstanding = schedule[paid - 1].balance if paid else amount
+    progress = int((amount - outstanding) * 100 / amount) if amount else 100
+    return LoanPosition(
+        monthly_installment=schedule[0].payment if schedule else Decimal("0.00"),
+        paid_installments=paid,
+        outstanding_balance=outstanding,
+        repayment_progress=progress,
+        next_due=schedule[paid] if paid < len(schedule) else None,
+    )
+
+
+def annotate_loan_positions(loans, as_of=None):
+    """
+    Attach ``schedule`` and the LoanPosition fields to each loan in place
+    (``monthly_installment``, ``outstanding_balance``, ``repayment_progress``, ...).
+    Returns ``loans`` as a list.
+    """
+    loans = list(loans)
+    schedules = loan_schedules(loans)
+    for loan in loans:
+        loan.schedule = schedules.get(loan.id, [])
+        for field, value in vars(loan_position(loan, loan.schedule, as_of)).items():
+            setattr(loan, field, value)
+    return loans
+
+
+def loan_book_summary(loans, as_of=None):
+    """
+    Totals over approved ``loans`` on ``as_of``:
+    {"count", "principal", "outstanding", "due_this_month"}.
+    """
+    as_of = as_of or timezone.localdate()
+    month_end = _add_months(as_of, 0)
+    summary = {
+        "count": 0,
+        "principal": Decimal("0.00"),
+        "outstanding": Decimal("0.00"),
+        "due_this_month": Decimal("0.00"),
+    }
+    for loan in annotate_loan_positions(loans, as_of):
+        if loan.status != "Approved" or loan.next_due is None:
+            continue
+        summary["count"] += 1
+        summary["principal"] += loan.amount
+        summary["outstanding"] += loan.outstanding_balance
+        if loan.next_due.due == month_end:
+            summary["due_this_month"] += loan.next_due.payment
+    return summary
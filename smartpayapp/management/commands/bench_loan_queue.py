@@ -0,0 +1,116 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.functions import Mod
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from smartpayapp.finance import loan_request_queue
+from smartpayapp.models import Employee, LoanPortfolioMonth, LoanRequest
+from smartpayapp.views import finance_internal_loan_request
+
+
+MONTHS = 36
+TERMS = [3, 6, 12, 18, 24, 36]
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic data after a benchmark run."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the finance loan queue page. Seeds synthetic loans spread "
+        "over three years inside a rolled-back transaction and reports query "
+        "count and wall time for typical page loads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loans",
+            type=int,
+            default=100000,
+            help="Number of historic loans to seed (default: 100000).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Timed loads per scenario; the best is reported (default: 5).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._seed(options["loans"])
+                admin = User.objects.create_superuser("loan-queue-bench", password=None)
+                self._report(admin, options["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _report(self, user, repeat):
+        factory = RequestFactory()
+        _, cursor = loan_request_queue({})
+        month_ago = timezone.localdate() - timedelta(days=30)
+        scenarios = [
+            ("first page", {}),
+            ("next page", {"cursor": cursor}),
+            ("pending only", {"status": "Pending"}),
+            ("department + term", {"department": "Finance", "term": "12"}),
+            ("last 30 days", {"start": month_ago.isoformat(), "end": timezone.localdate().isoformat()}),
+        ]
+        self.stdout.write(f"{'scenario':<20} {'queries':>8} {'ms':>8}")
+        for name, params in scenarios:
+            best = None
+            for _ in range(repeat):
+                request = factory.get("/finance_internal_loan_request/", params)
+                request.user = user
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    finance_internal_loan_request(request)
+                    elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(f"{name:<20} {len(ctx.captured_queries):>8} {best * 1000:>8.1f}")
+
+    def _seed(self, count):
+        """``count`` loans over 500 employees, statuses 80% Approved / 10% Rejected / 10% Pending."""
+        departments = [code for code, _ in Employee.DEPARTMENTS]
+        employees = Employee.objects.bulk_create([
+            Employee(
+                full_name=f"Loan Employee {i}",
+                national_id=f"LOANQ-{i}",
+                staff_id=f"LOANQ-{i:05d}",
+                department=departments[i % len(departments)],
+                job_title="Benchmark",
+                employment_type="Permanent",
+                salary=50000,
+                email=f"loanq{i}@example.com",
+                phone="0",
+            )
+            for i in range(500)
+        ])
+        statuses = ["Approved"] * 8 + ["Rejected", "Pending"]
+        created = LoanRequest.objects.bulk_create(
+            [
+                LoanRequest(
+                    employee=employees[i % len(employees)],
+                    amount=10000 + i % 90 * 1000,
+                    repayment_period=TERMS[i % len(TERMS)],
+                    status=statuses[i % len(statuses)],
+                )
+                for i in range(count)
+            ],
+            batch_size=5000,
+        )
+        # created_at is auto_now_add, so spread the history afterwards
+        now = timezone.now()
+        seeded = LoanRequest.objects.filter(id__gte=created[0].id).annotate(bucket=Mod("id", MONTHS))
+        for month in range(MONTHS):
+            seeded.filter(bucket=month).update(created_at=now - timedelta(days=30 * month, minutes=month))
+        # bulk_create and update() skip the signals that maintain the portfolio
+        LoanPortfolioMonth.rebuild()
@@ -0,0 +1,87 @@
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from smartpayapp.models import Employee, LoanRequest, PayrollRun, Profile, SalaryAdvanceRequest
+from smartpayapp.payroll import run_payroll
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic data after a benchmark run."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the payroll run engine. Seeds synthetic employees with "
+        "advances and loans inside a rolled-back transaction and reports "
+        "query count and wall time per headcount."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[100, 1000, 10000],
+            help="Headcounts to benchmark (default: 100 1000 10000).",
+        )
+
+    def handle(self, *args, **options):
+        # Next month, so this month's new loans have their first installment due
+        period = (timezone.localdate().replace(day=1) + timedelta(days=32)).replace(day=1)
+        self.stdout.write(f"{'employees':>10} {'payslips':>9} {'queries':>8} {'seconds':>8}")
+
+        for size in options["sizes"]:
+            try:
+                with transaction.atomic():
+                    self._seed(size, period)
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        run, written = run_payroll(period)
+                        elapsed = time.perf_counter() - started
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+            self.stdout.write(f"{size:>10} {written:>9} {len(ctx.captured_queries):>8} {elapsed:>8.2f}")
+
+    def _seed(self, size, period):
+        """``size`` employees; every 4th has an advance this period, every 3rd a loan."""
+        PayrollRun.objects.filter(period=period).delete()
+        departments = [code for code, _ in Employee.DEPARTMENTS]
+        employees = Employee.objects.bulk_create([
+            Employee(
+                full_name=f"Payroll Employee {i}",
+                national_id=f"PAYROLL-{i}",
+                staff_id=f"PAYROLL-{i:05d}",
+                department=departments[i % len(departments)],
+                job_title="Benchmark",
+                employment_type="Permanent",
+                salary=40000 + i % 50 * 1000,
+                email=f"payroll{i}@example.com",
+                phone="0",
+            )
+            for i in range(size)
+        ])
+        users = User.objects.bulk_create([
+            User(username=f"payroll-bench-{emp.id}") for emp in employees[::4]
+        ])
+        # bulk_create skips the post_save signal that creates profiles
+        Profile.objects.bulk_create([
+            Profile(user=user, employee=emp) for user, emp in zip(users, employees[::4])
+        ])
+        SalaryAdvanceRequest.objects.bulk_create([
+            SalaryAdvanceRequest(user=user, amount=5000, status="Approved") for user in users
+        ])
+        SalaryAdvanceRequest.objects.filter(user__in=users).update(
+            action_datetime=timezone.make_aware(datetime.combine(period, datetime.min.time()))
+        )
+        LoanRequest.objects.bulk_create([
+            LoanRequest(employee=emp, amount=60000, repayment_period=12, status="Approved")
+            for emp in employees[::3]
+        ])
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from smartpayapp.attendance import build_department_roster
+from smartpayapp.models import Employee, Attendance, AttendanceStatus
+
+
+class _Rollback(Exception):
+    """Raised to discard the synthetic employees after a benchmark run."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the check-in roster builder. Seeds synthetic employees "
+        "inside a rolled-back transaction and reports query count per headcount."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[10, 100, 1000, 2000],
+            help="Headcounts to benchmark (default: 10 100 1000 2000).",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        self.stdout.write(f"{'employees':>10} {'queries':>8} {'ms':>10}")
+
+        for size in options["sizes"]:
+            try:
+                with transaction.atomic():
+                    self._seed(size, today)
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        build_department_roster(today)
+                        elapsed = (time.perf_counter() - started) * 1000
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+            self.stdout.write(f"{size:>10} {len(ctx.captured_queries):>8} {elapsed:>10.1f}")
+
+    def _seed(self, size, today):
+        """Create ``size`` employees, half of them already checked in today."""
+        departments = [code for code, _ in Employee.DEPARTMENTS]
+        employees = Employee.objects.bulk_create([
+            Employee(
+                full_name=f"Bench Employee {i}",
+                national_id=f"BENCH-{i}",
+                staff_id=f"BENCH-{i:05d}",
+                department=departments[i % len(departments)],
+                job_title="Benchmark",
+                employment_type="Permanent",
+                salary=0,
+                email=f"bench{i}@example.com",
+                phone="0",
+            )
+            for i in range(size)
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=emp, date=today, clock_in=timezone.localtime().time(), status_code=AttendanceStatus.ON_TIME)
+            for emp in employees[::2]
+        ])
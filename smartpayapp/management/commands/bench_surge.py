@@ -0,0 +1,131 @@
+import threading
+import time
+from datetime import datetime, timedelta, time as clock_time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from smartpayapp.attendance import shift_for
+from smartpayapp.models import Employee, ClockEvent
+from smartpayapp.surge import get_punch_buffer, submit_punch
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the morning check-in surge. Seeds synthetic employees, replays "
+        "one concurrent check-in each with surge mode off and on, and reports "
+        "p50/p99 punch latency. Runs against a throwaway test database, so the "
+        "live database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--punches",
+            type=int,
+            default=1000,
+            help="Number of employees punching in (default: 1000).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Concurrent worker threads (default: 16).",
+        )
+
+    def handle(self, *args, **options):
+        # The worker threads each open their own connection, so a rolled-back
+        # transaction in this thread would be invisible to them; a scratch
+        # database keeps the synthetic rows out of the live one instead.
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._benchmark(options["punches"], options["concurrency"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _benchmark(self, punches, concurrency):
+        moment = self._surge_moment()
+        staff_ids = self._seed(punches)
+
+        self.stdout.write(f"{punches} check-ins, {concurrency} threads, at {moment:%Y-%m-%d %H:%M}")
+        self.stdout.write(f"{'mode':>6} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'wall s':>8} {'errors':>7} {'written':>8}")
+
+        for mode in ("off", "on"):
+            ClockEvent.objects.filter(employee__staff_id__in=staff_ids).delete()
+            with override_settings(SMARTPAY_SURGE_MODE=mode):
+                latencies, errors, wall = self._replay(staff_ids, moment, concurrency)
+                if mode == "on":
+                    get_punch_buffer().flush()
+
+            written = ClockEvent.objects.filter(employee__staff_id__in=staff_ids).count()
+            latencies.sort()
+            self.stdout.write(
+                f"{mode:>6} {self._percentile(latencies, 50):>9.1f} {self._percentile(latencies, 99):>9.1f} "
+                f"{latencies[-1] if latencies else 0:>9.1f} {wall:>8.2f} {errors:>7} {written:>8}"
+            )
+
+    def _surge_moment(self):
+        """07:58 on the next working day (today if it is one)."""
+        day = timezone.localdate()
+        while shift_for(day) is None:
+            day += timedelta(days=1)
+        return timezone.make_aware(datetime.combine(day, clock_time(7, 58)))
+
+    def _seed(self, size):
+        departments = [code for code, _ in Employee.DEPARTMENTS]
+        employees = Employee.objects.bulk_create([
+            Employee(
+                full_name=f"Surge Employee {i}",
+                national_id=f"SURGE-{i}",
+                staff_id=f"SURGE-{i:05d}",
+                department=departments[i % len(departments)],
+                job_title="Benchmark",
+                employment_type="Permanent",
+                salary=0,
+                email=f"surge{i}@example.com",
+                phone="0",
+            )
+            for i in range(size)
+        ])
+        return [emp.staff_id for emp in employees]
+
+    def _replay(self, staff_ids, moment, concurrency):
+        """Fire one check-in per staff ID from ``concurrency`` threads at once."""
+        latencies, lock = [], threading.Lock()
+        errors = [0]
+        barrier = threading.Barrier(concurrency)
+
+        def worker(chunk):
+            barrier.wait()
+            try:
+                for staff_id in chunk:
+                    started = time.perf_counter()
+                    try:
+                        employee = Employee.objects.get(staff_id=staff_id)
+                        _, error = submit_punch(employee, "checkin", moment)
+                    except Exception:
+                        error = True
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        errors[0] += bool(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(staff_ids[i::concurrency],))
+            for i in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0], time.perf_counter() - started
+
+    @staticmethod
+    def _percentile(values, pct):
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
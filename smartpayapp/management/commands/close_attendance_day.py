@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from smartpayapp.attendance import close_attendance_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Auto check-out every open Attendance row for the day at shift end and "
+        "evaluate it. Schedule after the last shift ends (e.g. cron at 18:00)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Day to close as YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows per UPDATE statement (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                day = date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format.")
+        else:
+            day = timezone.localdate()
+
+        closed = close_attendance_day(day, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} open attendance rows for {day}."
+        ))
@@ -0,0 +1,45 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from smartpayapp.models import PayrollRun
+from smartpayapp.transfers import TRANSFER_FORMATS, advance_batch, loan_batch, payroll_batch, stream_transfer_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a bank transfer batch file for a payroll run or for approved "
+        "advances/loans in a date range. Re-running gives identical bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", choices=["payroll", "advances", "loans"])
+        parser.add_argument("--period", help="Payroll month as YYYY-MM (source=payroll).")
+        parser.add_argument("--start", help="First day as YYYY-MM-DD (advances/loans).")
+        parser.add_argument("--end", help="Last day as YYYY-MM-DD (advances/loans).")
+        parser.add_argument("--format", choices=sorted(TRANSFER_FORMATS), default="fixed")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            if options["source"] == "payroll":
+                period = date.fromisoformat(f"{options['period']}-01")
+                run = PayrollRun.objects.filter(period=period, status=PayrollRun.COMPLETED).first()
+                if run is None:
+                    raise CommandError(f"No completed payroll run for {period:%Y-%m}.")
+                batch = payroll_batch(run)
+            else:
+                start = date.fromisoformat(options["start"] or "")
+                end = date.fromisoformat(options["end"] or "")
+                batch = (advance_batch if options["source"] == "advances" else loan_batch)(start, end)
+        except ValueError:
+            raise CommandError("Use --period YYYY-MM for payroll, --start/--end YYYY-MM-DD otherwise.")
+
+        lines = stream_transfer_file(batch, options["format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="ascii", errors="replace", newline="") as handle:
+                handle.writelines(lines)
+            self.stdout.write(self.style.SUCCESS(f"Wrote batch {batch[0]} to {options['output']}."))
+        else:
+            sys.stdout.writelines(lines)
@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from smartpayapp.attendance import materialize_attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-create the day's Attendance rows for every active employee. "
+        "Schedule before the morning check-in window (e.g. cron at 06:00)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            help="Day to materialize as YYYY-MM-DD (default: today).",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                day = date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format.")
+        else:
+            day = timezone.localdate()
+
+        covered = materialize_attendance(day)
+        self.stdout.write(self.style.SUCCESS(
+            f"Attendance materialized for {covered} employees on {day}."
+        ))
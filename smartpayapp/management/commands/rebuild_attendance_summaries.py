@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from smartpayapp.models import MonthlyAttendanceSummary
+
+
+class Command(BaseCommand):
+    help = "Recompute every MonthlyAttendanceSummary row from Attendance in bulk."
+
+    def handle(self, *args, **options):
+        written = MonthlyAttendanceSummary.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} monthly attendance summaries."))
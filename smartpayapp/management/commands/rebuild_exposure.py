@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from smartpayapp.models import EmployeeExposure
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every EmployeeExposure row from advances and loans. "
+        "Schedule at the start of each month so installments roll over."
+    )
+
+    def handle(self, *args, **options):
+        written = EmployeeExposure.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt exposure for {written} employees."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from smartpayapp.models import LoanPortfolioMonth
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every LoanPortfolioMonth row from the loan requests. "
+        "Only needed after loans are changed outside the ORM."
+    )
+
+    def handle(self, *args, **options):
+        months = LoanPortfolioMonth.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the loan portfolio for {months} months."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from smartpayapp.presence import rebuild_presence
+
+
+class Command(BaseCommand):
+    help = "Recompute the compact presence store (one byte per employee per day) from Attendance."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "years",
+            nargs="*",
+            type=int,
+            help="Years to rebuild (default: the current year).",
+        )
+
+    def handle(self, *args, **options):
+        for year in options["years"] or [timezone.localdate().year]:
+            written = rebuild_presence(year)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt presence for {written} employees in {year}."))
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from smartpayapp.attendance import reconcile_clock_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold pending ClockEvents into Attendance in batches. "
+        "Runs once by default; use --interval to keep it running in the background."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Events reconciled per transaction (default: 500).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Seconds to sleep between passes; 0 drains the log once and exits.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+
+        while True:
+            total = 0
+            while True:
+                processed = reconcile_clock_events(batch_size=batch_size)
+                total += processed
+                if processed < batch_size:
+                    break
+
+            if total or not interval:
+                self.stdout.write(f"Reconciled {total} clock events.")
+            if not interval:
+                return
+            time.sleep(interval)
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from smartpayapp.models import PayrollRun
+from smartpayapp.payslips import render_run
+
+
+class Command(BaseCommand):
+    help = (
+        "Render a payroll run's payslip documents into the on-disk cache "
+        "so archive downloads only copy bytes. Schedule after run_payroll."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("period", help="Pay month as YYYY-MM.")
+        parser.add_argument(
+            "--department",
+            help="Only render this department.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Render processes (default: SMARTPAY_PAYSLIP_WORKERS or CPU count).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            period = date.fromisoformat(f"{options['period']}-01")
+        except ValueError:
+            raise CommandError("period must be in YYYY-MM format.")
+
+        run = PayrollRun.objects.filter(period=period).first()
+        if run is None:
+            raise CommandError(f"No payroll run for {period:%Y-%m}.")
+
+        rendered = render_run(run, options["department"], workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} payslip documents for {period:%Y-%m}."
+        ))
@@ -0,0 +1,40 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from smartpayapp.analytics import rescore_attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score attendance (lateness, hours, early leave) for a date range "
+        "with the vectorized analytics engine and print punctuality totals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("start", help="First day, YYYY-MM-DD.")
+        parser.add_argument("end", help="Last day, YYYY-MM-DD.")
+        parser.add_argument("--department", help="Limit to one department.")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"])
+            end = date.fromisoformat(options["end"])
+        except ValueError:
+            raise CommandError("Dates must be in YYYY-MM-DD format.")
+
+        try:
+            updated, report = rescore_attendance(start, end, options["department"])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        company = report["company"]
+        self.stdout.write(self.style.SUCCESS(f"Re-scored {updated} attendance rows."))
+        self.stdout.write(
+            f"Days present: {company['days_present']}  "
+            f"Late days: {company['late_days']}  "
+            f"Late minutes: {company['late_minutes']}  "
+            f"Early-leave minutes: {company['early_leave_minutes']}  "
+            f"Hours: {company['hours_worked']}  "
+            f"Punctuality: {company['punctuality_rate']:.1%}"
+        )
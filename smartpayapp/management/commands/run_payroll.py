@@ -0,0 +1,50 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from smartpayapp.models import PayrollRun
+from smartpayapp.payroll import run_payroll
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the payroll run for a month. Re-run after a failure to "
+        "resume with the departments that have no payslips yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--period",
+            help="Pay month as YYYY-MM (default: current month).",
+        )
+        parser.add_argument(
+            "--department",
+            action="append",
+            help="Only compute this department (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Payslips per INSERT statement (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["period"]:
+            try:
+                period = date.fromisoformat(f"{options['period']}-01")
+            except ValueError:
+                raise CommandError("--period must be in YYYY-MM format.")
+        else:
+            period = timezone.localdate()
+
+        run, written = run_payroll(
+            period,
+            departments=options["department"],
+            batch_size=options["batch_size"],
+        )
+        state = "completed" if run.status == PayrollRun.COMPLETED else "still running"
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} payslips for {run.period:%Y-%m}; run {state}."
+        ))
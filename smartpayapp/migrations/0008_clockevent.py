@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0007_employeeleavebalance_leaverequest_attendance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='status',
+            field=models.CharField(default='Not Checked In', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='ClockEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(choices=[('checkin', 'Check-In'), ('checkout', 'Check-Out')], max_length=10)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reconciled', models.BooleanField(default=False)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clock_events', to='smartpayapp.employee')),
+            ],
+            options={
+                'ordering': ['timestamp', 'id'],
+                'indexes': [models.Index(fields=['reconciled', 'date'], name='smartpayapp_reconci_96232c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0008_clockevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('days_present', models.PositiveIntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('late_minutes', models.PositiveIntegerField(default=0)),
+                ('early_leaves', models.PositiveIntegerField(default=0)),
+                ('explanations_needed', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='smartpayapp.employee')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+    ]
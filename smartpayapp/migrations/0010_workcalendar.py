@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0009_monthlyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicHoliday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DepartmentShift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('department', models.CharField(blank=True, choices=[('Finance', 'Finance'), ('HR', 'HR'), ('IT', 'IT'), ('Operations', 'Operations')], default='', max_length=50)),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+            ],
+            options={
+                'ordering': ['department', 'weekday'],
+                'unique_together': {('department', 'weekday')},
+            },
+        ),
+    ]
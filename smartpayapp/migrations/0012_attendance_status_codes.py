@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+import re
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Codes as of this migration (see AttendanceStatus).
+NOT_CHECKED_IN, ON_TIME, LATE, LATE_EXPLANATION, NO_CLOCK_IN = range(5)
+
+LATE_RE = re.compile(r"Late by (\d+) min")
+EARLY_RE = re.compile(r"Left Early by (\d+) min")
+DEDUCTION_RE = re.compile(r"Leave Deducted: ([\d.]+)")
+
+
+def _default_end(day):
+    return time(13, 0) if day.weekday() == 5 else time(17, 0)
+
+
+def status_text_to_codes(apps, schema_editor):
+    """Parse the legacy free-text status into the structured columns."""
+    Attendance = apps.get_model("smartpayapp", "Attendance")
+    rows = []
+    for att in Attendance.objects.all().iterator(chunk_size=2000):
+        text = att.status or ""
+        if not att.clock_in:
+            att.status_code = NO_CLOCK_IN if "No Clock-In" in text else NOT_CHECKED_IN
+            rows.append(att)
+            continue
+
+        match = LATE_RE.search(text)
+        late = int(match.group(1)) if match else att.late_minutes
+        att.late_minutes = late
+        if late == 0:
+            att.status_code = ON_TIME
+        elif late <= 30:
+            att.status_code = LATE
+            match = DEDUCTION_RE.search(text)
+            att.leave_deduction = Decimal(match.group(1)) if match else round(Decimal(late) / 480, 3)
+        else:
+            att.status_code = LATE_EXPLANATION
+
+        match = EARLY_RE.search(text)
+        if match:
+            att.early_minutes = int(match.group(1))
+        elif att.clock_out and "Left Early" in text:
+            # Short-form rows never stored the minutes; score against the default shift.
+            early = datetime.combine(att.date, _default_end(att.date)) - datetime.combine(att.date, att.clock_out)
+            att.early_minutes = max(1, int(early.total_seconds() // 60))
+        rows.append(att)
+
+    Attendance.objects.bulk_update(
+        rows, ["status_code", "late_minutes", "early_minutes", "leave_deduction"], batch_size=500
+    )
+
+
+def codes_to_status_text(apps, schema_editor):
+    Attendance = apps.get_model("smartpayapp", "Attendance")
+    rows = []
+    for att in Attendance.objects.all().iterator(chunk_size=2000):
+        if att.status_code == NOT_CHECKED_IN:
+            att.status = "Not Checked In"
+        elif att.status_code == NO_CLOCK_IN:
+            att.status = "No Clock-In Recorded"
+        else:
+            if att.status_code == ON_TIME:
+                text = "Checked In on Time"
+            elif att.status_code == LATE:
+                text = f"Late by {att.late_minutes} min (Within Limit) | Leave Deducted: {float(att.leave_deduction)} days"
+            else:
+                text = f"Late by {att.late_minutes} min (Requires Explanation)"
+            if not att.clock_out:
+                text += " | No Clock-Out Recorded"
+            elif att.early_minutes > 0:
+                text += f" | Left Early by {att.early_minutes} min (Requires Explanation)"
+            else:
+                text += " | Completed Full Day"
+            att.status = text
+        rows.append(att)
+    Attendance.objects.bulk_update(rows, ["status"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0011_presenceyear'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='early_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='leave_deduction',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Not Checked In'), (1, 'Checked In on Time'), (2, 'Late (Within Limit)'), (3, 'Late (Requires Explanation)'), (4, 'No Clock-In Recorded')], default=0),
+        ),
+        migrations.RunPython(status_text_to_codes, codes_to_status_text),
+        migrations.RemoveField(
+            model_name='attendance',
+            name='status',
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status_code', 'date'], name='smartpayapp_status__337fb2_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0012_attendance_status_codes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salaryadvancerequest',
+            index=models.Index(fields=['status', 'date_requested', 'id'], name='smartpayapp_status_f38467_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salaryadvancerequest',
+            index=models.Index(fields=['date_requested', 'id'], name='smartpayapp_date_re_0da7f8_idx'),
+        ),
+    ]
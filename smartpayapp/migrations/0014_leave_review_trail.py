@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0013_salary_request_queue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='approved_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='leaverequest',
+            name='rejected_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='leaverequest',
+            name='resumption_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0014_leave_review_trail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeExposure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the pay month the figures are for')),
+                ('outstanding_advances', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('approved_loan_principal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('remaining_installments', models.PositiveIntegerField(default=0)),
+                ('advance_headroom', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('loan_headroom', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='exposure', to='smartpayapp.employee')),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0015_employeeexposure'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField(help_text='First day of the pay month', unique=True)),
+                ('status', models.CharField(choices=[('Running', 'Running'), ('Completed', 'Completed')], default='Running', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('employee_count', models.PositiveIntegerField(default=0)),
+                ('total_gross', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_advances', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_loans', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total_net', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('started_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-period'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Payslip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('staff_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('full_name', models.CharField(max_length=150)),
+                ('department', models.CharField(max_length=50)),
+                ('job_title', models.CharField(max_length=100)),
+                ('gross_pay', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('advance_recovery', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('loan_installments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('net_pay', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('days_present', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payslips', to='smartpayapp.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to='smartpayapp.payrollrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['run', 'department', 'id'], name='smartpayapp_run_id_c7d2fc_idx')],
+                'unique_together': {('run', 'employee')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0016_payroll_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='bank_account',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='bank_code',
+            field=models.CharField(blank=True, help_text='Bank and branch sort code', max_length=10),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_portfolio_months(apps, schema_editor):
+    """Fill LoanPortfolioMonth from the loans already on file."""
+    LoanRequest = apps.get_model("smartpayapp", "LoanRequest")
+    LoanPortfolioMonth = apps.get_model("smartpayapp", "LoanPortfolioMonth")
+    rows = (
+        LoanRequest.objects.order_by()
+        .annotate(month=TruncMonth("created_at"))
+        .values_list("month", "status", "employee__department", "repayment_period")
+        .annotate(count=Count("id"), total=Sum("amount"))
+    )
+    LoanPortfolioMonth.objects.bulk_create([
+        LoanPortfolioMonth(
+            month=month.date(),
+            status=status,
+            department=department,
+            repayment_period=term,
+            loan_count=count,
+            total_amount=total,
+        )
+        for month, status, department, term, count, total in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0017_employee_bank_details'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanPortfolioMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the loans were requested in')),
+                ('status', models.CharField(max_length=20)),
+                ('department', models.CharField(max_length=50)),
+                ('repayment_period', models.IntegerField()),
+                ('loan_count', models.PositiveIntegerField(default=0)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loanrequest',
+            name='action_datetime',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='loanrequest',
+            name='approved_by',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='approved_loan_requests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='smartpayapp_status_5ce0f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrequest',
+            index=models.Index(fields=['created_at', 'id'], name='smartpayapp_created_62d7b3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='loanportfoliomonth',
+            unique_together={('month', 'status', 'department', 'repayment_period')},
+        ),
+        migrations.RunPython(build_portfolio_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0018_loan_request_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='auto_closed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
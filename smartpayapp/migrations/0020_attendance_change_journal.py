@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('smartpayapp', '0019_attendance_auto_closed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('employee_ids', models.JSONField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'id'], name='smartpayapp_date_9a5c54_idx')],
+            },
+        ),
+    ]
@@ -1,12 +1,21 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
-from datetime import datetime, time
-from django.db.models import Sum
+from datetime import datetime, time, date
+from decimal import Decimal
+
+from .changefeed import bump_on_commit
+from .workcalendar import invalidate_work_calendar
+from .kiosk import invalidate_staff_directory
+from .loans import invalidate_loan_schedule
+from .kpis import invalidate_finance_kpis
+from .transitions import status_changed
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import Coalesce, TruncMonth
 
 
 # ================================================================
@@ -66,6 +75,10 @@ class Employee(models.Model):
     phone = models.CharField(max_length=20)
     address = models.TextField(blank=True, null=True)
 
+    # ---------------- Bank Info (salary transfers) ----------------
+    bank_code = models.CharField(max_length=10, blank=True, help_text="Bank and branch sort code")
+    bank_account = models.CharField(max_length=30, blank=True)
+
     def save(self, *args, **kwargs):
         # --- Auto-calc age of the staff employee ---
         if self.dob:
@@ -155,6 +168,12 @@ class SalaryAdvanceRequest(models.Model):
     )
     action_datetime = models.DateTimeField(null=True, blank=True, editable=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "date_requested", "id"]),
+            models.Index(fields=["date_requested", "id"]),
+        ]
+
     def __str__(self):
         """Readable format: username and requested amount."""
         return f"{self.user.username} - {self.amount}"
@@ -170,6 +189,7 @@ class LoanRequest(models.Model):
 
     - Linked to Employee records (HR-controlled).
     - Stores amount, repayment details, reason, interest, and status.
+    - Tracks which finance officer approved/rejected and when.
     """
 
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
@@ -184,6 +204,23 @@ class LoanRequest(models.Model):
         default="Pending"
     )
 
+    # -------- Audit Trail Fields --------
+    approved_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="approved_loan_requests",
+        editable=False
+    )
+    action_datetime = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at", "id"]),
+            models.Index(fields=["created_at", "id"]),
+        ]
+
     def __str__(self):
         """Readable format: staff ID with loan amount."""
         return f"LoanRequest({self.employee.staff_id} - {self.amount})"
@@ -248,6 +285,20 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 
+# ================================================================
+# Attendance Status Codes
+# ================================================================
+class AttendanceStatus(models.IntegerChoices):
+    NOT_CHECKED_IN = 0, "Not Checked In"
+    ON_TIME = 1, "Checked In on Time"
+    LATE = 2, "Late (Within Limit)"
+    LATE_EXPLANATION = 3, "Late (Requires Explanation)"
+    NO_CLOCK_IN = 4, "No Clock-In Recorded"
+
+
+LATE_STATUSES = (AttendanceStatus.LATE, AttendanceStatus.LATE_EXPLANATION)
+
+
 # ================================================================
 # Attendance Model
 # ================================================================
@@ -258,6 +309,12 @@ class Attendance(models.Model):
     - Records clock-in and clock-out times.
     - Calculates total hours worked.
     - Determines late arrival and whether an explanation is needed.
+    - Stores the outcome as an indexed status code plus numeric
+      late/early minutes and leave deduction; the display text is
+      rendered by the ``status`` property.
+    - ``auto_closed`` marks rows checked out by the end-of-day close
+      because the employee never clocked out; they always need an
+      explanation.
     """
 
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendances')
@@ -265,13 +322,22 @@ class Attendance(models.Model):
     clock_in = models.TimeField(null=True, blank=True)
     clock_out = models.TimeField(null=True, blank=True)
     hours_worked = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
-    status = models.CharField(max_length=50, default="Not Checked In")  # Not Checked In, Checked In, Checked Out, Late
+    status_code = models.PositiveSmallIntegerField(
+        choices=AttendanceStatus.choices,
+        default=AttendanceStatus.NOT_CHECKED_IN,
+    )
     late_minutes = models.PositiveIntegerField(default=0)
+    early_minutes = models.PositiveIntegerField(default=0)
+    leave_deduction = models.DecimalField(max_digits=5, decimal_places=3, default=0)  # days
     needs_explanation = models.BooleanField(default=False)
+    auto_closed = models.BooleanField(default=False)
 
     class Meta:
         unique_together = ('employee', 'date') 
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=["status_code", "date"]),
+        ]
 
     # ------------------------------------------------------------
     # Methods
@@ -285,10 +351,318 @@ class Attendance(models.Model):
             self.hours_worked = round(worked.total_seconds() / 3600, 2)
             self.save()
 
+    @property
+    def status(self):
+        """Human-readable status, rendered from the status code and minutes."""
+        code = self.status_code
+        if code == AttendanceStatus.NOT_CHECKED_IN:
+            return "Not Checked In"
+        if code == AttendanceStatus.NO_CLOCK_IN:
+            return "No Clock-In Recorded"
+
+        if code == AttendanceStatus.ON_TIME:
+            text = "Checked In on Time"
+        elif code == AttendanceStatus.LATE:
+            text = f"Late by {self.late_minutes} min (Within Limit)"
+            text += f" | Leave Deducted: {float(self.leave_deduction)} days"
+        else:
+            text = f"Late by {self.late_minutes} min (Requires Explanation)"
+
+        if not self.clock_out:
+            text += " | No Clock-Out Recorded"
+        elif self.auto_closed:
+            text += " | No Clock-Out Recorded (Closed at Shift End)"
+        elif self.early_minutes > 0:
+            text += f" | Left Early by {self.early_minutes} min (Requires Explanation)"
+        else:
+            text += " | Completed Full Day"
+        return text
+
     def __str__(self):
         return f"{self.employee.full_name} - {self.date} - {self.status}"
 
 
+# ================================================================
+# Clock Event Model (append-only punch log)
+# ================================================================
+class ClockEvent(models.Model):
+    """
+    Append-only log of clock-in / clock-out punches.
+
+    - Written by attendance_action instead of mutating Attendance.
+    - Folded into Attendance in batches by the reconciler
+      (see smartpayapp.attendance.reconcile_clock_events).
+    """
+
+    ACTIONS = [
+        ("checkin", "Check-In"),
+        ("checkout", "Check-Out"),
+    ]
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="clock_events")
+    date = models.DateField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    timestamp = models.DateTimeField(default=timezone.now)
+    reconciled = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["timestamp", "id"]
+        indexes = [
+            models.Index(fields=["reconciled", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} {self.action} at {self.timestamp}"
+
+
+# ================================================================
+# Attendance Change Journal (roster polling versions)
+# ================================================================
+class AttendanceChange(models.Model):
+    """
+    One committed attendance write for a day (see smartpayapp.changefeed).
+
+    - The auto-increment id is the version pollers hold; ids are never
+      reused, so versions only grow.
+    - Kept in the database so every process (web workers, reconciler,
+      day close, rescoring) bumps and reads the same versions.
+    """
+
+    date = models.DateField()
+    employee_ids = models.JSONField()
+
+    class Meta:
+        indexes = [models.Index(fields=["date", "id"])]
+
+    def __str__(self):
+        return f"Attendance change {self.id} on {self.date}"
+
+
+# ================================================================
+# Monthly Attendance Summary (per employee per month)
+# ================================================================
+class MonthlyAttendanceSummary(models.Model):
+    """
+    Pre-aggregated attendance totals per employee per month.
+
+    - Refreshed for the affected (employee, month) pairs whenever
+      Attendance rows are written (post_save signal or bulk writers).
+    - Rebuilt from scratch with the rebuild_attendance_summaries command.
+    - Report views read one row per employee instead of scanning Attendance.
+    """
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="monthly_summaries")
+    month = models.DateField(help_text="First day of the month")
+    days_present = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    late_minutes = models.PositiveIntegerField(default=0)
+    early_leaves = models.PositiveIntegerField(default=0)
+    explanations_needed = models.PositiveIntegerField(default=0)
+
+    TOTAL_FIELDS = [
+        "days_present",
+        "total_hours",
+        "late_count",
+        "late_minutes",
+        "early_leaves",
+        "explanations_needed",
+    ]
+
+    class Meta:
+        unique_together = ("employee", "month")
+        ordering = ["-month"]
+
+    # ------------------------------------------------------------
+    # Methods
+    # ------------------------------------------------------------
+    @staticmethod
+    def _totals(queryset):
+        """Group Attendance rows by (employee, month) and aggregate the summary totals."""
+        return (
+            queryset.order_by()
+            .annotate(month=TruncMonth("date"))
+            .values("employee_id", "month")
+            .annotate(
+                days_present=Count("id", filter=Q(clock_in__isnull=False)),
+                total_hours=Coalesce(Sum("hours_worked"), 0, output_field=models.DecimalField()),
+                late_count=Count("id", filter=Q(status_code__in=LATE_STATUSES)),
+                late_minutes=Coalesce(Sum("late_minutes"), 0),
+                early_leaves=Count("id", filter=Q(early_minutes__gt=0)),
+                explanations_needed=Count("id", filter=Q(needs_explanation=True)),
+            )
+        )
+
+    @classmethod
+    def refresh(cls, keys):
+        """
+        Recompute the summaries touched by ``keys`` ((employee_id, date) pairs).
+        One GROUP BY over the affected months and one upsert, so bulk writers
+        can call this once per batch.
+        """
+        months = {(emp_id, day.replace(day=1)) for emp_id, day in keys}
+        if not months:
+            return
+
+        first = min(month for _, month in months)
+        last = max(month for _, month in months)
+        end = date(last.year + last.month // 12, last.month % 12 + 1, 1)
+
+        rows = cls._totals(Attendance.objects.filter(
+            employee_id__in={emp_id for emp_id, _ in months},
+            date__gte=first,
+            date__lt=end,
+        ))
+
+        summaries = {key: cls(employee_id=key[0], month=key[1]) for key in months}
+        for row in rows:
+            summary = summaries.get((row["employee_id"], row["month"]))
+            if summary is not None:
+                for field in cls.TOTAL_FIELDS:
+                    setattr(summary, field, row[field])
+
+        cls.objects.bulk_create(
+            summaries.values(),
+            update_conflicts=True,
+            unique_fields=["employee", "month"],
+            update_fields=cls.TOTAL_FIELDS,
+        )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recompute every summary from Attendance. Returns the number of rows written."""
+        summaries = (
+            cls(employee_id=row["employee_id"], month=row["month"],
+                **{field: row[field] for field in cls.TOTAL_FIELDS})
+            for row in cls._totals(Attendance.objects.all()).iterator()
+        )
+        with transaction.atomic():
+            cls.objects.all().delete()
+            return len(cls.objects.bulk_create(summaries, batch_size=batch_size))
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.month:%Y-%m}"
+
+
+# ================================================================
+# Signal: Keep monthly summaries in sync with Attendance
+# ================================================================
+def deleting_employee(origin):
+    """
+    True when a post_delete is part of deleting an Employee (``origin`` is
+    the instance or queryset delete() was called on). Read models keyed
+    by employee must not be recomputed then: the row would be re-created
+    for an employee about to disappear and fail its foreign key.
+    """
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model is Employee
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def refresh_monthly_attendance_summary(sender, instance, origin=None, **kwargs):
+    """Refresh the summary row for the saved/deleted attendance's month."""
+    if origin is not None and deleting_employee(origin):
+        return
+    MonthlyAttendanceSummary.refresh([(instance.employee_id, instance.date)])
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def bump_attendance_change_version(sender, instance, **kwargs):
+    """Bump the day's change version so pollers pick up the saved/deleted row."""
+    bump_on_commit([(instance.employee_id, instance.date)])
+
+
+# ================================================================
+# Presence Year (one status byte per employee per day)
+# ================================================================
+class PresenceYear(models.Model):
+    """
+    Compact presence store: one byte per day of the year for an employee.
+
+    - ``codes[day_of_year - 1]`` holds a presence code
+      (see smartpayapp.presence for the code table).
+    - Kept in sync by the attendance write paths; rebuilt from Attendance
+      with the rebuild_presence command.
+    """
+
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name="presence_years")
+    year = models.PositiveSmallIntegerField()
+    codes = models.BinaryField(default=bytes(366))
+
+    class Meta:
+        unique_together = ("employee", "year")
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.year}"
+
+
+# ================================================================
+# Working Calendar (department shifts + public holidays)
+# ================================================================
+class DepartmentShift(models.Model):
+    """
+    Shift hours for one weekday.
+
+    - Leave department blank to define the company-wide default.
+    - Weekdays without a row are non-working days.
+    - With no rows at all, the built-in Mon–Fri 08:00–17:00 and
+      Sat 08:00–13:00 schedule applies (see smartpayapp.workcalendar).
+    """
+
+    WEEKDAYS = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    department = models.CharField(max_length=50, choices=Employee.DEPARTMENTS, blank=True, default="")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        unique_together = ("department", "weekday")
+        ordering = ["department", "weekday"]
+
+    def __str__(self):
+        return f"{self.department or 'Default'} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+
+class PublicHoliday(models.Model):
+    """Company-wide non-working day."""
+
+    date = models.DateField(unique=True)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.name} ({self.date})"
+
+
+@receiver(post_save, sender=DepartmentShift)
+@receiver(post_delete, sender=DepartmentShift)
+@receiver(post_save, sender=PublicHoliday)
+@receiver(post_delete, sender=PublicHoliday)
+def reset_work_calendar(sender, **kwargs):
+    """Drop the cached working calendar when shifts or holidays change."""
+    invalidate_work_calendar()
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def reset_staff_directory(sender, **kwargs):
+    """Drop the cached kiosk directory when employees change."""
+    invalidate_staff_directory()
+
+
 # ================================================================
 # Leave Types
 # ================================================================
@@ -342,6 +716,11 @@ class LeaveRequest(models.Model):
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="Pending")
 
+    # -------- Review Trail (set by the approval transitions) --------
+    approved_at = models.DateTimeField(null=True, blank=True, editable=False)
+    rejected_at = models.DateTimeField(null=True, blank=True, editable=False)
+    resumption_date = models.DateField(null=True, blank=True)
+
     @property
     def total_days(self):
         return (self.end_date - self.start_date).days + 1
@@ -359,3 +738,403 @@ def create_employee_leave_balance(sender, instance, created, **kwargs):
     """Initialize leave balances when a new employee is added."""
     if created:
         EmployeeLeaveBalance.objects.create(employee=instance)
+
+
+# ================================================================
+# Employee Financial Exposure (read model)
+# ================================================================
+ADVANCE_LIMIT = Decimal("0.5")  # advances per month, as a share of salary
+LOAN_LIMIT = 2          # loan principal being repaid, in months of salary
+
+
+def month_start(day=None):
+    """First day of ``day``'s month (default: this month)."""
+    return (day or timezone.localdate()).replace(day=1)
+
+
+def months_between(start, end):
+    """Whole calendar months from ``start``'s month to ``end``'s month."""
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+class EmployeeExposure(models.Model):
+    """
+    What each employee currently owes and can still borrow.
+
+    - One row per employee, for the pay month in ``period``: advances
+      approved this month (recovered at payroll), principal of approved
+      loans still being repaid, installments left on them, and the
+      advance/loan headroom that remains.
+    - Refreshed for the affected employees whenever an advance or loan
+      is saved, deleted or transitioned (same transaction), and when an
+      employee's salary changes.
+    - ``for_employee`` recomputes a row lazily once its month is over;
+      rebuild_exposure recomputes every row.
+    """
+
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, related_name="exposure")
+    period = models.DateField(help_text="First day of the pay month the figures are for")
+    outstanding_advances = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    approved_loan_principal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    remaining_installments = models.PositiveIntegerField(default=0)
+    advance_headroom = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    loan_headroom = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    FIGURE_FIELDS = [
+        "period",
+        "outstanding_advances",
+        "approved_loan_principal",
+        "remaining_installments",
+        "advance_headroom",
+        "loan_headroom",
+        "updated_at",
+    ]
+
+    # ------------------------------------------------------------
+    # Methods
+    # ------------------------------------------------------------
+    @classmethod
+    def _compute(cls, employee_ids):
+        """Build unsaved rows for ``employee_ids`` with three grouped queries."""
+        period = month_start()
+        rows = {
+            emp_id: cls(employee_id=emp_id, period=period)
+            for emp_id in Employee.objects.filter(id__in=employee_ids).values_list("id", flat=True)
+        }
+        if not rows:
+            return rows
+
+        period_start = timezone.make_aware(datetime.combine(period, time.min))
+        advances = (
+            SalaryAdvanceRequest.objects.filter(
+                user__profile__employee__in=list(rows), status="Approved",
+            )
+            .annotate(decided=Coalesce("action_datetime", "date_requested"))
+            .filter(decided__gte=period_start)
+            .values("user__profile__employee")
+            .annotate(total=Sum("amount"))
+        )
+        for row in advances:
+            rows[row["user__profile__employee"]].outstanding_advances = row["total"]
+
+        loans = LoanRequest.objects.filter(employee__in=list(rows), status="Approved").values_list(
+            "employee_id", "amount", "repayment_period", "created_at"
+        )
+        for emp_id, amount, term, created_at in loans:
+            # First installment falls due the month after the loan is taken
+            remaining = term - months_between(timezone.localtime(created_at).date(), period) + 1
+            if remaining > 0:
+                exposure = rows[emp_id]
+                exposure.approved_loan_principal += amount
+                exposure.remaining_installments += min(remaining, term)
+
+        for emp_id, salary in Employee.objects.filter(id__in=list(rows)).values_list("id", "salary"):
+            exposure = rows[emp_id]
+            salary = salary or 0
+            exposure.advance_headroom = max(salary * ADVANCE_LIMIT - exposure.outstanding_advances, 0)
+            exposure.loan_headroom = max(salary * LOAN_LIMIT - exposure.approved_loan_principal, 0)
+        return rows
+
+    @classmethod
+    def refresh(cls, employee_ids):
+        """Recompute and upsert the rows for ``employee_ids`` (ignores None)."""
+        rows = cls._compute({emp_id for emp_id in employee_ids if emp_id})
+        if rows:
+            cls.objects.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=["employee"],
+                update_fields=cls.FIGURE_FIELDS,
+            )
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """Recompute every employee's row. Returns the number of rows written."""
+        employee_ids = list(Employee.objects.values_list("id", flat=True))
+        written = 0
+        with transaction.atomic():
+            for i in range(0, len(employee_ids), batch_size):
+                chunk = employee_ids[i:i + batch_size]
+                cls.refresh(chunk)
+                written += len(chunk)
+        return written
+
+    @classmethod
+    def for_employee(cls, employee):
+        """The employee's row, recomputed first if missing or from a past month."""
+        exposure = cls.objects.filter(employee=employee).first()
+        if exposure is None or exposure.period != month_start():
+            cls.refresh([employee.id])
+            exposure = cls.objects.get(employee=employee)
+        return exposure
+
+    def __str__(self):
+        return f"{self.employee_id} exposure ({self.period:%Y-%m})"
+
+
+# ================================================================
+# Signal: Keep exposure in sync with advances, loans and salaries
+# ================================================================
+def _advance_employee_ids(user_ids):
+    return Profile.objects.filter(user_id__in=user_ids).values_list("employee_id", flat=True)
+
+
+@receiver(post_save, sender=SalaryAdvanceRequest)
+@receiver(post_delete, sender=SalaryAdvanceRequest)
+def refresh_exposure_for_advance(sender, instance, origin=None, **kwargs):
+    if origin is not None and deleting_employee(origin):
+        return
+    EmployeeExposure.refresh(_advance_employee_ids([instance.user_id]))
+
+
+@receiver(post_save, sender=LoanRequest)
+@receiver(post_delete, sender=LoanRequest)
+def refresh_exposure_for_loan(sender, instance, origin=None, **kwargs):
+    if origin is not None and deleting_employee(origin):
+        return
+    EmployeeExposure.refresh([instance.employee_id])
+
+
+@receiver(post_save, sender=LoanRequest)
+@receiver(post_delete, sender=LoanRequest)
+def reset_loan_schedule(sender, instance, **kwargs):
+    """Drop the cached amortization schedule when a loan's terms may have changed."""
+    invalidate_loan_schedule(instance.id)
+
+
+@receiver(post_save, sender=Employee)
+def refresh_exposure_for_salary(sender, instance, **kwargs):
+    EmployeeExposure.refresh([instance.id])
+
+
+@receiver(status_changed, sender=SalaryAdvanceRequest)
+def refresh_exposure_for_advance_transition(sender, pks, **kwargs):
+    user_ids = SalaryAdvanceRequest.objects.filter(pk__in=pks).values_list("user_id", flat=True)
+    EmployeeExposure.refresh(_advance_employee_ids(user_ids))
+
+
+@receiver(status_changed, sender=LoanRequest)
+def refresh_exposure_for_loan_transition(sender, pks, **kwargs):
+    EmployeeExposure.refresh(LoanRequest.objects.filter(pk__in=pks).values_list("employee_id", flat=True))
+
+
+# ================================================================
+# Loan Portfolio (monthly read model)
+# ================================================================
+def next_month(day):
+    """First day of the month after ``day``'s month."""
+    start = month_start(day)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+class LoanPortfolioMonth(models.Model):
+    """
+    Loan counts and amounts per request month, status, department and
+    repayment period; the finance loan page reads its breakdowns from
+    here instead of aggregating every loan ever requested.
+
+    - A month's rows are recomputed whenever one of its loans is saved,
+      deleted or transitioned, or a borrower is edited (department moves).
+    - rebuild_loan_portfolio recomputes every month.
+    """
+
+    month = models.DateField(help_text="First day of the month the loans were requested in")
+    status = models.CharField(max_length=20)
+    department = models.CharField(max_length=50)
+    repayment_period = models.IntegerField()
+    loan_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ("month", "status", "department", "repayment_period")
+
+    # ------------------------------------------------------------
+    # Methods
+    # ------------------------------------------------------------
+    @classmethod
+    def refresh_months(cls, months):
+        """Recompute the rows of each month in ``months`` (dates; None ignored)."""
+        months = {month_start(month) for month in months if month}
+        with transaction.atomic():
+            for month in sorted(months):
+                start = timezone.make_aware(datetime.combine(month, time.min))
+                end = timezone.make_aware(datetime.combine(next_month(month), time.min))
+                rows = (
+                    LoanRequest.objects.filter(created_at__gte=start, created_at__lt=end)
+                    .order_by()
+                    .values_list("status", "employee__department", "repayment_period")
+                    .annotate(count=Count("id"), total=Sum("amount"))
+                )
+                groups = {
+                    (status, department, term): (count, total)
+                    for status, department, term, count, total in rows
+                }
+                # Upsert rather than delete + insert, so two saves in the
+                # same month never race on the unique key
+                cls.objects.bulk_create(
+                    [
+                        cls(
+                            month=month,
+                            status=status,
+                            department=department,
+                            repayment_period=term,
+                            loan_count=count,
+                            total_amount=total,
+                        )
+                        for (status, department, term), (count, total) in groups.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["month", "status", "department", "repayment_period"],
+                    update_fields=["loan_count", "total_amount"],
+                )
+                emptied = [
+                    pk
+                    for pk, *group in cls.objects.filter(month=month).values_list(
+                        "id", "status", "department", "repayment_period"
+                    )
+                    if tuple(group) not in groups
+                ]
+                if emptied:
+                    cls.objects.filter(id__in=emptied).delete()
+
+    @classmethod
+    def refresh_loans(cls, loans):
+        """Recompute the months ``loans`` (a LoanRequest queryset) were requested in."""
+        cls.refresh_months(
+            timezone.localtime(created_at).date() for created_at in loans.values_list("created_at", flat=True)
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every month that has loans. Returns the number of months written."""
+        months = list(LoanRequest.objects.dates("created_at", "month"))
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.refresh_months(months)
+        return len(months)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.status} {self.department} {self.repayment_period}m"
+
+
+# ================================================================
+# Signal: Keep the loan portfolio months in sync
+# ================================================================
+@receiver(post_save, sender=LoanRequest)
+@receiver(post_delete, sender=LoanRequest)
+def refresh_portfolio_for_loan(sender, instance, **kwargs):
+    if instance.created_at:
+        LoanPortfolioMonth.refresh_months([timezone.localtime(instance.created_at).date()])
+
+
+@receiver(status_changed, sender=LoanRequest)
+def refresh_portfolio_for_loan_transition(sender, pks, **kwargs):
+    LoanPortfolioMonth.refresh_loans(LoanRequest.objects.filter(pk__in=pks))
+
+
+@receiver(post_save, sender=Employee)
+def refresh_portfolio_for_borrower(sender, instance, created, **kwargs):
+    if not created:
+        LoanPortfolioMonth.refresh_loans(LoanRequest.objects.filter(employee=instance))
+
+
+# ================================================================
+# Payroll Runs
+# ================================================================
+class PayrollRun(models.Model):
+    """
+    One monthly payroll computation.
+
+    - Built department by department by payroll.run_payroll; a run that
+      stops part-way is resumed from the employees still missing.
+    - Totals are filled in when the last department is written and the
+      run is marked Completed; after that its payslips are final.
+    """
+
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    STATUSES = [(RUNNING, "Running"), (COMPLETED, "Completed")]
+
+    period = models.DateField(unique=True, help_text="First day of the pay month")
+    status = models.CharField(max_length=20, choices=STATUSES, default=RUNNING)
+    started_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    # -------- Totals (set on completion) --------
+    employee_count = models.PositiveIntegerField(default=0)
+    total_gross = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_advances = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_loans = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total_net = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-period"]
+
+    @property
+    def total_recoveries(self):
+        return self.total_advances + self.total_loans
+
+    def __str__(self):
+        return f"Payroll {self.period:%Y-%m} ({self.status})"
+
+
+class Payslip(models.Model):
+    """
+    An employee's pay for one PayrollRun.
+
+    - Employee details are copied in so the payslip reads the same if
+      the employee record changes later.
+    - Written once with bulk_create; save() refuses to update a row.
+    """
+
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name="payslips")
+    employee = models.ForeignKey(Employee, on_delete=models.PROTECT, related_name="payslips")
+    staff_id = models.CharField(max_length=20, blank=True, null=True)
+    full_name = models.CharField(max_length=150)
+    department = models.CharField(max_length=50)
+    job_title = models.CharField(max_length=100)
+
+    # -------- Pay --------
+    gross_pay = models.DecimalField(max_digits=12, decimal_places=2)
+    advance_recovery = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    loan_installments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_pay = models.DecimalField(max_digits=12, decimal_places=2)
+
+    # -------- Attendance (from MonthlyAttendanceSummary) --------
+    days_present = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("run", "employee")
+        indexes = [models.Index(fields=["run", "department", "id"])]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Payslips are immutable once written.")
+        super().save(*args, **kwargs)
+
+    @property
+    def total_deductions(self):
+        return self.advance_recovery + self.loan_installments
+
+    def __str__(self):
+        return f"Payslip({self.staff_id} - {self.run.period:%Y-%m})"
+
+
+# ================================================================
+# Signal: Drop cached finance KPIs when their inputs change
+# ================================================================
+@receiver(post_save, sender=SalaryAdvanceRequest)
+@receiver(post_delete, sender=SalaryAdvanceRequest)
+@receiver(post_save, sender=LoanRequest)
+@receiver(post_delete, sender=LoanRequest)
+@receiver(post_save, sender=Employee)
+@receiver(status_changed, sender=SalaryAdvanceRequest)
+@receiver(status_changed, sender=LoanRequest)
+def reset_finance_kpis(sender, **kwargs):
+    """Recompute the finance dashboard after the change commits."""
+    transaction.on_commit(invalidate_finance_kpis)
@@ -0,0 +1,238 @@
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .loans import loan_schedules
+from .models import (
+    Employee,
+    LoanRequest,
+    MonthlyAttendanceSummary,
+    PayrollRun,
+    Payslip,
+    SalaryAdvanceRequest,
+    month_start,
+)
+
+
+# ================================================================
+# Payroll Run Engine
+# ================================================================
+# Computes a month's payslips for the whole company from a fixed set of
+# bulk reads, however many employees there are:
+#
+# 1. employees without a payslip in the run yet,
+# 2. approved advances decided in the month, summed per employee,
+# 3. approved loans (schedules from the amortization engine),
+# 4. the month's MonthlyAttendanceSummary rows.
+#
+# - Gross pay is the monthly salary.
+# - Advances approved in the month are recovered in full, the same
+#   figure EmployeeExposure reports as outstanding.
+# - Loan deductions are the installments that fall due in the month.
+#
+# Each department is written with bulk_create in its own transaction,
+# holding a row lock on the run, so an interrupted run resumes with the
+# employees that have no payslip yet (including anyone hired since it
+# started) and concurrent calls never write the same payslip twice.
+
+ZERO = Decimal("0.00")
+
+
+def month_bounds(period):
+    """Aware datetimes for the start of ``period``'s month and of the next one."""
+    start = month_start(period)
+    following = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(following, time.min)),
+    )
+
+
+def _advance_recoveries(departments, period):
+    """{employee_id: amount} of advances approved during ``period``'s month."""
+    start, end = month_bounds(period)
+    rows = (
+        SalaryAdvanceRequest.objects.filter(
+            user__profile__employee__department__in=departments, status="Approved",
+        )
+        .annotate(decided=Coalesce("action_datetime", "date_requested"))
+        .filter(decided__gte=start, decided__lt=end)
+        .values_list("user__profile__employee")
+        .annotate(total=Sum("amount"))
+    )
+    return dict(rows)
+
+
+def _loan_installments(departments, period):
+    """{employee_id: amount} of loan installments falling due in ``period``'s month."""
+    loans = list(
+        LoanRequest.objects.filter(employee__department__in=departments, status="Approved").only(
+            "id", "employee_id", "amount", "interest_rate", "repayment_period", "created_at", "status"
+        )
+    )
+    schedules = loan_schedules(loans)
+    month = (period.year, period.month)
+
+    cents = defaultdict(int)
+    for loan in loans:
+        for installment in schedules[loan.id]:
+            if (installment.due.year, installment.due.month) == month:
+                cents[loan.employee_id] += installment.payment_cents
+                break
+    return {emp_id: Decimal(total).scaleb(-2) for emp_id, total in cents.items()}
+
+
+def _attendance(departments, period):
+    """{employee_id: (days_present, late_count)} from the month's summaries."""
+    rows = MonthlyAttendanceSummary.objects.filter(
+        employee__department__in=departments, month=period,
+    ).values_list("employee_id", "days_present", "late_count")
+    return {emp_id: (days, late) for emp_id, days, late in rows}
+
+
+def compute_payslips(run, employees):
+    """
+    Unsaved Payslips for ``employees`` (a list of Employee rows) in ``run``.
+
+    Advances, loans and attendance are read with one query each, filtered
+    by the employees' departments rather than a long list of ids.
+    """
+    departments = sorted({employee.department for employee in employees})
+    advances = _advance_recoveries(departments, run.period)
+    loans = _loan_installments(departments, run.period)
+    attendance = _attendance(departments, run.period)
+
+    payslips = []
+    for employee in employees:
+        gross = employee.salary or ZERO
+        advance = advances.get(employee.id) or ZERO
+        loan = loans.get(employee.id, ZERO)
+        days_present, late_count = attendance.get(employee.id, (0, 0))
+        payslips.append(Payslip(
+            run=run,
+            employee=employee,
+            staff_id=employee.staff_id,
+            full_name=employee.full_name,
+            department=employee.department,
+            job_title=employee.job_title,
+            gross_pay=gross,
+            advance_recovery=advance,
+            loan_installments=loan,
+            net_pay=gross - advance - loan,
+            days_present=days_present,
+            late_count=late_count,
+        ))
+    return payslips
+
+
+def pending_employees(run):
+    """Employees that have no payslip in ``run`` yet."""
+    return Employee.objects.exclude(id__in=run.payslips.values("employee_id"))
+
+
+def run_payroll(period, departments=None, user=None, batch_size=1000):
+    """
+    Compute (or resume) the payroll run for ``period``'s month.
+
+    - ``departments`` limits this call to some departments; the run is
+      completed once every employee has a payslip.
+    - Employees already paid in the run are skipped, so calling this
+      again after a failure (or after new hires) only does the
+      remaining work.
+    - Each department's write locks the run row and re-checks who is
+      still missing, so concurrent calls don't collide.
+    - A Completed run is returned untouched.
+
+    Returns ``(run, written)`` where ``written`` counts new payslips.
+    """
+    period = month_start(period)
+    run, _ = PayrollRun.objects.get_or_create(period=period, defaults={"started_by": user})
+    if run.status == PayrollRun.COMPLETED:
+        return run, 0
+
+    employees = pending_employees(run).order_by("department", "id").only(
+        "id", "staff_id", "full_name", "department", "job_title", "salary"
+    )
+    if departments:
+        employees = employees.filter(department__in=departments)
+    employees = list(employees)
+
+    payslips = compute_payslips(run, employees) if employees else []
+    by_department = defaultdict(list)
+    for payslip in payslips:
+        by_department[payslip.department].append(payslip)
+
+    written = 0
+    for department, rows in by_department.items():
+        with transaction.atomic():
+            run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+            if run.status == PayrollRun.COMPLETED:
+                return run, written
+            paid = set(run.payslips.filter(department=department).values_list("employee_id", flat=True))
+            rows = [payslip for payslip in rows if payslip.employee_id not in paid]
+            Payslip.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+
+    with transaction.atomic():
+        run = PayrollRun.objects.select_for_update().get(pk=run.pk)
+        if run.status != PayrollRun.COMPLETED and not pending_employees(run).exists():
+            finalize_run(run)
+    return run, written
+
+
+def finalize_run(run):
+    """Total up ``run``'s payslips in one aggregate and mark it Completed."""
+    totals = run.payslips.aggregate(
+        employee_count=Count("id"),
+        total_gross=Coalesce(Sum("gross_pay"), ZERO),
+        total_advances=Coalesce(Sum("advance_recovery"), ZERO),
+        total_loans=Coalesce(Sum("loan_installments"), ZERO),
+        total_net=Coalesce(Sum("net_pay"), ZERO),
+    )
+    for field, value in totals.items():
+        setattr(run, field, value)
+    run.status = PayrollRun.COMPLETED
+    run.completed_at = timezone.now()
+    run.save(update_fields=[*totals, "status", "completed_at"])
+    return run
+
+
+def payslip_department_totals(run):
+    """Per-department payslip counts and sums for ``run`` in one GROUP BY."""
+    return list(
+        run.payslips.order_by("department")
+        .values("department")
+        .annotate(
+            count=Count("id"),
+            gross=Sum("gross_pay"),
+            advances=Sum("advance_recovery"),
+            loans=Sum("loan_installments"),
+            net=Sum("net_pay"),
+        )
+    )
+
+
+def payslip_page(run, department=None, after=None, page_size=50):
+    """
+    One page of ``run``'s payslips in (department, id) order, starting
+    after payslip id ``after``. Returns ``(rows, next_after)``.
+    """
+    qs = run.payslips.order_by("department", "id")
+    if department:
+        qs = qs.filter(department=department)
+    if after:
+        anchor = run.payslips.filter(id=after).values_list("department", flat=True).first()
+        if anchor is not None:
+            qs = qs.filter(Q(department__gt=anchor) | Q(department=anchor, id__gt=after))
+
+    rows = list(qs[:page_size + 1])
+    next_after = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_after = rows[-1].id
+    return rows, next_after
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.template.loader import get_template, render_to_string
+from django.utils.text import slugify
+
+from .models import Payslip
+
+
+# ================================================================
+# Payslip Documents
+# ================================================================
+# Payslips are rendered to standalone HTML documents and bundled into a
+# zip for distribution.
+#
+# - Documents are cached on disk under the SHA-256 of their inputs (the
+#   payslip figures plus the template source), so a payslip is rendered
+#   once and every later download only copies bytes. A template change
+#   gives new addresses, so stale documents are never served.
+# - Cache misses are rendered in a process pool (workers do no database
+#   work, they get plain dicts) once there are enough of them to repay
+#   the pool start-up; small batches render in-process.
+# - The archive is produced by a generator: payslips are read with
+#   iterator() and each document is compressed and yielded as soon as
+#   it is added, so no whole archive is held in memory.
+#
+# Settings:
+# - SMARTPAY_PAYSLIP_CACHE_DIR: default BASE_DIR/var/payslips. Keep it
+#   out of MEDIA_ROOT and any other served directory: the documents
+#   carry names and pay.
+# - SMARTPAY_PAYSLIP_WORKERS: pool size, default os.cpu_count().
+# - SMARTPAY_PAYSLIP_POOL_MIN: fewest misses worth a pool, default 200.
+
+TEMPLATE_NAME = "smartpayapp/payslip_document.html"
+DOCUMENT_FIELDS = [
+    "id", "staff_id", "full_name", "department", "job_title",
+    "gross_pay", "advance_recovery", "loan_installments", "net_pay",
+    "days_present", "late_count",
+]
+CHUNK_SIZE = 500
+DEFAULT_POOL_MIN = 200
+
+
+def cache_dir():
+    default = os.path.join(settings.BASE_DIR, "var", "payslips")
+    return Path(getattr(settings, "SMARTPAY_PAYSLIP_CACHE_DIR", default))
+
+
+def _template_digest():
+    """Hash of the template source, part of every document address."""
+    source = get_template(TEMPLATE_NAME).template.source
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def document_key(payslip, period, template_digest):
+    """Content address of a payslip document: SHA-256 of everything it shows."""
+    payload = json.dumps(
+        {"payslip": payslip, "period": period.isoformat(), "template": template_digest},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def document_path(key):
+    return cache_dir() / key[:2] / f"{key}.html"
+
+
+def render_document(payslip, period):
+    """Render one payslip (a DOCUMENT_FIELDS dict) to HTML bytes."""
+    context = dict(payslip)
+    context["total_deductions"] = payslip["advance_recovery"] + payslip["loan_installments"]
+    context["period"] = period
+    return render_to_string(TEMPLATE_NAME, context).encode()
+
+
+def _render_job(job):
+    payslip, period = job
+    return render_document(payslip, period)
+
+
+def _write_atomic(path, data):
+    """Write ``data`` to ``path`` through a temp file so readers never see half a document."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class PayslipRenderer:
+    """
+    Renders cache misses, in a process pool when the batch is large.
+    Use as a context manager so the pool is shut down afterwards.
+    """
+
+    def __init__(self, workers=None, pool_min=None):
+        self.workers = workers or getattr(settings, "SMARTPAY_PAYSLIP_WORKERS", None) or os.cpu_count()
+        self.pool_min = pool_min if pool_min is not None else getattr(
+            settings, "SMARTPAY_PAYSLIP_POOL_MIN", DEFAULT_POOL_MIN
+        )
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def render_missing(self, entries, period):
+        """
+        Make sure every ``(key, payslip)`` in ``entries`` has a cached
+        document. Returns the number rendered.
+        """
+        missing = [(key, payslip) for key, payslip in entries if not document_path(key).exists()]
+        if not missing:
+            return 0
+
+        jobs = [(payslip, period) for _, payslip in missing]
+        if len(missing) >= self.pool_min and self.workers > 1:
+            chunksize = max(1, len(jobs) // (self.workers * 4))
+            documents = self._get_pool().map(_render_job, jobs, chunksize=chunksize)
+        else:
+            documents = map(_render_job, jobs)
+
+        for (key, _), document in zip(missing, documents):
+            _write_atomic(document_path(key), document)
+        return len(missing)
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a threaded web process is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("spawn"),
+                initializer=django.setup,
+            )
+        return self._pool
+
+
+def _payslip_rows(run, department=None):
+    qs = Payslip.objects.filter(run=run).order_by("department", "id")
+    if department:
+        qs = qs.filter(department=department)
+    return qs.values(*DOCUMENT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _entries(run, department, template_digest):
+    """Yield lists of ``(key, payslip)`` for ``run``, CHUNK_SIZE at a time."""
+    for chunk in _chunks(_payslip_rows(run, department), CHUNK_SIZE):
+        yield [(document_key(payslip, run.period, template_digest), payslip) for payslip in chunk]
+
+
+def render_run(run, department=None, workers=None):
+    """Render every uncached payslip document of ``run``. Returns the number rendered."""
+    template_digest = _template_digest()
+    rendered = 0
+    with PayslipRenderer(workers) as renderer:
+        for entries in _entries(run, department, template_digest):
+            rendered += renderer.render_missing(entries, run.period)
+    return rendered
+
+
+def archive_name(payslip, period):
+    """Path of a payslip inside the archive: period/department/staff-name.html."""
+    name = slugify(payslip["full_name"]) or "employee"
+    return f"{period:%Y-%m}/{payslip['department']}/{payslip['staff_id'] or payslip['id']}-{name}.html"
+
+
+class _Pipe:
+    """Write-only stream for ZipFile whose contents are drained after each entry."""
+
+    def __init__(self):
+        self._parts = []
+        self._offset = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_payslip_archive(run, department=None, workers=None):
+    """
+    Yield a zip of ``run``'s payslip documents chunk by chunk.
+
+    Missing documents are rendered (and cached) a chunk ahead of being
+    zipped. Entries carry the run's period as their timestamp, so the
+    same run always produces the same archive bytes.
+    """
+    template_digest = _template_digest()
+    timestamp = (run.period.year, run.period.month, run.period.day, 0, 0, 0)
+    pipe = _Pipe()
+
+    with PayslipRenderer(workers) as renderer, zipfile.ZipFile(pipe, "w", zipfile.ZIP_DEFLATED) as archive:
+        for entries in _entries(run, department, template_digest):
+            renderer.render_missing(entries, run.period)
+            for key, payslip in entries:
+                info = zipfile.ZipInfo(archive_name(payslip, run.period), date_time=timestamp)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(document_path(key), "rb") as document:
+                    archive.writestr(info, document.read())
+                yield pipe.drain()
+    yield pipe.drain()
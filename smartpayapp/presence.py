@@ -0,0 +1,146 @@
+from array import array
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+
+from .models import Attendance, PresenceYear
+
+
+# ================================================================
+# Presence Codes (one byte per employee per day)
+# ================================================================
+NO_RECORD = 0
+PRESENT = 1
+LATE = 2
+LEFT_EARLY = 3
+LATE_LEFT_EARLY = 4
+
+PRESENCE_LABELS = {
+    NO_RECORD: "No Record",
+    PRESENT: "Present",
+    LATE: "Late",
+    LEFT_EARLY: "Left Early",
+    LATE_LEFT_EARLY: "Late & Left Early",
+}
+
+YEAR_SLOTS = 366
+
+
+def presence_code(attendance):
+    """Map an (evaluated) Attendance row to its presence code."""
+    if not attendance.clock_in:
+        return NO_RECORD
+    late = attendance.late_minutes > 0
+    left_early = bool(attendance.clock_out) and attendance.early_minutes > 0
+    if late and left_early:
+        return LATE_LEFT_EARLY
+    if late:
+        return LATE
+    if left_early:
+        return LEFT_EARLY
+    return PRESENT
+
+
+def _slot(day):
+    return day.timetuple().tm_yday - 1
+
+
+# ================================================================
+# Writes
+# ================================================================
+def record_presence(entries):
+    """
+    Store presence codes for ``entries`` ((employee_id, date, code) triples).
+    Loads the affected employee-years in one query and writes them back
+    with one bulk_update plus one bulk_create for new years.
+    """
+    by_year = defaultdict(list)
+    for employee_id, day, code in entries:
+        by_year[(employee_id, day.year)].append((_slot(day), code))
+    if not by_year:
+        return
+
+    with transaction.atomic():
+        existing = {
+            (row.employee_id, row.year): row
+            for row in PresenceYear.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in by_year},
+                year__in={year for _, year in by_year},
+            )
+        }
+
+        created, changed = [], []
+        for key, slots in by_year.items():
+            row = existing.get(key)
+            if row is None:
+                row = PresenceYear(employee_id=key[0], year=key[1], codes=bytes(YEAR_SLOTS))
+                created.append(row)
+            else:
+                changed.append(row)
+
+            codes = bytearray(row.codes)
+            for slot, code in slots:
+                codes[slot] = code
+            row.codes = bytes(codes)
+
+        if changed:
+            PresenceYear.objects.bulk_update(changed, ["codes"])
+        if created:
+            PresenceYear.objects.bulk_create(created, ignore_conflicts=True)
+
+
+def record_attendance_presence(attendances):
+    """Sync presence codes from evaluated Attendance rows."""
+    record_presence(
+        (attendance.employee_id, attendance.date, presence_code(attendance))
+        for attendance in attendances
+    )
+
+
+def rebuild_presence(year):
+    """Recompute every employee's codes for ``year`` from Attendance. Returns rows written."""
+    years = defaultdict(lambda: bytearray(YEAR_SLOTS))
+    rows = Attendance.objects.filter(date__year=year).only(
+        "employee_id", "date", "clock_in", "clock_out", "late_minutes", "early_minutes"
+    ).iterator(chunk_size=5000)
+    for attendance in rows:
+        years[attendance.employee_id][_slot(attendance.date)] = presence_code(attendance)
+
+    with transaction.atomic():
+        PresenceYear.objects.filter(year=year).delete()
+        PresenceYear.objects.bulk_create(
+            [PresenceYear(employee_id=emp_id, year=year, codes=bytes(codes)) for emp_id, codes in years.items()],
+            batch_size=1000,
+        )
+    return len(years)
+
+
+# ================================================================
+# Reads
+# ================================================================
+def employee_year(employee_id, year):
+    """
+    Return an ``array('B')`` of presence codes for every day of ``year``
+    (index = day of year - 1) from a single row read.
+    """
+    codes = PresenceYear.objects.filter(employee_id=employee_id, year=year).values_list("codes", flat=True).first()
+    length = (date(year + 1, 1, 1) - date(year, 1, 1)).days
+    return array("B", bytes(codes)[:length] if codes is not None else bytes(length))
+
+
+def present_on(day, department=None):
+    """
+    Return ids of employees present on ``day``, reading one byte from each
+    employee's blob for that year (one query).
+    """
+    qs = PresenceYear.objects.filter(year=day.year)
+    if department:
+        qs = qs.filter(employee__department=department)
+
+    slot = _slot(day)
+    return [
+        employee_id
+        for employee_id, codes in qs.values_list("employee_id", "codes").iterator(chunk_size=2000)
+        if codes[slot] != NO_RECORD
+    ]
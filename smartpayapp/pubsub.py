@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+# ================================================================
+# Pub/Sub Backends
+# ================================================================
+class InProcessBackend:
+    """
+    Fan-out to subscribers living in this process.
+
+    - publish() is thread-safe: sync views (running in worker threads
+      under ASGI) hand messages to each subscriber's event loop.
+    - Each subscriber gets a bounded queue; a slow board drops messages
+      instead of holding up everyone else.
+    """
+
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> {(loop, queue), ...}
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def subscribe(self, channel):
+        """
+        Register a subscriber for ``channel`` on the running event loop.
+        Returns a Subscription; call ``await get()`` for messages and
+        ``close()`` when done.
+        """
+        entry = (asyncio.get_running_loop(), asyncio.Queue(self.QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+
+        def close():
+            with self._lock:
+                self._subscribers.get(channel, set()).discard(entry)
+
+        return Subscription(entry[1].get, close)
+
+
+class Subscription:
+    """Handle returned by a backend's subscribe(): ``await get()`` and ``close()``."""
+
+    def __init__(self, get, close):
+        self.get = get
+        self.close = close
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Return the configured backend (settings.SMARTPAY_PUBSUB_BACKEND, a dotted
+    path to a class with publish(channel, message) and subscribe(channel)
+    returning a Subscription). Defaults to InProcessBackend.
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "SMARTPAY_PUBSUB_BACKEND", "smartpayapp.pubsub.InProcessBackend")
+        _backend = import_string(path)()
+    return _backend
+
+
+# ================================================================
+# Attendance Channel
+# ================================================================
+ATTENDANCE_CHANNEL = "attendance"
+
+
+def attendance_event(attendance, staff_id):
+    """Small JSON-ready summary of an attendance row for live boards."""
+    if attendance.clock_in and not attendance.clock_out:
+        state = "checked-in"
+    elif attendance.clock_out:
+        state = "checked-out"
+    else:
+        state = "not-checked-in"
+
+    return {
+        "staff_id": staff_id,
+        "date": attendance.date.isoformat(),
+        "state": state,
+        "attendance_status": attendance.status,
+        "status_code": attendance.status_code,
+        "clock_in": attendance.clock_in.strftime("%H:%M") if attendance.clock_in else None,
+        "clock_out": attendance.clock_out.strftime("%H:%M") if attendance.clock_out else None,
+        "hours_worked": str(attendance.hours_worked or 0),
+        "late_minutes": attendance.late_minutes,
+        "needs_explanation": attendance.needs_explanation,
+    }
+
+
+def publish_attendance_on_commit(events):
+    """Broadcast attendance events once the current transaction commits."""
+    events = list(events)
+    if not events:
+        return
+
+    def publish():
+        backend = get_backend()
+        for event in events:
+            backend.publish(ATTENDANCE_CHANNEL, json.dumps(event))
+
+    transaction.on_commit(publish)
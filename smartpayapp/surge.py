@@ -0,0 +1,180 @@
+import atexit
+import copy
+import logging
+import threading
+import time
+from datetime import time as clock_time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .attendance import apply_punch, effective_attendance, record_clock_event, shift_for
+from .changefeed import bump_on_commit
+from .models import ClockEvent
+from .pubsub import attendance_event, publish_attendance_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+# ================================================================
+# Check-In Surge Mode
+# ================================================================
+# Around shift start nearly every employee punches at once and each
+# ClockEvent INSERT takes SQLite's write lock in turn. In surge mode
+# punches are validated against in-memory state, answered immediately
+# and written by a background thread in one bulk INSERT per interval.
+#
+# Settings:
+# - SMARTPAY_SURGE_MODE: "off" (default), "auto" (only inside the
+#   window) or "on". Opt in explicitly: buffered punches are lost if
+#   the process dies before the next flush.
+# - SMARTPAY_SURGE_WINDOW: ("HH:MM", "HH:MM") local time, default
+#   07:50-08:10.
+# - SMARTPAY_SURGE_FLUSH_MS: flush interval, default 250.
+#
+# The buffer is per process: punches acknowledged in the last interval
+# are lost if the process dies. Across processes the ClockEvent
+# reconciler still drops duplicate punches.
+
+DEFAULT_WINDOW = ("07:50", "08:10")
+DEFAULT_FLUSH_MS = 250
+
+
+def surge_active(moment):
+    """True when punches at ``moment`` (local datetime) should go through the buffer."""
+    mode = getattr(settings, "SMARTPAY_SURGE_MODE", "off")
+    if mode == "on":
+        return True
+    if mode != "auto":
+        return False
+    start, end = (
+        clock_time.fromisoformat(value)
+        for value in getattr(settings, "SMARTPAY_SURGE_WINDOW", DEFAULT_WINDOW)
+    )
+    return start <= moment.time() < end
+
+
+class PunchBuffer:
+    """
+    In-process write-behind buffer for ClockEvents.
+
+    - submit() validates a punch against the employee's effective state
+      (stored row + pending events + buffered punches) and queues it.
+    - flush() writes everything queued with one bulk_create and refreshes
+      change versions and live boards once per employee; presence codes
+      follow when the reconciler folds the events into Attendance.
+    - Buffered state is kept until the flush after the one that wrote
+      it, so a punch never validates against a row the DB hasn't caught
+      up with yet.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending = []    # (ClockEvent, attendance, staff_id)
+        self._state = {}      # (employee_id, date) -> effective Attendance
+        self._flushed = set()  # keys written by the last flush, evicted by the next
+        self._thread = None
+
+    def submit(self, employee, action, moment):
+        """Queue a punch. Returns ``(attendance, error)`` like record_clock_event."""
+        day = moment.date()
+        shift = shift_for(day, employee.department)
+        if shift is None:
+            return None, "Non-working day"
+
+        key = (employee.id, day)
+        with self._lock:
+            attendance = self._state.get(key)
+        if attendance is None:
+            loaded = effective_attendance(employee, day)
+            with self._lock:
+                attendance = self._state.setdefault(key, loaded)
+
+        with self._lock:
+            error = apply_punch(attendance, action, moment.time(), shift)
+            if error:
+                return copy.copy(attendance), error
+            self._flushed.discard(key)
+            self._pending.append((
+                ClockEvent(employee=employee, date=day, action=action, timestamp=moment),
+                attendance,
+                employee.staff_id,
+            ))
+            result = copy.copy(attendance)
+
+        self._ensure_flusher()
+        return result, None
+
+    def flush(self):
+        """Write queued punches. Returns the number of events written."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            writing = {(event.employee_id, event.date) for event, _, _ in pending}
+            for key in self._flushed - writing:
+                self._state.pop(key, None)
+            self._flushed = set()
+        if not pending:
+            return 0
+
+        latest = {}
+        for event, attendance, staff_id in pending:
+            latest[(event.employee_id, event.date)] = (attendance, staff_id)
+
+        try:
+            with transaction.atomic():
+                ClockEvent.objects.bulk_create([event for event, _, _ in pending])
+                bump_on_commit(latest)
+                publish_attendance_on_commit(
+                    attendance_event(attendance, staff_id) for attendance, staff_id in latest.values()
+                )
+        except Exception:
+            logger.exception("Surge flush failed; re-queued %d punches", len(pending))
+            with self._lock:
+                self._pending[:0] = pending
+            return 0
+
+        with self._lock:
+            self._flushed |= latest.keys()
+        return len(pending)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="surge-flush", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_punch_buffer():
+    """Return the process-wide PunchBuffer (flushed on interpreter exit)."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            interval = getattr(settings, "SMARTPAY_SURGE_FLUSH_MS", DEFAULT_FLUSH_MS) / 1000
+            _buffer = PunchBuffer(interval)
+            atexit.register(_buffer.flush)
+    return _buffer
+
+
+def submit_punch(employee, action, moment):
+    """
+    Record a punch through the surge buffer when surge mode is active,
+    otherwise straight into the ClockEvent log. Returns ``(attendance, error)``.
+    """
+    if surge_active(moment):
+        return get_punch_buffer().submit(employee, action, moment)
+    return record_clock_event(employee, action, moment)
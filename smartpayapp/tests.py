@@ -1,3 +1,289 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from . import loans as loan_engine
+from .loans import build_schedules, loan_schedules
+from .models import Employee, LeaveRequest, LoanRequest, PayrollRun, SalaryAdvanceRequest, next_month
+from .payroll import month_bounds, run_payroll
+from .transfers import HASH_MODULUS, LAYOUTS, stream_fixed_width, transfer_records
+from .transitions import transition
+
+
+# ================================================================
+# Status Transitions
+# ================================================================
+class ParallelApprovalTests(TransactionTestCase):
+    """Reviewers racing on the same request: exactly one of them wins."""
+
+    REVIEWERS = 8
+
+    def setUp(self):
+        self.reviewers = [
+            User.objects.create_superuser(f"reviewer{i}", f"reviewer{i}@example.com", "pass")
+            for i in range(self.REVIEWERS)
+        ]
+        self.requester = User.objects.create_user("requester", "requester@example.com", "pass")
+
+    def run_parallel(self, target):
+        """
+        Call ``target(i)`` from one thread per reviewer, all released at once.
+
+        SQLite serializes the writers; a call that still gets "database is
+        locked" after the busy timeout is retried, as a client would.
+        """
+        barrier = threading.Barrier(self.REVIEWERS)
+        results = [None] * self.REVIEWERS
+        errors = []
+
+        def worker(i):
+            barrier.wait()
+            try:
+                for _ in range(200):
+                    try:
+                        results[i] = target(i)
+                        break
+                    except OperationalError as exc:
+                        if "locked" not in str(exc):
+                            raise
+                        time.sleep(0.01)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.REVIEWERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def test_transition_compare_and_set(self):
+        sr = SalaryAdvanceRequest.objects.create(user=self.requester, amount=1000)
+
+        self.assertTrue(transition(SalaryAdvanceRequest, sr.pk, "Approved", approved_by=self.reviewers[0]))
+        self.assertFalse(transition(SalaryAdvanceRequest, sr.pk, "Rejected", approved_by=self.reviewers[1]))
+
+        sr.refresh_from_db()
+        self.assertEqual(sr.status, "Approved")
+        self.assertEqual(sr.approved_by, self.reviewers[0])
+
+    def test_parallel_salary_approvals(self):
+        sr = SalaryAdvanceRequest.objects.create(user=self.requester, amount=1000)
+        clients = []
+        for reviewer in self.reviewers:
+            client = Client()
+            client.force_login(reviewer)
+            clients.append(client)
+
+        def approve_or_reject(i):
+            action = "approve" if i % 2 else "reject"
+            response = clients[i].post(f"/finance/requests/{sr.pk}/{action}/")
+            return [str(message) for message in response.wsgi_request._messages]
+
+        results = self.run_parallel(approve_or_reject)
+
+        sr.refresh_from_db()
+        self.assertIn(sr.status, ("Approved", "Rejected"))
+        self.assertIn(sr.approved_by, self.reviewers)
+        self.assertIsNotNone(sr.action_datetime)
+
+        # Exactly one reviewer was told they won: the one recorded on the row
+        winner = self.reviewers.index(sr.approved_by)
+        for i, messages in enumerate(results):
+            if i != winner:
+                self.assertEqual(messages, ["Request already processed."])
+        winners = [i for i, messages in enumerate(results) if "Request already processed." not in messages]
+        self.assertEqual(winners, [winner])
+
+    def test_parallel_leave_approvals(self):
+        employee = Employee.objects.create(
+            full_name="Leave Taker",
+            national_id="LT-1",
+            department="IT",
+            job_title="Engineer",
+            employment_type="Permanent",
+            salary=1000,
+            email="leave.taker@example.com",
+            phone="0",
+        )
+        leave = LeaveRequest.objects.create(
+            employee=employee,
+            leave_type="Regular",
+            start_date=date(2026, 10, 5),
+            end_date=date(2026, 10, 9),
+        )
+
+        results = self.run_parallel(
+            lambda i: transition(LeaveRequest, leave.pk, "Approved" if i % 2 else "Rejected")
+        )
+
+        self.assertEqual(results.count(True), 1)
+        leave.refresh_from_db()
+        self.assertIn(leave.status, ("Approved", "Rejected"))
+
+
+# ================================================================
+# Loan Amortization
+# ================================================================
+class LoanScheduleTests(SimpleTestCase):
+    """Every schedule repays exactly its principal, whichever engine builds it."""
+
+    TERMS = [
+        (1_000_000, 1000, 12, date(2026, 1, 15)),   # 10,000.00 at 10% over a year
+        (333_333, 1250, 7, date(2026, 2, 28)),      # odd cents, odd term
+        (500_000, 0, 3, date(2026, 3, 1)),          # interest-free
+        (12_345_678, 2399, 36, date(2025, 12, 31)),
+    ]
+
+    def assert_schedules_balance(self, schedules):
+        for (amount_c, _, term, _), schedule in zip(self.TERMS, schedules):
+            self.assertEqual(len(schedule), term)
+            self.assertEqual(sum(installment.principal_cents for installment in schedule), amount_c)
+            self.assertEqual(schedule[-1].balance_cents, 0)
+            for installment in schedule:
+                self.assertEqual(installment.payment_cents, installment.interest_cents + installment.principal_cents)
+            # Equal installments; only the last absorbs the rounding residue
+            self.assertEqual(len({installment.payment_cents for installment in schedule[:-1]}), min(1, term - 1))
+
+    def test_principal_repaid_equals_amount(self):
+        self.assert_schedules_balance(build_schedules(self.TERMS))
+
+    def test_python_fallback_matches(self):
+        original = loan_engine.np
+        loan_engine.np = None
+        try:
+            fallback = build_schedules(self.TERMS)
+        finally:
+            loan_engine.np = original
+        self.assert_schedules_balance(fallback)
+        self.assertEqual(fallback, build_schedules(self.TERMS))
+
+    def test_due_dates_are_month_ends(self):
+        schedule = build_schedules([(120_000, 0, 3, date(2026, 1, 15))])[0]
+        self.assertEqual(
+            [installment.due for installment in schedule],
+            [date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)],
+        )
+        self.assertEqual([installment.payment_cents for installment in schedule], [40_000, 40_000, 40_000])
+
+
+# ================================================================
+# Payroll Runs
+# ================================================================
+class PayrollRunTests(TestCase):
+    """Net pay deductions and resuming a run department by department."""
+
+    def make_employee(self, name, department, salary):
+        return Employee.objects.create(
+            full_name=name,
+            national_id=f"PAY-{name}",
+            department=department,
+            job_title="Staff",
+            employment_type="Permanent",
+            salary=salary,
+            email=f"{name.lower().replace(' ', '.')}@example.com",
+            phone="0",
+        )
+
+    def setUp(self):
+        self.ann = self.make_employee("Ann IT", "IT", Decimal("80000.00"))
+        self.ben = self.make_employee("Ben IT", "IT", Decimal("60000.00"))
+        self.cat = self.make_employee("Cat Finance", "Finance", Decimal("70000.00"))
+
+        # Loans are repaid from the month after they are taken
+        self.period = next_month(timezone.localdate())
+        self.loan = LoanRequest.objects.create(
+            employee=self.ann, amount=Decimal("12000.00"), repayment_period=6, status="Approved",
+        )
+
+        user = User.objects.create_user("ann", "ann@example.com", "pass")
+        user.profile.employee = self.ann
+        user.profile.save()
+        advance = SalaryAdvanceRequest.objects.create(user=user, amount=Decimal("5000.00"), status="Approved")
+        SalaryAdvanceRequest.objects.filter(pk=advance.pk).update(action_datetime=month_bounds(self.period)[0])
+
+    def test_net_pay_deducts_advances_and_loan_installments(self):
+        run, written = run_payroll(self.period)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(run.status, PayrollRun.COMPLETED)
+        installment = loan_schedules([self.loan])[self.loan.id][0].payment
+
+        payslips = {payslip.employee_id: payslip for payslip in run.payslips.all()}
+        ann = payslips[self.ann.id]
+        self.assertEqual(ann.gross_pay, Decimal("80000.00"))
+        self.assertEqual(ann.advance_recovery, Decimal("5000.00"))
+        self.assertEqual(ann.loan_installments, installment)
+        self.assertEqual(ann.net_pay, Decimal("80000.00") - Decimal("5000.00") - installment)
+        self.assertEqual(payslips[self.ben.id].net_pay, Decimal("60000.00"))
+        self.assertEqual(payslips[self.cat.id].net_pay, Decimal("70000.00"))
+
+        self.assertEqual(run.employee_count, 3)
+        self.assertEqual(run.total_net, sum(payslip.net_pay for payslip in payslips.values()))
+
+    def test_resume_by_department(self):
+        run, written = run_payroll(self.period, departments=["IT"])
+        self.assertEqual(written, 2)
+        self.assertEqual(run.status, PayrollRun.RUNNING)
+        self.assertEqual(set(run.payslips.values_list("department", flat=True)), {"IT"})
+
+        # Hired into a department that is already part-paid
+        dan = self.make_employee("Dan IT", "IT", Decimal("50000.00"))
+        run, written = run_payroll(self.period)
+        self.assertEqual(written, 2)
+        self.assertEqual(run.status, PayrollRun.COMPLETED)
+        self.assertEqual(run.employee_count, 4)
+        self.assertTrue(run.payslips.filter(employee=dan).exists())
+
+        self.assertEqual(run_payroll(self.period), (run, 0))
+
+
+# ================================================================
+# Bank Transfer Files
+# ================================================================
+class TransferFileTests(SimpleTestCase):
+    """Trailer control totals for a small fixed batch."""
+
+    ROWS = [
+        ("PAY-1", "01100", "0123456789", "Ann Njoroge", Decimal("1500.50")),
+        ("PAY-2", "03200", "ACC-0042", "Ben Otieno", Decimal("0.99")),
+        ("PAY-3", "", "", "No Bank", Decimal("100.00")),          # skipped: no bank details
+        ("PAY-4", "01100", "99999999999999999999", "Zoë Wairimu", Decimal("20000")),
+    ]
+    HASH_TOTAL = (123456789 + 42 + 99999999999999999999) % HASH_MODULUS
+
+    def records(self):
+        return list(transfer_records("PAY202610", date(2026, 10, 31), iter(self.ROWS)))
+
+    def test_trailer_count_total_and_hash(self):
+        records = self.records()
+        kind, trailer = records[-1]
+
+        self.assertEqual(kind, "T")
+        self.assertEqual([kind for kind, _ in records], ["H", "D", "D", "D", "T"])
+        self.assertEqual(trailer["count"], 3)
+        self.assertEqual(trailer["total"], 150050 + 99 + 2000000)
+        self.assertEqual(trailer["hash_total"], self.HASH_TOTAL)
+        self.assertEqual(trailer["skipped"], 1)
+
+    def test_fixed_width_lines(self):
+        lines = list(stream_fixed_width(self.records()))
+
+        for line in lines:
+            kind = line[0]
+            self.assertEqual(len(line), 1 + sum(width for _, width in LAYOUTS[kind]) + 2)
+            self.assertTrue(line.endswith("\r\n"))
+        self.assertEqual(
+            lines[-1],
+            "T" + "3".zfill(8) + "2150149".zfill(18) + str(self.HASH_TOTAL).zfill(18) + "1".zfill(8) + "\r\n",
+        )
+        self.assertIn("ZOE WAIRIMU", lines[3])
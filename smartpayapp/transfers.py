@@ -0,0 +1,178 @@
+import calendar
+import csv
+import unicodedata
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models.functions import Coalesce
+
+from .exports import Echo
+from .finance import day_start
+from .models import LoanRequest, Payslip, SalaryAdvanceRequest
+
+
+# ================================================================
+# Bank Transfer Files
+# ================================================================
+# Batch files for the bank: one header record, one detail record per
+# payment and a trailer with the control totals (record count, amount
+# in cents, hash total of account numbers, payments skipped for missing
+# bank details).
+#
+# - Rows are read with iterator() and each record is yielded as soon as
+#   it is formatted; only running totals are kept, so memory does not
+#   grow with the batch.
+# - Everything in the file comes from the data: rows are ordered by id
+#   and the header carries the batch's own value date rather than the
+#   time of export, so re-running gives byte-identical output.
+#
+# Settings:
+# - SMARTPAY_BANK_ORIGINATOR: originator name in the header, default
+#   "SMARTPAY".
+
+CHUNK_SIZE = 2000
+HASH_MODULUS = 10 ** 18
+LINE_END = "\r\n"
+
+# (record type, width) of each fixed-width field after the type letter
+HEADER_LAYOUT = [("batch_id", 20), ("value_date", 8), ("originator", 35)]
+DETAIL_LAYOUT = [
+    ("sequence", 6), ("bank_code", 10), ("account", 30),
+    ("amount", 15), ("name", 35), ("reference", 20),
+]
+TRAILER_LAYOUT = [("count", 8), ("total", 18), ("hash_total", 18), ("skipped", 8)]
+NUMERIC_FIELDS = {"sequence", "amount", "count", "total", "hash_total", "skipped"}
+
+
+def _cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal("1")))
+
+
+def _ascii(value):
+    """Fold names to ASCII so every character is one byte wide."""
+    return unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode().upper()
+
+
+def transfer_records(batch_id, value_date, rows):
+    """
+    Yield ``(kind, fields)`` records for a batch: "H", one "D" per row
+    with bank details, then "T" with the control totals.
+
+    ``rows`` yields ``(reference, bank_code, account, name, amount)``.
+    """
+    originator = getattr(settings, "SMARTPAY_BANK_ORIGINATOR", "SMARTPAY")
+    yield "H", {"batch_id": batch_id, "value_date": value_date.strftime("%Y%m%d"), "originator": originator}
+
+    count = total = hash_total = skipped = 0
+    for reference, bank_code, account, name, amount in rows:
+        if not (bank_code and account):
+            skipped += 1
+            continue
+        cents = _cents(amount)
+        count += 1
+        total += cents
+        digits = "".join(ch for ch in account if ch.isdigit())
+        hash_total = (hash_total + int(digits or 0)) % HASH_MODULUS
+        yield "D", {
+            "sequence": count,
+            "bank_code": bank_code,
+            "account": account,
+            "amount": cents,
+            "name": _ascii(name),
+            "reference": reference,
+        }
+
+    yield "T", {"count": count, "total": total, "hash_total": hash_total, "skipped": skipped}
+
+
+LAYOUTS = {"H": HEADER_LAYOUT, "D": DETAIL_LAYOUT, "T": TRAILER_LAYOUT}
+
+
+def stream_fixed_width(records):
+    """Yield fixed-width lines: numbers zero-padded, text left-justified and cut to width."""
+    for kind, fields in records:
+        line = [kind]
+        for name, width in LAYOUTS[kind]:
+            value = fields[name]
+            if name in NUMERIC_FIELDS:
+                line.append(str(value).rjust(width, "0")[-width:])
+            else:
+                line.append(str(value).ljust(width)[:width])
+        yield "".join(line) + LINE_END
+
+
+def stream_transfer_csv(records):
+    """Yield CSV lines, one per record, amounts in cents like the fixed-width file."""
+    writer = csv.writer(Echo())
+    for kind, fields in records:
+        yield writer.writerow([kind, *(fields[name] for name, _ in LAYOUTS[kind])])
+
+
+TRANSFER_FORMATS = {
+    "fixed": (stream_fixed_width, "text/plain", "txt"),
+    "csv": (stream_transfer_csv, "text/csv", "csv"),
+}
+
+
+# ================================================================
+# Batch Sources
+# ================================================================
+def payroll_batch(run):
+    """``(batch_id, value_date, rows)`` paying each positive net pay of ``run``."""
+    period = run.period
+    value_date = period.replace(day=calendar.monthrange(period.year, period.month)[1])
+    rows = (
+        (f"PAY{period:%Y%m}-{pk}", bank_code, account, name, amount)
+        for pk, bank_code, account, name, amount in Payslip.objects.filter(run=run, net_pay__gt=0)
+        .order_by("id")
+        .values_list("id", "employee__bank_code", "employee__bank_account", "full_name", "net_pay")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return f"PAY{period:%Y%m}", value_date, rows
+
+
+def advance_batch(start, end):
+    """``(batch_id, value_date, rows)`` for salary advances approved ``start``..``end``."""
+    rows = (
+        (f"ADV-{pk}", bank_code, account, name, amount)
+        for pk, bank_code, account, name, amount in SalaryAdvanceRequest.objects.filter(
+            status="Approved",
+            action_datetime__gte=day_start(start),
+            action_datetime__lt=day_start(end + timedelta(days=1)),
+        )
+        .order_by("id")
+        .values_list(
+            "id",
+            "user__profile__employee__bank_code",
+            "user__profile__employee__bank_account",
+            "user__profile__employee__full_name",
+            "amount",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return f"ADV{start:%Y%m%d}{end:%Y%m%d}", end, rows
+
+
+def loan_batch(start, end):
+    """
+    ``(batch_id, value_date, rows)`` for loans approved ``start``..``end``.
+    Loans approved before decisions were timestamped count from their request date.
+    """
+    rows = (
+        (f"LOAN-{pk}", bank_code, account, name, amount)
+        for pk, bank_code, account, name, amount in LoanRequest.objects.filter(status="Approved")
+        .annotate(decided=Coalesce("action_datetime", "created_at"))
+        .filter(decided__gte=day_start(start), decided__lt=day_start(end + timedelta(days=1)))
+        .order_by("id")
+        .values_list("id", "employee__bank_code", "employee__bank_account", "employee__full_name", "amount")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return f"LOAN{start:%Y%m%d}{end:%Y%m%d}", end, rows
+
+
+def stream_transfer_file(batch, file_format="fixed"):
+    """Yield the lines of ``batch`` (from one of the *_batch functions) in ``file_format``."""
+    batch_id, value_date, rows = batch
+    stream = TRANSFER_FORMATS[file_format][0]
+    return stream(transfer_records(batch_id, value_date, rows))
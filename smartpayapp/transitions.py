@@ -0,0 +1,74 @@
+from django.db import connections, transaction
+from django.db.models.sql import UpdateQuery
+from django.dispatch import Signal
+
+
+# ================================================================
+# Status Transitions (compare-and-set)
+# ================================================================
+# Approvals used to load a row, check ``status == "Pending"`` in Python
+# and save() every column, so two reviewers clicking at once both
+# "won". A transition is now a single conditional UPDATE: the status
+# check happens in the WHERE clause and ``RETURNING`` says which rows
+# this caller won. Backends without UPDATE ... RETURNING lock the rows
+# still in the source status (SELECT ... FOR UPDATE) and update exactly
+# those. Only the status and the columns passed in are written.
+
+PENDING = "Pending"
+
+# Sent right after the UPDATE with ``pks`` (the rows that moved) and
+# ``to_status``. Receivers run in the caller's transaction, so callers
+# that need a read model to commit with the transition wrap the call in
+# transaction.atomic().
+status_changed = Signal()
+
+
+def _can_update_returning(alias):
+    connection = connections[alias]
+    if connection.vendor == "postgresql":
+        return True
+    # SQLite gained RETURNING in 3.35, together with INSERT ... RETURNING
+    return connection.vendor == "sqlite" and connection.features.can_return_columns_from_insert
+
+
+def _update_returning_pks(queryset, values):
+    """Run ``queryset.update(**values)`` as UPDATE ... RETURNING; return the pks written."""
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    connection = connections[queryset.db]
+    pk_column = connection.ops.quote_name(queryset.model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {pk_column}", params)
+        return sorted(pk for pk, in cursor.fetchall())
+
+
+def transition(model, pk, to_status, from_status=PENDING, **changes):
+    """
+    Move one ``model`` row from ``from_status`` to ``to_status``.
+
+    ``changes`` are extra columns to set in the same UPDATE (e.g.
+    ``approved_by``, ``action_datetime``). Returns True if this call made
+    the transition, False if the row is gone or no longer in
+    ``from_status``.
+    """
+    return bool(transition_many(model, [pk], to_status, from_status, **changes))
+
+
+def transition_many(model, pks, to_status, from_status=PENDING, **changes):
+    """
+    Move every row in ``pks`` still in ``from_status`` to ``to_status``,
+    then send ``status_changed`` if any row moved.
+    Returns the list of pks this call transitioned.
+    """
+    pending = model.objects.filter(pk__in=pks, status=from_status)
+    with transaction.atomic(using=pending.db):
+        if _can_update_returning(pending.db):
+            moved = _update_returning_pks(pending, {"status": to_status, **changes})
+        else:
+            moved = list(pending.select_for_update().order_by("pk").values_list("pk", flat=True))
+            if moved:
+                model.objects.filter(pk__in=moved, status=from_status).update(status=to_status, **changes)
+        if moved:
+            status_changed.send(sender=model, pks=moved, to_status=to_status)
+    return moved
@@ -28,6 +28,9 @@ from .views import (
     hr_home, 
     approve_salary_request,
     reject_salary_request,
+    bulk_salary_request_action,
+    bulk_loan_request_action,
+    bank_transfer_file,
     hr_departments, 
     payroll_payslips,
     hr_track_performance,
@@ -42,6 +45,11 @@ from .views import (
     hr_profile,
     checkin_checkout,
     attendance_action,
+    attendance_batch_action,
+    kiosk_directory,
+    kiosk_punch,
+    attendance_overview_data,
+    attendance_stream,
     attendance_history,
     reject_leave,
     approve_leave, 
@@ -112,11 +120,19 @@ urlpatterns = [
     path('finance/requests/', finance_salary_request, name='finance_salary_request'),
     path('finance/requests/<int:pk>/approve/', approve_salary_request, name='approve_salary_request'),
     path('finance/requests/<int:pk>/reject/', reject_salary_request, name='reject_salary_request'),
+    path('finance/requests/bulk/', bulk_salary_request_action, name='bulk_salary_request_action'),
+    path('finance/loans/bulk/', bulk_loan_request_action, name='bulk_loan_request_action'),
+    path('finance/transfers/', bank_transfer_file, name='bank_transfer_file'),
 
 
     path('checkin_checkout/', checkin_checkout, name='checkin_checkout'),
     path('attendance_action/', attendance_action, name='attendance_action'),
+    path('attendance_action/batch/', attendance_batch_action, name='attendance_batch_action'),
+    path('kiosk/directory/', kiosk_directory, name='kiosk_directory'),
+    path('kiosk/punch/', kiosk_punch, name='kiosk_punch'),
     path('attendance_history/', attendance_history, name='attendance_history'),
+    path('attendance_overview_data/', attendance_overview_data, name='attendance_overview_data'),
+    path('attendance_stream/', attendance_stream, name='attendance_stream'),
     path('leave/approve/<int:leave_id>/', approve_leave, name='approve_leave'),
     path('leave/reject/<int:leave_id>/', reject_leave, name='reject_leave'),
     path("leave/<int:leave_id>/", hr_leave_details, name="hr_leave_details"),
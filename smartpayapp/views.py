@@ -5,19 +5,60 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 
 from .forms import SignUpForm, SalaryAdvanceForm, EmployeeForm, ProfileUpdateForm, LoanRequestForm
-from .models import Profile, SalaryAdvanceRequest, Employee, LoanRequest, ChatMessage, SupportChatMessage, Attendance, LeaveRequest, EmployeeLeaveBalance
+from .models import Profile, SalaryAdvanceRequest, Employee, LoanRequest, ChatMessage, SupportChatMessage, Attendance, AttendanceStatus, LeaveRequest, EmployeeLeaveBalance, MonthlyAttendanceSummary, EmployeeExposure, PayrollRun, month_start
 from .decorators import admin_required
+from .changefeed import changed_since
+from .workcalendar import get_work_calendar
+from .pubsub import ATTENDANCE_CHANNEL, attendance_event, get_backend as get_pubsub_backend
+from .kiosk import get_staff_directory
+from .transitions import transition
+from .loans import annotate_loan_positions
+from .kpis import get_finance_kpis
+from .payroll import payslip_department_totals, payslip_page, run_payroll
+from .payslips import stream_payslip_archive
+from .transfers import TRANSFER_FORMATS, advance_batch, loan_batch, payroll_batch, stream_transfer_file
+from .finance import (
+    BULK_DECISIONS,
+    BULK_LIMIT,
+    STATUS_ORDER,
+    bulk_decide_loan_requests,
+    bulk_decide_salary_requests,
+    filter_salary_requests,
+    loan_portfolio_totals,
+    loan_request_queue,
+    parse_filter_date,
+    salary_department_totals,
+    salary_request_queue,
+)
+from .exports import STREAM_FORMATS, ATTENDANCE_EXPORT_FIELDS, attendance_export_rows
+from .attendance import (
+    build_department_roster,
+    checked_in_count,
+    employees_with_attendance,
+    evaluate_attendance,
+    punch_payload,
+    process_punch_batch,
+)
+from .surge import submit_punch
 from decimal import Decimal
-from django.db.models import Sum, Q, Max, Count, Case, When, Value, IntegerField
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Q, Max, Count, Case, When, Value, IntegerField, Prefetch
 from django.utils import timezone
 
 from collections import OrderedDict, defaultdict
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse, HttpResponseNotModified
+from django.utils.dateparse import parse_date
+from django.urls import reverse
+from django.utils.text import slugify
 
 from datetime import datetime, time, date, timedelta
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
+import asyncio
+import hmac
 import json
 
 # ================================================================
@@ -139,8 +180,9 @@ def home(request):
 
     if employee and employee.salary is not None:
         salary = employee.salary
+        exposure = EmployeeExposure.for_employee(employee)
         current_salary = f"KSh {salary:,.2f}"
-        advance_eligibility = f"Eligible — Up to KSh {float(salary) * 0.5:,.2f}"
+        advance_eligibility = f"Eligible — Up to KSh {exposure.advance_headroom:,.2f}"
 
         # Salary advances linked to the user
         salary_advances = SalaryAdvanceRequest.objects.filter(
@@ -152,17 +194,15 @@ def home(request):
                 float(salary) - float(advance.amount) if advance.status == "Approved" else float(salary)
             )
 
-        # Internal loan requests
-        internal_loans = LoanRequest.objects.filter(
-            employee=employee
-        ).order_by("-created_at")
-
-        for loan in internal_loans:
-            loan.repayment_progress = 70 if loan.status == "Approved" else 0
+        # Internal loan requests with repayment position from their schedules
+        internal_loans = annotate_loan_positions(
+            LoanRequest.objects.filter(employee=employee).order_by("-created_at")
+        )
 
-        active_loans = LoanRequest.objects.filter(
-            employee=employee, status="Approved"
-        ).aggregate(total=Sum("amount"))["total"] or 0
+        active_loans = sum(
+            (loan.outstanding_balance for loan in internal_loans if loan.status == "Approved"),
+            Decimal("0.00"),
+        )
 
     context = {
         "profile": profile,
@@ -240,13 +280,14 @@ def internal_loan(request):
     Employee internal loan request.
 
     - Validates and saves a loan request for logged-in employee.
-    - Displays loan eligibility and active loans.
+    - Displays loan eligibility and active loans from EmployeeExposure.
     """
     profile = request.user.profile
     employee = profile.employee
+    exposure = EmployeeExposure.for_employee(employee)
 
     if request.method == "POST":
-        form = LoanRequestForm(request.POST, employee=employee)
+        form = LoanRequestForm(request.POST, employee=employee, exposure=exposure)
         if form.is_valid():
             loan = form.save(commit=False)
             loan.employee = employee
@@ -254,13 +295,11 @@ def internal_loan(request):
             messages.success(request, "Loan request submitted successfully.")
             return redirect("internal_loan_success")
     else:
-        form = LoanRequestForm(employee=employee)
+        form = LoanRequestForm(employee=employee, exposure=exposure)
 
     monthly_salary = employee.salary
-    max_loan = monthly_salary * 2
-    active_loans = LoanRequest.objects.filter(
-        employee=employee, status="Approved"
-    ).aggregate(total=Sum("amount"))["total"] or 0
+    max_loan = exposure.loan_headroom
+    active_loans = exposure.approved_loan_principal
 
     return render(
         request,
@@ -344,9 +383,14 @@ def admin_dashboard(request):
 
 @login_required
 def finance(request):
-    """Finance landing page/dashboard with dynamic KPI counts and finance officer details."""
-    # Count pending salary requests
-    pending_requests_count = SalaryAdvanceRequest.objects.filter(status="Pending").count()
+    """
+    Finance landing page/dashboard.
+
+    - KPIs (pending/approved amounts, this month's disbursements,
+      per-department totals, loan book) come from the cached KPI service.
+    - Finance officer details for the greeting.
+    """
+    kpis = get_finance_kpis()
 
     # Get the finance officer's profile and linked employee info
     profile = Profile.objects.filter(user=request.user).select_related("employee").first()
@@ -355,10 +399,15 @@ def finance(request):
         finance_user = profile.employee
 
     context = {
-        "pending_salary_requests": pending_requests_count,
+        "pending_salary_requests": kpis["advances"]["pending_count"],
+        "approved_loans_count": kpis["loans"]["approved_count"],
+        "pending_loans_count": kpis["loans"]["pending_count"],
+        "loan_book": kpis["loan_book"],
+        "kpis": kpis,
         "finance_user": finance_user,
         "current_date": timezone.now().strftime("%B %d, %Y"),
         "current_time": timezone.now().strftime("%I:%M %p"),
+        "current_month_name": timezone.localdate().strftime("%B"),
     }
     return render(request, "smartpayapp/finance.html", context)
 
@@ -367,24 +416,57 @@ def finance(request):
 @login_required
 def finance_salary_request(request):
     """
-    Finance salary request management page.
-    - Groups requests by staff department for cleaner readability.
+    Finance salary request work queue.
+    - Filters: ?status=, ?start=/?end= (YYYY-MM-DD), ?department=.
+    - Pending requests first; keyset-paginated with ?cursor=.
+    - Per-department counts and totals from one GROUP BY query.
+    - Groups the current page by staff department for readability.
     """
-    salary_requests = SalaryAdvanceRequest.objects.select_related(
-        "user__profile__employee"
-    ).order_by("-date_requested")
+    status = request.GET.get("status", "")
+    filters = {
+        "status": status if status in STATUS_ORDER else None,
+        "start": parse_filter_date(request.GET.get("start")),
+        "end": parse_filter_date(request.GET.get("end")),
+    }
+    department = request.GET.get("department", "").strip() or None
+
+    department_totals = salary_department_totals(filter_salary_requests(**filters))
+    rows, next_cursor = salary_request_queue(
+        {**filters, "department": department}, cursor=request.GET.get("cursor")
+    )
 
     grouped = OrderedDict()
-    for sr in salary_requests:
+    for sr in rows:
         dept = "Unassigned"
         emp = getattr(getattr(sr.user, "profile", None), "employee", None)
         if emp and getattr(emp, "department", None):
             dept = emp.department
         grouped.setdefault(dept, []).append(sr)
 
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query["cursor"] = next_cursor
+        next_query = query.urlencode()
+
+    if department:
+        total_requests = department_totals.get(department, {}).get("count", 0)
+    else:
+        total_requests = sum(totals["count"] for totals in department_totals.values())
+
     context = {
         "grouped_requests": grouped,
-        "total_requests": salary_requests.count(),
+        "total_requests": total_requests,
+        "department_totals": department_totals,
+        "statuses": STATUS_ORDER,
+        "filters": {
+            "status": filters["status"] or "",
+            "start": request.GET.get("start", ""),
+            "end": request.GET.get("end", ""),
+            "department": department or "",
+        },
+        "next_query": next_query,
+        "is_first_page": not request.GET.get("cursor"),
     }
     return render(request, "smartpayapp/finance_salary_requests.html", context)
 
@@ -396,7 +478,7 @@ def approve_salary_request(request, pk):
         messages.error(request, "Invalid request method.")
         return redirect('finance_salary_request')
 
-    sr = get_object_or_404(SalaryAdvanceRequest, pk=pk)
+    sr = get_object_or_404(SalaryAdvanceRequest.objects.select_related("user"), pk=pk)
 
     emp = getattr(getattr(request.user, "profile", None), "employee", None)
     role_name = getattr(emp, "role", "").lower() if emp else None
@@ -405,15 +487,18 @@ def approve_salary_request(request, pk):
         messages.error(request, "Permission denied. Only finance officers can approve requests.")
         return redirect('finance_salary_request')
 
-    if sr.status != "Pending":
+    # Compare-and-set: only one reviewer can move it out of Pending.
+    # Atomic so the exposure refresh commits (or rolls back) with it.
+    with transaction.atomic():
+        processed = transition(
+            SalaryAdvanceRequest, sr.pk, "Approved",
+            approved_by=request.user,  # record finance officer
+            action_datetime=timezone.now(),  # record date/time
+        )
+    if not processed:
         messages.warning(request, "Request already processed.")
         return redirect('finance_salary_request')
 
-    sr.status = "Approved"
-    sr.approved_by = request.user  # record finance officer
-    sr.action_datetime = timezone.now()  # record date/time
-    sr.save()
-
     messages.success(request, f"Salary request for {sr.user.get_full_name() or sr.user.username} approved.")
     return redirect('finance_salary_request')
 
@@ -423,7 +508,7 @@ def reject_salary_request(request, pk):
         messages.error(request, "Invalid request method.")
         return redirect('finance_salary_request')
 
-    sr = get_object_or_404(SalaryAdvanceRequest, pk=pk)
+    sr = get_object_or_404(SalaryAdvanceRequest.objects.select_related("user"), pk=pk)
 
     emp = getattr(getattr(request.user, "profile", None), "employee", None)
     role_name = getattr(emp, "role", "").lower() if emp else None
@@ -432,26 +517,167 @@ def reject_salary_request(request, pk):
         messages.error(request, "Permission denied. Only finance officers can reject requests.")
         return redirect('finance_salary_request')
 
-    if sr.status != "Pending":
+    # Compare-and-set: only one reviewer can move it out of Pending.
+    # Atomic so the exposure refresh commits (or rolls back) with it.
+    with transaction.atomic():
+        processed = transition(
+            SalaryAdvanceRequest, sr.pk, "Rejected",
+            approved_by=request.user,  # record finance officer
+            action_datetime=timezone.now(),  # record date/time
+        )
+    if not processed:
         messages.warning(request, "Request already processed.")
         return redirect('finance_salary_request')
 
-    sr.status = "Rejected"
-    sr.approved_by = request.user  # record finance officer
-    sr.action_datetime = timezone.now()  # record date/time
-    sr.save()
-
     messages.success(request, f"Salary request for {sr.user.get_full_name() or sr.user.username} rejected.")
     return redirect('finance_salary_request')
 
 
+def _bulk_request_action(request, decide, noun):
+    """Body of the bulk approve/reject endpoints; ``decide`` is a bulk_decide_* function."""
+    emp = getattr(getattr(request.user, "profile", None), "employee", None)
+    role_name = getattr(emp, "role", "").lower() if emp else None
+
+    if not (request.user.is_superuser or role_name == "finance"):
+        return JsonResponse({"status": "error", "message": f"Permission denied. Only finance officers can process {noun}."}, status=403)
+
+    try:
+        data = json.loads(request.body)
+        action = data.get("action")
+        ids = data.get("ids")
+    except (ValueError, AttributeError):
+        ids = None
+    # A JSON list of integers only: a string would be read digit by digit
+    # and bools are ints in Python
+    if not (isinstance(ids, list) and all(type(pk) is int for pk in ids)):
+        return JsonResponse({"status": "error", "message": "Expected JSON with an action and a list of ids"}, status=400)
+
+    if action not in BULK_DECISIONS:
+        return JsonResponse({"status": "error", "message": "Invalid action"}, status=400)
+    if not ids or len(ids) > BULK_LIMIT:
+        return JsonResponse({"status": "error", "message": f"Send between 1 and {BULK_LIMIT} ids"}, status=400)
+
+    result = decide(ids, action, request.user)
+    return JsonResponse({"status": "success", "new_status": BULK_DECISIONS[action], **result})
+
+
+@login_required
+@require_POST
+def bulk_salary_request_action(request):
+    """
+    Approve or reject many salary advances in one call.
+
+    Expects JSON: {"action": "approve" | "reject", "ids": [1, 2, ...]}.
+    Returns the ids updated, those already processed (with their status)
+    and unknown ids, so the list can update in place.
+    """
+    return _bulk_request_action(request, bulk_decide_salary_requests, "requests")
+
+
+@login_required
+@require_POST
+def bulk_loan_request_action(request):
+    """Approve or reject many loan requests in one call (same JSON as bulk_salary_request_action)."""
+    return _bulk_request_action(request, bulk_decide_loan_requests, "loans")
+
+
+@login_required
+def bank_transfer_file(request):
+    """
+    Download a bank transfer batch file.
+
+    - ?source=payroll&period=YYYY-MM: net pay of that payroll run.
+    - ?source=advances|loans&start=&end= (YYYY-MM-DD): approved
+      advances / loans in the date range.
+    - ?format=fixed (default) or csv.
+    """
+    emp = getattr(getattr(request.user, "profile", None), "employee", None)
+    role_name = getattr(emp, "role", "").lower() if emp else None
+
+    if not (request.user.is_superuser or role_name == "finance"):
+        return JsonResponse({"status": "error", "message": "Permission denied. Only finance officers can export transfers."}, status=403)
+
+    file_format = request.GET.get("format", "fixed")
+    if file_format not in TRANSFER_FORMATS:
+        return JsonResponse({"status": "error", "message": "Invalid format"}, status=400)
+
+    source = request.GET.get("source")
+    try:
+        if source == "payroll":
+            period = parse_date(f"{request.GET.get('period', '')}-01")
+            run = PayrollRun.objects.filter(period=period, status=PayrollRun.COMPLETED).first() if period else None
+            if run is None:
+                return JsonResponse({"status": "error", "message": "No completed payroll run for that period"}, status=404)
+            batch = payroll_batch(run)
+        elif source in ("advances", "loans"):
+            start = parse_date(request.GET.get("start", ""))
+            end = parse_date(request.GET.get("end", ""))
+            if not (start and end) or start > end:
+                return JsonResponse({"status": "error", "message": "Expected start and end dates (YYYY-MM-DD)"}, status=400)
+            batch = (advance_batch if source == "advances" else loan_batch)(start, end)
+        else:
+            return JsonResponse({"status": "error", "message": "Invalid source"}, status=400)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid date"}, status=400)
+
+    _, content_type, extension = TRANSFER_FORMATS[file_format]
+    response = StreamingHttpResponse(stream_transfer_file(batch, file_format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{batch[0]}.{extension}"'
+    return response
+
+
 
 
 
 @login_required
 def finance_internal_loan_request(request):
-    """Finance internal loan request management page."""
-    return render(request, "smartpayapp/finance_internal_loan_request.html")
+    """
+    Finance loan work queue and portfolio.
+    - Filters: ?status=, ?start=/?end= (YYYY-MM-DD), ?department=, ?term= (months).
+    - Pending loans first; keyset-paginated with ?cursor=.
+    - Breakdowns by status, department, month and repayment period,
+      summed from LoanPortfolioMonth (partial edge months of a date
+      filter are aggregated live).
+    - Each row carries its outstanding balance and percent repaid from
+      the amortization engine (one cached schedule lookup per page).
+    - Pending rows can be approved or rejected in bulk.
+    """
+    status = request.GET.get("status", "")
+    term = request.GET.get("term", "")
+    filters = {
+        "status": status if status in STATUS_ORDER else None,
+        "start": parse_filter_date(request.GET.get("start")),
+        "end": parse_filter_date(request.GET.get("end")),
+        "department": request.GET.get("department", "").strip() or None,
+        "repayment_period": int(term) if term.isdigit() else None,
+    }
+
+    portfolio = loan_portfolio_totals(filters)
+    loans, next_cursor = loan_request_queue(filters, cursor=request.GET.get("cursor"))
+    loans = annotate_loan_positions(loans)
+
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query["cursor"] = next_cursor
+        next_query = query.urlencode()
+
+    context = {
+        "loans": loans,
+        "portfolio": portfolio,
+        "statuses": STATUS_ORDER,
+        "departments": [code for code, _ in Employee.DEPARTMENTS],
+        "filters": {
+            "status": filters["status"] or "",
+            "start": request.GET.get("start", ""),
+            "end": request.GET.get("end", ""),
+            "department": filters["department"] or "",
+            "term": filters["repayment_period"] or "",
+        },
+        "next_query": next_query,
+        "is_first_page": not request.GET.get("cursor"),
+    }
+    return render(request, "smartpayapp/finance_internal_loan_request.html", context)
 
 
 
@@ -612,10 +838,7 @@ def hr_home(request):
     total_employees = Employee.objects.count()
     total_departments = Employee.objects.values("department").distinct().count()
 
-    employees_checked_in_today = Attendance.objects.filter(
-        date=today,
-        clock_in__isnull=False
-    ).count()
+    employees_checked_in_today = checked_in_count(today)
 
     recent_employees = Employee.objects.filter(
         date_joined__year=current_year,
@@ -663,8 +886,80 @@ def hr_departments(request):
 
 @login_required
 def payroll_payslips(request):
-    """Placeholder view for Payroll & Payslips (UI stub)."""
-    return render(request, 'smartpayapp/payroll_payslips.html')
+    """
+    Payroll runs and payslips.
+
+    - GET: the run for ?period=YYYY-MM (default: this month) with
+      per-department totals and a page of payslips (?department=,
+      ?after= cursor).
+    - POST action=run: compute or resume the run for the period,
+      optionally for one department only.
+    - GET action=download: stream the run's payslip documents as a zip.
+    - Finance officers (and superusers) only.
+    """
+    emp = getattr(getattr(request.user, "profile", None), "employee", None)
+    role_name = getattr(emp, "role", "").lower() if emp else None
+
+    if not (request.user.is_superuser or role_name == "finance"):
+        return HttpResponseForbidden("Only finance officers can view or run payroll.")
+
+    try:
+        period = parse_date(f"{request.GET.get('period') or request.POST.get('period') or ''}-01")
+    except ValueError:
+        period = None
+    period = month_start(period or timezone.localdate())
+    department = (request.GET.get("department") or request.POST.get("department") or "").strip() or None
+
+    if request.method == "POST" and request.POST.get("action") == "run":
+        run, written = run_payroll(
+            period,
+            departments=[department] if department else None,
+            user=request.user,
+        )
+        if written:
+            messages.success(request, f"Computed {written} payslips for {period:%B %Y}.")
+        else:
+            messages.info(request, f"Nothing left to compute for {period:%B %Y}.")
+        return redirect(f"{reverse('payroll_payslips')}?period={period:%Y-%m}")
+
+    run = PayrollRun.objects.filter(period=period).first()
+
+    if request.GET.get("action") == "download":
+        if run is None or run.status != PayrollRun.COMPLETED:
+            messages.error(request, f"No completed payroll run for {period:%B %Y}.")
+            return redirect(f"{reverse('payroll_payslips')}?period={period:%Y-%m}")
+        filename = f"payslips-{period:%Y-%m}{'-' + slugify(department) if department else ''}.zip"
+        response = StreamingHttpResponse(stream_payslip_archive(run, department), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    payslips, next_after, totals = [], None, []
+    if run:
+        totals = payslip_department_totals(run)
+        try:
+            after = int(request.GET.get("after") or 0) or None
+        except ValueError:  # malformed cursor: start from the first page
+            after = None
+        payslips, next_after = payslip_page(run, department, after)
+
+    next_query = None
+    if next_after:
+        query = request.GET.copy()
+        query["after"] = next_after
+        next_query = query.urlencode()
+
+    context = {
+        "period": period,
+        "run": run,
+        "runs": PayrollRun.objects.select_related("started_by")[:12],
+        "department_totals": totals,
+        "departments": [code for code, _ in Employee.DEPARTMENTS],
+        "selected_department": department or "",
+        "payslips": payslips,
+        "next_query": next_query,
+        "is_first_page": not request.GET.get("after"),
+    }
+    return render(request, 'smartpayapp/payroll_payslips.html', context)
 
 @login_required
 def hr_track_performance(request):
@@ -735,42 +1030,37 @@ def approve_leave(request, leave_id):
     Approve a leave request:
     - HR can specify partial approval by setting leave.start_date and leave.end_date
     - System dynamically calculates total approved days and sets approved_at
-    - Resumption date is next working day after leave ends (skip Sundays)
+    - Resumption date is next working day after leave ends (WorkCalendar)
     """
-    leave = get_object_or_404(LeaveRequest, id=leave_id)
+    leave = get_object_or_404(LeaveRequest.objects.select_related("employee"), id=leave_id)
     employee = leave.employee
 
-    if leave.status != "Pending":
-        messages.warning(request, "Leave already processed.")
-        return redirect("hr_home")
-
     # Calculate approved leave days dynamically
     if leave.end_date < leave.start_date:
         messages.error(request, "End date cannot be before start date.")
         return redirect("hr_home")
 
-    approved_days = (leave.end_date - leave.start_date).days + 1
-    leave.total_days = approved_days
-    leave.status = "Approved"
-    leave.approved_at = timezone.now()
-
-    # Calculate resumption date
-    resumption_date = leave.end_date + timedelta(days=1)
-    if resumption_date.weekday() == 6:  # Sunday
-        resumption_date += timedelta(days=1)  # Skip to Monday
-    leave.resumption_date = resumption_date
+    approved_days = leave.total_days
 
-    # Clear rejected fields if any
-    leave.rejected_at = None
-
-    leave.save()
+    with transaction.atomic():
+        processed = transition(
+            LeaveRequest, leave.pk, "Approved",
+            approved_at=timezone.now(),
+            # Calculate resumption date
+            resumption_date=get_work_calendar().next_working_day(leave.end_date, employee.department),
+            # Clear rejected fields if any
+            rejected_at=None,
+        )
+        if not processed:
+            messages.warning(request, "Leave already processed.")
+            return redirect("hr_home")
 
-    # Deduct leave balance only for approved days
-    leave_balance, _ = EmployeeLeaveBalance.objects.get_or_create(employee=employee)
-    try:
-        leave_balance.deduct_leave(leave.leave_type, leave.total_days)
-    except Exception:
-        pass  # handle LeaveType mismatch if necessary
+        # Deduct leave balance only for approved days (once, by the winning reviewer)
+        leave_balance, _ = EmployeeLeaveBalance.objects.get_or_create(employee=employee)
+        try:
+            leave_balance.deduct_leave(leave.leave_type, approved_days)
+        except Exception:
+            pass  # handle LeaveType mismatch if necessary
 
     messages.success(request, f"{employee.full_name}'s leave approved ({approved_days} days).")
     return redirect("hr_home")
@@ -784,22 +1074,20 @@ def reject_leave(request, leave_id):
     - System sets rejected_at timestamp
     - HR cannot modify this timestamp
     """
-    leave = get_object_or_404(LeaveRequest, id=leave_id)
-
-    if leave.status != "Pending":
+    leave = get_object_or_404(LeaveRequest.objects.select_related("employee"), id=leave_id)
+
+    with transaction.atomic():
+        processed = transition(
+            LeaveRequest, leave.pk, "Rejected",
+            rejected_at=timezone.now(),
+            # Clear approved fields if any
+            approved_at=None,
+            resumption_date=None,
+        )
+    if not processed:
         messages.warning(request, "Leave already processed.")
         return redirect("hr_home")
 
-    leave.status = "Rejected"
-    leave.rejected_at = timezone.now()
-
-    # Clear approved fields if any
-    leave.approved_at = None
-    leave.resumption_date = None
-    leave.total_days = 0
-
-    leave.save()
-
     messages.success(request, f"{leave.employee.full_name}'s leave rejected.")
     return redirect("hr_home")
 
@@ -813,17 +1101,30 @@ def update_leave_status(request):
         leave_id = data.get("leave_id")
         action = data.get("action")
 
-        leave = get_object_or_404(LeaveRequest, id=leave_id)
+        leave = get_object_or_404(LeaveRequest.objects.select_related("employee"), id=leave_id)
         now = timezone.now()
 
         if action == "approve":
-            leave.status = "Approved"
-            leave.approved_at = now
-            leave.resumption_date = leave.end_date + timedelta(days=1)
+            changes = {
+                "approved_at": now,
+                "resumption_date": get_work_calendar().next_working_day(
+                    leave.end_date, leave.employee.department
+                ),
+            }
+            status = "Approved"
         elif action == "reject":
-            leave.status = "Rejected"
-            leave.rejected_at = now
-        leave.save()
+            changes = {"rejected_at": now}
+            status = "Rejected"
+        else:
+            return JsonResponse({"success": False, "message": "Invalid action"}, status=400)
+
+        with transaction.atomic():
+            processed = transition(LeaveRequest, leave.pk, status, **changes)
+        if not processed:
+            return JsonResponse({"success": False, "message": "Leave already processed"}, status=409)
+        leave.status = status
+        for field, value in changes.items():
+            setattr(leave, field, value)
 
         return JsonResponse({
             "success": True,
@@ -917,32 +1218,41 @@ def hr_leave_management(request):
 
 def update_annual_leave(request, leave_id):
     """HR can approve or reject annual leave"""
-    leave = get_object_or_404(LeaveRequest, id=leave_id)
+    leave = get_object_or_404(LeaveRequest.objects.select_related("employee"), id=leave_id)
 
     if request.method == "POST":
         action = request.POST.get("action")
 
         if action == "approve":
-            leave.status = "Approved"
-            leave.approved_at = timezone.now()
-            leave.rejected_at = None
+            with transaction.atomic():
+                processed = transition(
+                    LeaveRequest, leave.pk, "Approved",
+                    approved_at=timezone.now(),
+                    rejected_at=None,
+                    # Calculate resumption date (next working day)
+                    resumption_date=get_work_calendar().next_working_day(
+                        leave.end_date, leave.employee.department
+                    ),
+                )
+            if processed:
+                messages.success(request, f" {leave.employee.full_name}'s annual leave has been approved.")
 
-            # Calculate resumption date (skip Sundays)
-            resumption = leave.end_date + timedelta(days=1)
-            while resumption.weekday() == 6:
-                resumption += timedelta(days=1)
-            leave.resumption_date = resumption
+        elif action == "reject":
+            with transaction.atomic():
+                processed = transition(
+                    LeaveRequest, leave.pk, "Rejected",
+                    rejected_at=timezone.now(),
+                    approved_at=None,
+                    resumption_date=None,
+                )
+            if processed:
+                messages.error(request, f" {leave.employee.full_name}'s annual leave has been rejected.")
 
-            leave.save()
-            messages.success(request, f" {leave.employee.full_name}'s annual leave has been approved.")
+        else:
+            processed = True
 
-        elif action == "reject":
-            leave.status = "Rejected"
-            leave.rejected_at = timezone.now()
-            leave.approved_at = None
-            leave.resumption_date = None
-            leave.save()
-            messages.error(request, f" {leave.employee.full_name}'s annual leave has been rejected.")
+        if not processed:
+            messages.warning(request, "Leave already processed.")
 
         return redirect("hr_annual_leaves")
 
@@ -1050,48 +1360,7 @@ def checkin_checkout(request):
     # ------------------------------------------------------------
     # Fetch employees grouped by department with today's attendance
     # ------------------------------------------------------------
-    employees = Employee.objects.all().order_by("department", "full_name")
-    departments = defaultdict(list)
-    today = now.date()
-
-    for emp in employees:
-        # Get today’s attendance record (create if doesn’t exist)
-        attendance, _ = Attendance.objects.get_or_create(
-            employee=emp,
-            date=today,
-            defaults={"status": "Not Checked In"}
-        )
-
-        # Determine display status
-        if attendance.clock_in and not attendance.clock_out:
-            if attendance.late_minutes > 30:
-                status_label = "Checked In (Late – Explanation Required)"
-            elif 0 < attendance.late_minutes <= 30:
-                status_label = f"Checked In (Late: {attendance.late_minutes} min)"
-            else:
-                status_label = "Checked In"
-        elif attendance.clock_in and attendance.clock_out:
-            status_label = f"Checked Out ({attendance.hours_worked or 0} hrs)"
-        else:
-            status_label = "Not Checked In"
-
-        # Attach fields for table rendering
-        emp.attendance_status = status_label
-        emp.attendance_record = attendance
-        emp.hours_worked = attendance.hours_worked or 0
-
-        # Group by department
-        departments[emp.department].append(emp)
-
-        for emp in employees:
-            attendance = Attendance.objects.filter(employee=emp, date=today).first()
-            if attendance:
-                emp.attendance_status = attendance.status or "Not Checked In"
-                emp.attendance_record = attendance
-            else:
-                emp.attendance_status = "Not Checked In"
-                emp.attendance_record = None
-
+    departments, employees = build_department_roster(now.date())
 
     # ------------------------------------------------------------
     # Render template
@@ -1100,8 +1369,14 @@ def checkin_checkout(request):
         "current_date": current_date,
         "current_time": current_time,
         "greeting": greeting,
-        "departments": dict(departments),
-        "emps": employees, 
+        "departments": departments,
+        "emps": employees,
+        # Live board updates only when the stream can actually be served
+        "live_stream_url": (
+            reverse("attendance_stream")
+            if live_stream_available(request) and request.user.is_authenticated
+            else None
+        ),
     }
 
     return render(request, "smartpayapp/checkin_checkout.html", context)
@@ -1115,12 +1390,13 @@ def checkin_checkout(request):
 @csrf_exempt
 def attendance_action(request):
     """
-    Handles AJAX Clock-In / Clock-Out actions and updates Attendance records.
+    Handles AJAX Clock-In / Clock-Out actions.
 
     Features:
-    - Determines lateness and early departures.
-    - Updates 'status', 'late_minutes', 'needs_explanation', and 'hours_worked'.
-    - Returns a JSON response for frontend dynamic table updates.
+    - Validates the punch against the employee's effective attendance.
+    - Appends a ClockEvent; Attendance is updated later by the reconciler.
+    - In surge mode the ClockEvent is queued and bulk-written in the background.
+    - Returns the evaluated status as JSON for frontend dynamic table updates.
     """
 
     # -------------------------------
@@ -1141,101 +1417,159 @@ def attendance_action(request):
         return JsonResponse({"status": "error", "message": "Employee not found"})
 
     # -------------------------------
-    # Setup base time references
+    # Append the punch to the clock event log
+    # (buffered during the morning surge)
     # -------------------------------
     now = timezone.localtime(timezone.now())
-    today = now.date()
-    now_time = now.time()
-
-    # Working hours setup
-    weekday = today.weekday()  # Monday = 0, Sunday = 6
-    if weekday < 5:  # Monday–Friday
-        start_time = time(8, 0)
-        end_time = time(17, 0)
-    elif weekday == 5:  # Saturday
-        start_time = time(8, 0)
-        end_time = time(13, 0)
-    else:
-        return JsonResponse({"status": "error", "message": "Non-working day"})
+    attendance, error = submit_punch(employee, action, now)
+    if error:
+        return JsonResponse({"status": "error", "message": error})
 
-    # -------------------------------
-    # Get or create attendance record
-    # -------------------------------
-    attendance, _ = Attendance.objects.get_or_create(employee=employee, date=today)
+    return JsonResponse(punch_payload(attendance, action))
 
-    # -------------------------------
-    # CLOCK-IN HANDLING
-    # -------------------------------
-    if action == "checkin":
-        if attendance.clock_in:
-            return JsonResponse({"status": "error", "message": "Already checked in today"})
-
-        attendance.clock_in = now_time
-
-        # Determine lateness
-        if now_time > start_time:
-            diff = datetime.combine(today, now_time) - datetime.combine(today, start_time)
-            late_minutes = diff.seconds // 60
-            attendance.late_minutes = late_minutes
-            attendance.status = "Late Check-In"
-            # Require explanation if > 30 min late
-            attendance.needs_explanation = late_minutes > 30
-        else:
-            attendance.late_minutes = 0
-            attendance.status = "Checked In"
-            attendance.needs_explanation = False
 
-        attendance.save()
+def _device_authorized(request):
+    """
+    True for a registered device (X-Device-Key header matching one of
+    settings.SMARTPAY_DEVICE_KEYS) or a logged-in superuser.
+    """
+    if request.user.is_authenticated and request.user.is_superuser:
+        return True
+    key = request.headers.get("X-Device-Key", "")
+    return bool(key) and any(
+        hmac.compare_digest(key, device_key)
+        for device_key in getattr(settings, "SMARTPAY_DEVICE_KEYS", ())
+    )
 
-        return JsonResponse({
-            "status": "success",
-            "action": "checkin",
-            "attendance_status": attendance.status,
-            "late_minutes": attendance.late_minutes,
-            "needs_explanation": attendance.needs_explanation,
-        })
 
-    # -------------------------------
-    # CLOCK-OUT HANDLING
-    # -------------------------------
-    elif action == "checkout":
-        if not attendance.clock_in:
-            return JsonResponse({"status": "error", "message": "Cannot check out before checking in"})
-        if attendance.clock_out:
-            return JsonResponse({"status": "error", "message": "Already checked out today"})
-
-        attendance.clock_out = now_time
-
-        # Calculate total hours worked
-        datetime_in = datetime.combine(today, attendance.clock_in)
-        datetime_out = datetime.combine(today, now_time)
-        worked = datetime_out - datetime_in
-        worked_hours = round(worked.total_seconds() / 3600, 2)
-        attendance.hours_worked = worked_hours
-
-        # Determine early leave
-        if now_time < end_time:
-            attendance.status = "Left Early"
-            attendance.needs_explanation = True
-        else:
-            attendance.status = "Checked Out"
-            attendance.needs_explanation = False
+@csrf_exempt
+@require_POST
+def attendance_batch_action(request):
+    """
+    Batched Clock-In / Clock-Out for biometric devices and kiosks.
 
-        attendance.save()
+    Expects a JSON body: {"events": [{"staff_id", "action", "timestamp"}, ...]}
+    where timestamp is ISO-8601 (defaults to now) and must fall within a
+    few minutes of server time. Returns one result per event.
+    Devices authenticate with an X-Device-Key header.
+    """
+    if not _device_authorized(request):
+        return JsonResponse({"status": "error", "message": "Unknown device"}, status=403)
 
-        return JsonResponse({
-            "status": "success",
-            "action": "checkout",
-            "attendance_status": attendance.status,
-            "hours_worked": attendance.hours_worked,
-            "needs_explanation": attendance.needs_explanation,
-        })
+    try:
+        events = json.loads(request.body).get("events")
+    except (ValueError, AttributeError):
+        events = None
 
-    # -------------------------------
-    # INVALID ACTION
-    # -------------------------------
+    if not isinstance(events, list):
+        return JsonResponse({"status": "error", "message": "Expected a JSON list of events"}, status=400)
+
+    return JsonResponse({"status": "success", "results": process_punch_batch(events)})
+
+
+# ================================================================
+# Kiosk API (cached staff directory + minimal punch)
+# ================================================================
+def kiosk_directory(request):
+    """
+    Compact staff directory for check-in kiosks.
+
+    - Cached JSON body: {"fields": [...], "staff": [[staff_id, name, department], ...]}.
+    - Sends an ETag; kiosks revalidate with If-None-Match and get a 304
+      until an employee is added, edited or removed.
+    - Registered devices only (X-Device-Key, see _device_authorized).
+    """
+    if not _device_authorized(request):
+        return JsonResponse({"status": "error", "message": "Unknown device"}, status=403)
+
+    etag, body = get_staff_directory()
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
     else:
-        return JsonResponse({"status": "error", "message": "Invalid action"})
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@csrf_exempt
+@require_POST
+def kiosk_punch(request):
+    """
+    Minimal Clock-In / Clock-Out for kiosks (POST staff_id, action).
+    Returns only the employee's updated state and status text.
+    Registered devices only (X-Device-Key, see _device_authorized).
+    """
+    if not _device_authorized(request):
+        return JsonResponse({"status": "error", "message": "Unknown device"}, status=403)
+
+    staff_id = request.POST.get("staff_id")
+    action = request.POST.get("action")
+    if action not in ("checkin", "checkout"):
+        return JsonResponse({"status": "error", "message": "Invalid action"}, status=400)
+
+    employee = (
+        Employee.objects.filter(staff_id=staff_id)
+        .only("id", "staff_id", "department")
+        .first()
+    )
+    if employee is None:
+        return JsonResponse({"status": "error", "message": "Employee not found"}, status=404)
+
+    attendance, error = submit_punch(employee, action, timezone.localtime(timezone.now()))
+    if error:
+        return JsonResponse({"status": "error", "message": error}, status=409)
+
+    event = attendance_event(attendance, employee.staff_id)
+    return JsonResponse({
+        "status": "success",
+        "staff_id": employee.staff_id,
+        "state": event["state"],
+        "attendance_status": event["attendance_status"],
+    })
+
+
+
+def live_stream_available(request):
+    """
+    True when ``request`` is served over ASGI (smartpaypj/asgi.py).
+    Under WSGI Django buffers the whole async stream before sending it,
+    so an endless feed would never reach the browser.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+@login_required
+async def attendance_stream(request):
+    """
+    Server-sent events feed of attendance changes for live boards.
+
+    - One JSON event per committed punch (see pubsub.attendance_event).
+    - A comment line every 15s keeps proxies from closing idle streams.
+    - Needs the ASGI server; under WSGI it answers 204 No Content, which
+      tells EventSource clients to stop reconnecting.
+    """
+    if not live_stream_available(request):
+        return HttpResponse(status=204)
+
+    async def events():
+        subscription = get_pubsub_backend().subscribe(ATTENDANCE_CHANNEL)
+        yield "retry: 5000\n\n"
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: attendance\ndata: {message}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 
@@ -1245,100 +1579,92 @@ def attendance_action(request):
 
 def attendance_history(request):
     """
-    Displays historical attendance for all employees.
-    Can filter by month, week, or individual employee.
+    Displays monthly attendance totals for all employees.
+    Filter by ?month=YYYY-MM (default: current month) or ?staff_id=.
     Shows worked hours, late arrivals, and early leaves.
     Useful for HR reporting.
+
+    Reads MonthlyAttendanceSummary (one row per employee) instead of
+    every Attendance row. Pass ?export=csv or ?export=ndjson (with
+    optional start, end, department and staff_id filters) to stream
+    the daily rows instead.
     """
-    employees = Employee.objects.all().order_by("department", "full_name")
-    departments = defaultdict(list)
+    export_format = request.GET.get("export")
+    if export_format:
+        return attendance_history_export(request, export_format)
 
+    try:
+        month = parse_date(f"{request.GET['month']}-01") if request.GET.get("month") else None
+    except ValueError:
+        month = None
+    if month is None:
+        month = timezone.localdate().replace(day=1)
+
+    employees = Employee.objects.order_by("department", "full_name").prefetch_related(
+        Prefetch(
+            "monthly_summaries",
+            queryset=MonthlyAttendanceSummary.objects.filter(month=month),
+            to_attr="month_summary",
+        )
+    )
+    staff_id = request.GET.get("staff_id")
+    if staff_id:
+        employees = employees.filter(staff_id=staff_id)
+
+    departments = defaultdict(list)
     for emp in employees:
-        emp_attendance = emp.attendances.order_by("-date")  
         departments[emp.department].append({
             "employee": emp,
-            "attendance": emp_attendance
+            "summary": emp.month_summary[0] if emp.month_summary else None,
         })
 
     context = {
-        "departments": dict(departments)
+        "departments": dict(departments),
+        "month": month,
     }
 
     return render(request, "smartpayapp/attendance_history.html", context)
 
 
-# ================================================================
-# Unified Daily Attendance Evaluation Function
-# ================================================================
-
-def evaluate_attendance(attendance, start_time, end_time):
+def attendance_history_export(request, export_format):
     """
-    Evaluates both lateness (clock-in) and early departure (clock-out).
-    Dynamically computes hours worked and flags HR explanation when needed.
+    Stream attendance history as CSV or NDJSON.
+    Rows are written as they are read, so memory stays flat for any date range.
     """
+    if export_format not in STREAM_FORMATS:
+        return JsonResponse({"status": "error", "message": "Unsupported export format"}, status=400)
 
-    today = attendance.date
-    clock_in = attendance.clock_in
-    clock_out = attendance.clock_out
-
-    # 1. CLOCK-IN EVALUATION
-    if clock_in:
-        # Calculate lateness in minutes
-        late_delta = datetime.combine(today, clock_in) - datetime.combine(today, start_time)
-        late_minutes = max(0, int(late_delta.total_seconds() / 60))
-        attendance.late_minutes = late_minutes
-
-        # Apply logic based on lateness severity
-        if late_minutes == 0:
-            attendance.status = "Checked In on Time"
-            attendance.needs_explanation = False
-        elif late_minutes <= 30:
-            attendance.status = f"Late by {late_minutes} min (Within Limit)"
-            attendance.needs_explanation = False
-            # Optional leave deduction (1 workday = 480 minutes)
-            leave_deduction = late_minutes / 480
-            attendance.status += f" | Leave Deducted: {round(leave_deduction, 3)} days"
-        else:
-            attendance.status = f"Late by {late_minutes} min (Requires Explanation)"
-            attendance.needs_explanation = True
-    else:
-        attendance.status = "No Clock-In Recorded"
-        attendance.needs_explanation = True
-        attendance.save()
-        return  # Can't proceed further without clock-in
-
-    # 2. CLOCK-OUT EVALUATION
-    if clock_out:
-        # Calculate worked hours
-        worked_duration = datetime.combine(today, clock_out) - datetime.combine(today, clock_in)
-        worked_hours = round(worked_duration.total_seconds() / 3600, 2)
-        attendance.hours_worked = worked_hours
-
-        # Determine early leave
-        early_delta = datetime.combine(today, end_time) - datetime.combine(today, clock_out)
-        early_minutes = max(0, int(early_delta.total_seconds() / 60))
-
-        if early_minutes > 0:
-            attendance.status += f" | Left Early by {early_minutes} min (Requires Explanation)"
-            attendance.needs_explanation = True
-        else:
-            attendance.status += f" | Completed Full Day"
-
-    else:
-        attendance.status += " | No Clock-Out Recorded"
-
-    attendance.save()
-
+    dates = {}
+    for key in ("start", "end"):
+        raw = request.GET.get(key)
+        try:
+            dates[key] = parse_date(raw) if raw else None
+        except ValueError:
+            dates[key] = None
+        if raw and dates[key] is None:
+            return JsonResponse({"status": "error", "message": f"Invalid {key} date (YYYY-MM-DD)"}, status=400)
+
+    rows = attendance_export_rows(
+        start=dates["start"],
+        end=dates["end"],
+        department=request.GET.get("department") or None,
+        staff_id=request.GET.get("staff_id") or None,
+    )
+    header = [name for name, _ in ATTENDANCE_EXPORT_FIELDS]
+    stream, content_type = STREAM_FORMATS[export_format]
 
+    response = StreamingHttpResponse(stream(header, rows), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="attendance_history.{export_format}"'
+    return response
 
 
 def attendance_overview(request):
     today = timezone.localtime(timezone.now()).date()
-    employees = Employee.objects.all().order_by("department", "full_name")
-    
+    employees = employees_with_attendance(today)
+
     attendance_data = []
     for emp in employees:
-        att, created = Attendance.objects.get_or_create(employee=emp, date=today)
+        att = emp.attendance_record
         status = "Not Checked In"
         if att.clock_in and not att.clock_out:
             status = "Checked In"
@@ -1362,12 +1688,38 @@ def attendance_overview(request):
 
 
 def attendance_overview_data(request):
+    """
+    Polling endpoint for today's attendance roster.
+
+    - ?since=<version> returns only employees changed after that version.
+    - If-None-Match with the last ETag gets 304 Not Modified when
+      nothing changed.
+    - Responses carry the current ``version`` (also sent as the ETag).
+    """
     today = timezone.localtime(timezone.now()).date()
-    employees = Employee.objects.all()
+
+    since = request.GET.get("since")
+    if since is None:
+        etag = request.headers.get("If-None-Match", "").removeprefix("W/").strip('"')
+        since = etag.split(":", 1)[1] if etag.startswith(f"{today}:") else None
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        since = None
+
+    version, changed = changed_since(today, since)
+    etag = f'"{today}:{version}"'
+
+    if changed is not None and not changed:
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    employees = employees_with_attendance(today, employee_ids=changed)
     data = []
 
     for emp in employees:
-        att, _ = Attendance.objects.get_or_create(employee=emp, date=today)
+        att = emp.attendance_record
         status = "Not Checked In"
         if att.clock_in and not att.clock_out:
             status = "Checked In"
@@ -1381,28 +1733,27 @@ def attendance_overview_data(request):
             "clock_in": att.clock_in.strftime("%I:%M %p") if att.clock_in else "-",
             "clock_out": att.clock_out.strftime("%I:%M %p") if att.clock_out else "-"
         })
-    return JsonResponse({"attendance_data": data})
+
+    response = JsonResponse({
+        "attendance_data": data,
+        "version": version,
+        "delta": changed is not None,
+    })
+    response["ETag"] = etag
+    return response
 
 
 
 def attendance_page(request):
-    employees = Employee.objects.all()
-    today = date.today()
-    departments = {}
+    # Today's effective attendance (stored rows + pending punches)
+    departments, employees = build_department_roster(timezone.localdate())
 
     for emp in employees:
-        # Get today’s attendance record if exists
-        attendance = Attendance.objects.filter(employee=emp, date=today).first()
-        emp.attendance_status = (
-            attendance.status if attendance else "Not Checked In"
-        )
-        emp.clock_in = attendance.clock_in if attendance else None
-        emp.clock_out = attendance.clock_out if attendance else None
-        emp.hours_worked = attendance.hours_worked if attendance else 0
-        emp.late_minutes = attendance.late_minutes if attendance else 0
-        emp.needs_explanation = attendance.needs_explanation if attendance else False
-
-        departments.setdefault(emp.department, []).append(emp)
+        attendance = emp.attendance_record
+        emp.clock_in = attendance.clock_in
+        emp.clock_out = attendance.clock_out
+        emp.late_minutes = attendance.late_minutes
+        emp.needs_explanation = attendance.needs_explanation
 
     return render(request, "attendance.html", {
         "departments": departments,
@@ -1422,16 +1773,22 @@ def update_attendance(request):
 
             employee = Employee.objects.get(staff_id=emp_id)
 
+            # Accept a status code or its label ("Checked In on Time", ...)
+            labels = {label: code for code, label in AttendanceStatus.choices}
+            status_code = labels.get(state, state)
+            if status_code not in AttendanceStatus.values:
+                return JsonResponse({"success": False, "error": "Unknown attendance state"}, status=400)
+
             # Create or update today’s attendance
-            today = datetime.date.today()
+            today = timezone.localdate()
             attendance, created = Attendance.objects.get_or_create(
                 employee=employee,
                 date=today,
-                defaults={"status": state}
+                defaults={"status_code": status_code}
             )
 
             if not created:
-                attendance.status = state
+                attendance.status_code = status_code
                 attendance.save()
 
             return JsonResponse({"success": True, "message": f"{employee.full_name} {state}"})
@@ -0,0 +1,139 @@
+import threading
+import time as clock
+from array import array
+from datetime import date, time, timedelta
+
+
+# ================================================================
+# Working Calendar
+# ================================================================
+# Answers "is this a working day", "what is the shift" and "when is the
+# next working day" for any department in O(1). Each (department, year)
+# is precomputed once into:
+#   - a bytearray bitmap (1 = working day, indexed by day of year)
+#   - an array of "next working day" offsets for the same index
+# and kept in memory until shifts or holidays change.
+
+DEFAULT_SHIFTS = {
+    0: (time(8, 0), time(17, 0)),
+    1: (time(8, 0), time(17, 0)),
+    2: (time(8, 0), time(17, 0)),
+    3: (time(8, 0), time(17, 0)),
+    4: (time(8, 0), time(17, 0)),
+    5: (time(8, 0), time(13, 0)),
+}
+
+NO_NEXT = 0xFFFF  # no working day left in this year
+
+
+class WorkCalendar:
+    """Department shift definitions and public holidays, with per-year bitmaps."""
+
+    def __init__(self, shifts, holidays):
+        """
+        ``shifts``: {department or "": {weekday: (start_time, end_time)}}
+        ``holidays``: set of dates that are non-working for everyone.
+        """
+        self.shifts = shifts
+        self.holidays = frozenset(holidays)
+        self._years = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Precomputation
+    # ------------------------------------------------------------
+    def _weekly(self, department):
+        return self.shifts.get(department or "") or self.shifts.get("") or DEFAULT_SHIFTS
+
+    def _year(self, department, year):
+        """Return (bitmap, next_offsets) for ``department`` in ``year``."""
+        key = (department or "", year)
+        cached = self._years.get(key)
+        if cached is not None:
+            return cached
+
+        weekly = self._weekly(department)
+        start = date(year, 1, 1)
+        length = (date(year + 1, 1, 1) - start).days
+
+        bitmap = bytearray(length)
+        weekday = start.weekday()
+        for offset in range(length):
+            if weekday in weekly and start + timedelta(days=offset) not in self.holidays:
+                bitmap[offset] = 1
+            weekday = (weekday + 1) % 7
+
+        # next_offsets[i] = offset of the first working day strictly after i
+        next_offsets = array("H", [NO_NEXT]) * length
+        upcoming = NO_NEXT
+        for offset in range(length - 1, -1, -1):
+            next_offsets[offset] = upcoming
+            if bitmap[offset]:
+                upcoming = offset
+
+        with self._lock:
+            self._years[key] = (bitmap, next_offsets)
+        return bitmap, next_offsets
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def is_working_day(self, day, department=None):
+        bitmap, _ = self._year(department, day.year)
+        return bool(bitmap[day.timetuple().tm_yday - 1])
+
+    def shift_for(self, day, department=None):
+        """Return ``(start_time, end_time)`` for ``day``, or None on non-working days."""
+        if not self.is_working_day(day, department):
+            return None
+        return self._weekly(department)[day.weekday()]
+
+    def next_working_day(self, day, department=None):
+        """Return the first working day strictly after ``day``."""
+        _, next_offsets = self._year(department, day.year)
+        offset = next_offsets[day.timetuple().tm_yday - 1]
+        if offset != NO_NEXT:
+            return date(day.year, 1, 1) + timedelta(days=offset)
+
+        # Roll into the following year(s); a year with no working days at all is skipped.
+        for year in range(day.year + 1, day.year + 6):
+            bitmap, _ = self._year(department, year)
+            first = bitmap.find(1)
+            if first != -1:
+                return date(year, 1, 1) + timedelta(days=first)
+        raise ValueError("No working day configured within five years.")
+
+
+# ================================================================
+# Shared Instance
+# ================================================================
+RELOAD_SECONDS = 300  # pick up changes saved by other processes
+
+_calendar = None
+_loaded_at = 0.0
+
+
+def load_work_calendar():
+    """Build a WorkCalendar from DepartmentShift and PublicHoliday rows."""
+    from .models import DepartmentShift, PublicHoliday
+
+    shifts = {}
+    for shift in DepartmentShift.objects.all():
+        shifts.setdefault(shift.department, {})[shift.weekday] = (shift.start_time, shift.end_time)
+    holidays = set(PublicHoliday.objects.values_list("date", flat=True))
+    return WorkCalendar(shifts, holidays)
+
+
+def get_work_calendar():
+    """Return the process-wide calendar, loading it on first use."""
+    global _calendar, _loaded_at
+    if _calendar is None or clock.monotonic() - _loaded_at > RELOAD_SECONDS:
+        _calendar = load_work_calendar()
+        _loaded_at = clock.monotonic()
+    return _calendar
+
+
+def invalidate_work_calendar():
+    """Forget the cached calendar (called when shifts or holidays change)."""
+    global _calendar
+    _calendar = None
@@ -3,6 +3,10 @@ ASGI config for smartpaypj project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the project through this entry point (e.g. ``uvicorn smartpaypj.asgi:application``)
+so the /attendance_stream/ server-sent events feed can hold many open
+connections without tying up a worker thread each.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
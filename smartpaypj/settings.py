@@ -78,6 +78,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file, not the default shared-cache in-memory database: the
+        # concurrency tests need connections that wait on locks and can
+        # really close, like they do in production.
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -420,6 +420,16 @@ document.addEventListener("DOMContentLoaded", () => {
   searchInput.addEventListener("input", applyFilters);
   deptSelect.addEventListener("change", applyFilters);
 
+  // Live updates pushed from other kiosks/boards (server-sent events);
+  // the page only sets data-stream-url when the server can stream (ASGI)
+  if (window.EventSource && cardView.dataset.streamUrl) {
+    const stream = new EventSource(cardView.dataset.streamUrl);
+    stream.addEventListener("attendance", e => {
+      const data = JSON.parse(e.data);
+      updateEmployeeState(data.staff_id, data.state);
+    });
+  }
+
   // Initialize
   showCardView();
 });